@@ -0,0 +1,406 @@
+"""Reservation archive module"""
+
+import argparse
+import base64
+import bisect
+import datetime
+import gzip
+import hashlib
+import json
+import lzma
+import threading
+import zlib
+from pathlib import Path
+
+from app import serializers
+from app.cache import MISSING, LRUCache
+from app.locking import lock_for
+from app.repository import iter_entities, repository_for
+from app.reservation import Reservation
+from app.sharding import partitions
+from app.storage import (
+    OP_DELETE,
+    CorruptFileError,
+    file_stamp,
+    read_verified,
+    remove_file,
+    replace_file,
+)
+
+ARCHIVE_DIRECTORY = "archive"
+# Compression name -> (file suffix, compress, decompress).
+CODECS = {
+    "gzip": (".gz", gzip.compress, gzip.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+DEFAULT_CODEC = "gzip"
+# Bloom filter size and probes: about 1% false positives.
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+
+_ARCHIVES = {}
+
+
+class Archive:
+    """
+    Compressed, read-only history of records moved out of a hot store.
+
+    Records go to immutable segment files, one per time partition (a
+    "YYYY-MM" month) and archiving run. A segment holds its records
+    sorted by key in blocks of ``block_records`` JSON lines, each
+    compressed on its own; gzip and xz read the concatenated blocks as
+    one stream, so the usual tools still open a segment whole.
+
+    The manifest lists every segment with its key range, a bloom filter
+    of its keys and a sparse index holding the first key, offset, length
+    and crc32 of each block. Ids are not ordered by time, so most key
+    ranges overlap; the filter skips nearly every segment without the
+    key, and a lookup reads and decompresses one block of the rest,
+    newest first. The last ``cache_blocks`` decoded blocks are kept in
+    memory.
+    """
+
+    block_records = 128
+    cache_blocks = 32
+
+    def __init__(self, directory, key_field):
+        self.directory = Path(directory)
+        self.key_field = key_field
+        self.manifest_path = self.directory / "manifest.json"
+        self.lock = lock_for(self.manifest_path)
+        self._mutex = threading.Lock()
+        self._segments = []
+        self._stamp = None
+        self._blocks = LRUCache(self.cache_blocks)
+
+    def segments(self):
+        """Return the manifest entry of every segment, oldest first."""
+        with self._mutex:
+            stamp = file_stamp(self.manifest_path)
+            if stamp != self._stamp:
+                self._segments = self._read_manifest()
+                self._stamp = stamp
+                self._blocks.clear()
+            return self._segments
+
+    def get(self, key):
+        """
+        Return the newest archived record for ``key``, or None. Only
+        string keys are archived.
+        """
+        if not isinstance(key, str):
+            return None
+        for segment in reversed(self.segments()):
+            if (not segment["first"] <= key <= segment["last"] or
+                    not _may_contain(segment["filter"], key)):
+                continue
+            block = bisect.bisect_right(segment["firsts"], key) - 1
+            record = self._block(segment, block).get(key)
+            if record is not None:
+                return dict(record)
+        return None
+
+    def iter_records(self, first=None, last=None):
+        """
+        Yield the archived records of the partitions from ``first`` to
+        ``last`` ("YYYY-MM", both optional), one segment at a time.
+        """
+        for segment in self.segments():
+            partition = segment["partition"]
+            if ((first is not None and partition < first) or
+                    (last is not None and partition > last)):
+                continue
+            decompress = CODECS[segment["codec"]][2]
+            with open(self.directory / segment["file"], "rb") as file:
+                for _, offset, length, checksum in segment["blocks"]:
+                    file.seek(offset)
+                    yield from _decode_block(
+                        _verified(file.read(length), checksum, segment),
+                        decompress)
+
+    def add(self, records, partition_of, codec=DEFAULT_CODEC):
+        """
+        Write ``records`` to new segments grouped by
+        ``partition_of(record)``; return the number written.
+
+        The segments are complete on disk before the manifest names
+        them, so readers never see a partial one.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        grouped = {}
+        for record in records:
+            grouped.setdefault(partition_of(record), []).append(record)
+        if not grouped:
+            return 0
+
+        with self.lock:
+            segments = list(self.segments())
+            for partition, group in sorted(grouped.items()):
+                segments.append(self._write_segment(partition, group, codec))
+            self._write_manifest(segments)
+        return sum(len(group) for group in grouped.values())
+
+    def merge(self, codec=None):
+        """
+        Rewrite every partition held in several segments as one, keeping
+        only the newest copy of each record; return the number of
+        segments removed.
+        """
+        with self.lock:
+            segments = self.segments()
+            grouped = {}
+            for segment in segments:
+                grouped.setdefault(segment["partition"], []).append(segment)
+
+            kept, removed = [], []
+            for partition, group in sorted(grouped.items()):
+                if len(group) == 1:
+                    kept.extend(group)
+                    continue
+                newest = {}
+                for record in self.iter_records(partition, partition):
+                    newest[record[self.key_field]] = record
+                kept.append(self._write_segment(
+                    partition, list(newest.values()),
+                    codec or group[-1]["codec"]))
+                removed.extend(group)
+
+            if removed:
+                self._write_manifest(kept)
+                for segment in removed:
+                    remove_file(self.directory / segment["file"])
+        return len(removed)
+
+    def _write_segment(self, partition, records, codec):
+        """Write one segment; return its manifest entry."""
+        suffix, compress = CODECS[codec][:2]
+        records = sorted(records, key=lambda record: record[self.key_field])
+        blocks, chunks, offset = [], [], 0
+        for start in range(0, len(records), self.block_records):
+            block = records[start:start + self.block_records]
+            data = compress("".join(
+                serializers.dumps_json(record) + "\n"
+                for record in block).encode("utf-8"))
+            blocks.append([block[0][self.key_field], offset, len(data),
+                           zlib.crc32(data)])
+            chunks.append(data)
+            offset += len(data)
+
+        # The generation numbers the segments across processes.
+        self.lock.bump()
+        name = f"{partition}-{self.lock.generation():08d}.jsonl{suffix}"
+        replace_file(self.directory / name, chunks)
+        return {
+            "file": name,
+            "partition": partition,
+            "codec": codec,
+            "count": len(records),
+            "first": records[0][self.key_field],
+            "last": records[-1][self.key_field],
+            "blocks": blocks,
+            "bloom": base64.b64encode(_bloom(
+                record[self.key_field] for record in records)).decode(),
+        }
+
+    def _write_manifest(self, segments):
+        """Replace the manifest; the caller holds the lock."""
+        data = {"segments": [
+            {field: value for field, value in segment.items()
+             if field not in ("firsts", "filter")}
+            for segment in segments]}
+        replace_file(self.manifest_path,
+                     [json.dumps(data, indent=1).encode("utf-8")])
+
+    def _read_manifest(self):
+        """Return the segments named by the manifest on disk."""
+        raw = read_verified(self.manifest_path)
+        if raw is None:
+            return []
+        segments = serializers.loads_json(raw)["segments"]
+        for segment in segments:
+            segment["firsts"] = [block[0] for block in segment["blocks"]]
+            segment["filter"] = base64.b64decode(segment["bloom"])
+        return segments
+
+    def _block(self, segment, block):
+        """Return the records of one block by key, decoding it once."""
+        cache_key = (segment["file"], block)
+        with self._mutex:
+            records = self._blocks.get(cache_key)
+        if records is not MISSING:
+            return records
+
+        _, offset, length, checksum = segment["blocks"][block]
+        with open(self.directory / segment["file"], "rb") as file:
+            file.seek(offset)
+            data = _verified(file.read(length), checksum, segment)
+        records = {record[self.key_field]: record for record in
+                   _decode_block(data, CODECS[segment["codec"]][2])}
+        with self._mutex:
+            self._blocks.put(cache_key, records)
+        return records
+
+
+def _bloom_bits(key, size):
+    """Return the bloom filter bits of ``key`` among ``size`` bits."""
+    digest = hashlib.blake2b(str(key).encode("utf-8"),
+                             digest_size=8).digest()
+    first = int.from_bytes(digest[:4], "little")
+    step = int.from_bytes(digest[4:], "little") | 1
+    return [(first + probe * step) % size for probe in range(BLOOM_HASHES)]
+
+
+def _bloom(keys):
+    """Return the bloom filter bytes of ``keys``."""
+    keys = list(keys)
+    bits = bytearray(max(8, len(keys) * BLOOM_BITS_PER_KEY // 8 + 1))
+    for key in keys:
+        for bit in _bloom_bits(key, len(bits) * 8):
+            bits[bit >> 3] |= 1 << (bit & 7)
+    return bytes(bits)
+
+
+def _may_contain(bits, key):
+    """Return False if ``key`` is surely not in the bloom filter."""
+    return all(bits[bit >> 3] & (1 << (bit & 7))
+               for bit in _bloom_bits(key, len(bits) * 8))
+
+
+def _verified(data, checksum, segment):
+    """Return a block's bytes if they match the manifest's crc32."""
+    if zlib.crc32(data) != checksum:
+        raise CorruptFileError(f"Damaged block in {segment['file']}")
+    return data
+
+
+def _decode_block(data, decompress):
+    """Yield the records of a compressed block."""
+    for line in decompress(data).splitlines():
+        if line:
+            yield serializers.loads_json(line)
+
+
+def archive_for(entity_cls):
+    """Return the archive kept next to the data file of ``entity_cls``."""
+    path = Path(entity_cls.file_path)
+    directory = path.parent / ARCHIVE_DIRECTORY / path.stem
+    archive = _ARCHIVES.get((directory, entity_cls.key_field))
+    if archive is None:
+        archive = _ARCHIVES[(directory, entity_cls.key_field)] = Archive(
+            directory, entity_cls.key_field)
+    return archive
+
+
+def _archivable(reservation, before):
+    """
+    Return True for a cancelled reservation, or a stay that ended
+    before ``before``. Active undated reservations hold a room.
+    """
+    if reservation.status == Reservation.STATUS_CANCELLED:
+        return True
+    return (reservation.check_out is not None and
+            reservation.check_out < before)
+
+
+def _archivable_records(repository, before):
+    """
+    Return the raw records of ``repository`` to archive, skipping the
+    invalid ones like the loader does. Archive keys must be strings.
+    """
+    records = []
+    for reservation in iter_entities(repository.iter_records(),
+                                     Reservation.from_dict):
+        if not isinstance(reservation.reservation_id, str):
+            print(f"Invalid record skipped: {reservation.to_dict()}")
+        elif _archivable(reservation, before):
+            records.append(reservation.to_dict())
+    return records
+
+
+def archive_reservations(before=None, codec=DEFAULT_CODEC):
+    """
+    Move cancelled reservations, and stays that ended before ``before``
+    (an ISO date, default today), to the archive; return the number
+    moved.
+
+    Dated reservations are partitioned by the month of their check-out,
+    undated ones by the month they were archived in. Each shard is
+    handled under its lock: its records are written to the archive,
+    then deleted from the hot store, whose journal is folded into the
+    snapshot so later loads stop paying for them. A crash between the
+    two steps leaves a record in both places; the next run archives it
+    again, and ``Archive.merge`` keeps a single copy. Archived ids stay
+    taken: ``Reservation.create_reservation`` looks them up here.
+    """
+    today = datetime.date.today().isoformat()
+    before = str(before or today)
+
+    def partition_of(record):
+        return (record.get("check_out") or today)[:7]
+
+    # Replaying a pending transaction later must not revive a record.
+    Reservation.transaction().recover()
+    archive = archive_for(Reservation)
+    moved = 0
+    for repository in partitions(repository_for(Reservation)):
+        with repository.lock:
+            records = _archivable_records(repository, before)
+            if not records:
+                continue
+            archive.add(records, partition_of, codec)
+            repository.apply([(OP_DELETE, record["reservation_id"], None)
+                              for record in records])
+            if hasattr(repository.storage, "compact"):
+                repository.storage.compact()
+            moved += len(records)
+    return moved
+
+
+def find_reservation(reservation_id):
+    """
+    Return a reservation by id from the hot store or, failing that, the
+    archive.
+    """
+    try:
+        return Reservation.display_reservation_info(reservation_id)
+    except KeyError:
+        record = archive_for(Reservation).get(reservation_id)
+    if record is None:
+        raise KeyError("Reservation not found")
+    return Reservation.from_dict(record)
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.archive``."""
+    parser = argparse.ArgumentParser(
+        description="Move cancelled and past reservations to the archive.")
+    parser.add_argument("--before", type=datetime.date.fromisoformat,
+                        help="archive stays ending before this date "
+                             "(default: today)")
+    parser.add_argument("--codec", choices=sorted(CODECS),
+                        default=DEFAULT_CODEC,
+                        help="compression of new segments")
+    parser.add_argument("--merge", action="store_true",
+                        help="rewrite each partition as a single segment")
+    parser.add_argument("--get", metavar="RESERVATION_ID",
+                        help="print one reservation instead")
+    args = parser.parse_args(argv)
+
+    if args.get is not None:
+        try:
+            reservation = find_reservation(args.get)
+        except KeyError as error:
+            parser.exit(1, f"{error.args[0]}\n")
+        print(json.dumps(reservation.to_dict()))
+        return
+
+    moved = archive_reservations(args.before, args.codec)
+    print(f"{moved} reservations archived")
+    if args.merge:
+        merged = archive_for(Reservation).merge()
+        print(f"{merged} segments merged")
+
+
+if __name__ == "__main__":
+    main()
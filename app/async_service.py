@@ -0,0 +1,95 @@
+"""Asyncio reservation service module"""
+
+import asyncio
+
+from app.bulk import BULK_ERRORS
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+from app.transaction import run_with_retries
+
+
+class AsyncReservationService:
+    """
+    Asyncio counterparts of the reservation operations.
+
+    Blocking file I/O runs in ``executor`` (the loop's default executor
+    when None). Bookings requested while a write is in flight are queued
+    and committed together in one transaction, so N concurrent booking
+    coroutines cost a handful of log writes instead of N.
+    """
+
+    def __init__(self, executor=None, max_batch=512):
+        self.executor = executor
+        self.max_batch = max_batch
+        self._pending = []
+        self._flusher = None
+
+    async def create_reservation(self, reservation):
+        """Book a room; raises like Reservation.create_reservation."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((reservation, future))
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush())
+
+        return await future
+
+    async def cancel_reservation(self, reservation_id):
+        """Cancel a reservation without blocking the event loop."""
+        return await self._run(Reservation.cancel_reservation, reservation_id)
+
+    async def display_hotel_info(self, hotel_id):
+        """Return a hotel without blocking the event loop."""
+        return await self._run(Hotel.display_hotel_info, hotel_id)
+
+    async def display_customer_info(self, customer_id):
+        """Return a customer without blocking the event loop."""
+        return await self._run(Customer.display_customer_info, customer_id)
+
+    async def _run(self, function, *args):
+        """Run a blocking call in the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def _flush(self):
+        """Commit queued bookings in batches until the queue is empty."""
+        # Yield once so coroutines started together join the first batch.
+        await asyncio.sleep(0)
+
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+
+            try:
+                errors = await self._run(
+                    self._book_batch, [reservation for reservation, _ in batch]
+                )
+            except Exception as error:  # pylint: disable=broad-except
+                errors = [error] * len(batch)
+
+            for (_, future), error in zip(batch, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    @staticmethod
+    def _book_batch(reservations):
+        """Book every reservation in one transaction; return their errors."""
+
+        def work(transaction):
+            errors = []
+            for reservation in reservations:
+                try:
+                    Reservation.create_reservation(reservation, transaction)
+                except BULK_ERRORS as error:
+                    errors.append(error)
+                    continue
+                errors.append(None)
+            return errors
+
+        return run_with_retries(Reservation.transaction, work)
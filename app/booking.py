@@ -0,0 +1,47 @@
+"""Booking service module"""
+
+import threading
+
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+class BookingService:
+    """
+    Thread-safe entry point for booking operations.
+
+    Each hotel maps to one of ``stripes`` locks, so bookings for the same
+    hotel are serialized in-process and keep its ``available_rooms``
+    invariant without transaction retries, while bookings for different
+    hotels run in parallel and only meet at the short commit.
+    """
+
+    def __init__(self, stripes=64):
+        if stripes <= 0:
+            raise ValueError("stripes must be positive")
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def lock_for(self, hotel_id):
+        """Return the stripe lock guarding ``hotel_id``."""
+        return self._locks[hash(hotel_id) % len(self._locks)]
+
+    def create_reservation(self, reservation):
+        """Book a room for ``reservation``."""
+        with self.lock_for(reservation.hotel_id):
+            Reservation.create_reservation(reservation)
+
+    def cancel_reservation(self, reservation_id):
+        """Cancel a reservation and release its room."""
+        reservation = Reservation.display_reservation_info(reservation_id)
+        with self.lock_for(reservation.hotel_id):
+            Reservation.cancel_reservation(reservation_id)
+
+    def reserve_room(self, hotel_id):
+        """Take one room of a hotel without recording a reservation."""
+        with self.lock_for(hotel_id):
+            Hotel.reserve_room(hotel_id)
+
+    def release_room(self, hotel_id):
+        """Give one room back to a hotel."""
+        with self.lock_for(hotel_id):
+            Hotel.cancel_reservation(hotel_id)
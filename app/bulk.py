@@ -0,0 +1,192 @@
+"""Bulk operations module"""
+
+import csv
+import functools
+import itertools
+import json
+from pathlib import Path
+
+from app.storage import OP_CREATE, OP_DELETE, OP_MODIFY
+from app.transaction import run_with_retries
+
+BULK_ERRORS = (KeyError, TypeError, ValueError)
+# Records committed per transaction by run_batches.
+BATCH_SIZE = 1000
+
+
+class BulkResult:
+    """Outcome of a bulk operation: applied keys and per-record errors."""
+
+    def __init__(self):
+        self.succeeded = []
+        self.errors = []
+
+    def add_error(self, position, error):
+        """Record the failure of the record at ``position``."""
+        message = error.args[0] if error.args else str(error)
+        self.errors.append((position, message))
+
+
+def read_records(path, types=None):
+    """
+    Yield records one at a time from a JSON Lines or CSV file.
+
+    Files ending in ``.csv`` are read with a header row; anything else is
+    treated as JSON Lines. ``types`` maps field names to converters for
+    formats that carry no types, e.g. ``{"total_rooms": int}``. A line
+    or row that cannot be read is yielded as the ValueError describing
+    it, so the bulk operations report it as that record's error and go
+    on with the next one.
+    """
+    path = Path(path)
+    types = types or {}
+
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                try:
+                    yield {key: types[key](value) if key in types
+                           else value for key, value in row.items()}
+                except (TypeError, ValueError) as error:
+                    yield ValueError(
+                        f"Invalid row on line {reader.line_num}: {error}")
+            return
+
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield ValueError(
+                    f"Invalid JSON on line {number}: {error.msg}")
+
+
+def _checked(record):
+    """Return ``record``, raising the error read_records put in its place."""
+    if isinstance(record, Exception):
+        raise record
+    return record
+
+
+def to_entity(entity_cls, record):
+    """Return ``record`` as an entity, building it from a dict if needed."""
+    if isinstance(_checked(record), entity_cls):
+        return record
+    return entity_cls.from_dict(record)
+
+
+def run_batches(begin, items, work, batch_size=None):
+    """
+    Call ``work(item, transaction)`` for every item, ``batch_size`` items
+    (default BATCH_SIZE) per transaction from ``begin()``, and return a
+    BulkResult of the keys ``work`` returns and of per-item errors.
+
+    ``items`` is read lazily: only the current batch is held in memory,
+    to be replayed if its commit hits a conflict.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    result = BulkResult()
+    items = iter(items)
+    start = 0
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return result
+        done = run_with_retries(
+            begin, functools.partial(_run_batch, batch, start, work))
+        result.succeeded.extend(done.succeeded)
+        result.errors.extend(done.errors)
+        start += len(batch)
+
+
+def _run_batch(batch, start, work, transaction):
+    """Run ``work`` over one batch inside ``transaction``."""
+    result = BulkResult()
+    for position, item in enumerate(batch, start):
+        try:
+            key = work(item, transaction)
+        except BULK_ERRORS as error:
+            result.add_error(position, error)
+            continue
+        result.succeeded.append(key)
+    return result
+
+
+def bulk_create(entity_cls, repository, records, duplicate_message):
+    """Validate every record in one pass and create them in one write."""
+    result = BulkResult()
+    ops = []
+    seen = set()
+
+    with repository.lock:
+        for position, record in enumerate(records):
+            try:
+                entity = to_entity(entity_cls, record)
+                key = getattr(entity, repository.key_field)
+                if key in seen or repository.exists(key):
+                    raise ValueError(duplicate_message)
+            except BULK_ERRORS as error:
+                result.add_error(position, error)
+                continue
+
+            seen.add(key)
+            ops.append((OP_CREATE, key, entity))
+            result.succeeded.append(key)
+
+        repository.apply(ops)
+    return result
+
+
+def bulk_delete(repository, keys, missing_message):
+    """Delete every existing key in one write."""
+    result = BulkResult()
+    ops = []
+    seen = set()
+
+    with repository.lock:
+        for position, key in enumerate(keys):
+            if key in seen or not repository.exists(key):
+                result.add_error(position, KeyError(missing_message))
+                continue
+
+            seen.add(key)
+            ops.append((OP_DELETE, key, None))
+            result.succeeded.append(key)
+
+        repository.apply(ops)
+    return result
+
+
+def bulk_modify(entity_cls, repository, records, missing_message):
+    """
+    Apply partial updates in one write.
+
+    Each record holds the primary key plus the fields to change; unknown
+    fields are ignored and the result is validated by ``from_dict``.
+    """
+    result = BulkResult()
+    updated = {}
+
+    with repository.lock:
+        for position, record in enumerate(records):
+            try:
+                key = _checked(record)[repository.key_field]
+                current = updated.get(key) or repository.get(key)
+                if current is None:
+                    raise KeyError(missing_message)
+
+                data = current.to_dict()
+                data.update((field, value) for field, value in record.items()
+                            if field in data)
+                updated[key] = entity_cls.from_dict(data)
+            except BULK_ERRORS as error:
+                result.add_error(position, error)
+                continue
+
+            result.succeeded.append(key)
+
+        repository.apply([(OP_MODIFY, key, entity)
+                          for key, entity in updated.items()])
+    return result
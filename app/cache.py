@@ -0,0 +1,79 @@
+"""Entity lookup cache module"""
+
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class CacheStats:
+    """Counters describing how a cache has been used."""
+
+    __slots__ = ("hits", "misses", "evictions", "expirations",
+                 "invalidations", "reloads")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        """Return the counters as a plain dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry.
+
+    Entries older than ``ttl`` seconds, when given, count as misses and
+    are dropped on access. Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic,
+                 stats=None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = stats if stats is not None else CacheStats()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the value cached under ``key``, or MISSING."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return MISSING
+
+        value, stored_at = entry
+        if self.ttl is not None and self.clock() - stored_at > self.ttl:
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache ``value`` under ``key``, evicting the oldest if full."""
+        self._entries[key] = (value, self.clock())
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def discard(self, key):
+        """Drop ``key`` if it is cached."""
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
@@ -0,0 +1,343 @@
+"""Change data capture module"""
+
+import bisect
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from app import serializers
+from app.locking import lock_for
+
+LOG_DIRECTORY = "changes"
+# Folder whose change log every store reports to; None means the folder
+# of the reservations file.
+DATA_DIRECTORY = None
+_SEGMENT = re.compile(r"changes-(\d{20})\.log")
+
+_LOGS = {}
+_subscribers = []
+_subscribers_lock = threading.Lock()
+_local_sequence = itertools.count(1)
+
+
+class ChangeEvent:
+    """One created, modified or deleted record, in commit order."""
+
+    __slots__ = ("seq", "entity", "op", "key", "record", "time")
+
+    def __init__(self, seq, entity, op, key, record, time_):
+        self.seq = seq
+        self.entity = entity
+        self.op = op
+        self.key = key
+        self.record = record
+        self.time = time_
+
+    def to_dict(self):
+        """Convert the event to a JSON-ready dictionary."""
+        return {
+            "seq": self.seq,
+            "entity": self.entity,
+            "op": self.op,
+            "key": self.key,
+            "record": self.record,
+            "time": self.time,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an event from its dictionary form."""
+        return cls(data["seq"], data["entity"], data["op"], data["key"],
+                   data.get("record"), data.get("time"))
+
+
+class ChangeLog:
+    """
+    Append-only change log shared by every process using a data folder.
+
+    Events are stored one checksummed JSON line each in segment files
+    named after their first sequence number, so resuming from an offset
+    opens only the segment holding it. Sequence numbers come from the
+    generation counter of the log's file lock, taken before the lines
+    are written, so they are unique and increasing across processes; a
+    crash can leave a gap, never a duplicate sequence number.
+
+    Events are logged after their write is stored. A transaction that
+    crashes before logging is logged when its write-ahead log is
+    replayed, possibly a second time; a plain write that crashes there
+    is never logged.
+    """
+
+    segment_bytes = 16 * 1024 * 1024
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock = lock_for(self.directory / "changes")
+
+    def append(self, entity, ops):
+        """Log (op, key, record) operations of one entity class."""
+        with self.lock:
+            generation = self.lock.generation()
+            # A lost lock file restarts from the newest logged event.
+            last = generation or self.last_seq()
+            self.lock.bump(last - generation + len(ops))
+
+            now = time.time()
+            events = [ChangeEvent(seq, entity, op, key, record, now)
+                      for seq, (op, key, record)
+                      in enumerate(ops, start=last + 1)]
+            lines = []
+            for event in events:
+                payload = serializers.dumps_json(event.to_dict())
+                lines.append(f"{zlib.crc32(payload.encode()):08x} "
+                             f"{payload}\n")
+
+            with open(self._segment_for(last + 1), "a+b") as file:
+                if file.tell():
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        # Close a line torn by a crash, so it is skipped.
+                        lines.insert(0, "\n")
+                file.write("".join(lines).encode("utf-8"))
+        return events
+
+    def read(self, since=0):
+        """Yield every event after sequence number ``since``."""
+        for event, _, _ in self._scan(since):
+            yield event
+
+    def tail(self, since=0, poll_interval=0.2, timeout=None):
+        """
+        Yield events after ``since`` as they are logged, waiting for new
+        ones; stop once ``timeout`` seconds pass without any.
+        """
+        position = None
+        idle_since = time.monotonic()
+        while True:
+            found = False
+            for event, path, offset in self._scan(since, position):
+                found = True
+                since, position = event.seq, (path, offset)
+                yield event
+            if found:
+                idle_since = time.monotonic()
+            elif (timeout is not None and
+                  time.monotonic() - idle_since >= timeout):
+                return
+            else:
+                time.sleep(poll_interval)
+
+    def last_seq(self):
+        """Return the sequence number of the newest logged event."""
+        segments = self.segments()
+        if not segments:
+            return 0
+        last = segments[-1][0] - 1
+        for event, _ in _read_segment(segments[-1][1]):
+            last = event.seq
+        return last
+
+    def segments(self):
+        """Return the (first sequence number, path) of every segment."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            match = _SEGMENT.fullmatch(path.name)
+            if match:
+                found.append((int(match.group(1)), path))
+        return sorted(found)
+
+    def prune(self, upto):
+        """Delete the segments holding only events up to ``upto``."""
+        segments = self.segments()
+        removed = 0
+        for (_, path), (following, _) in zip(segments, segments[1:]):
+            if following - 1 <= upto:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def _segment_for(self, seq):
+        """Return the segment to append ``seq`` to; a full one is closed."""
+        segments = self.segments()
+        if segments and segments[-1][1].stat().st_size < self.segment_bytes:
+            return segments[-1][1]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"changes-{seq:020d}.log"
+
+    def _scan(self, since, position=None):
+        """
+        Yield (event, segment, end offset) after ``since``, resuming at a
+        (segment, offset) position when one is given.
+        """
+        segments = self.segments()
+        paths = [path for _, path in segments]
+        offsets = {}
+        if position is not None and position[0] in paths:
+            start = paths.index(position[0])
+            offsets[position[0]] = position[1]
+        else:
+            firsts = [first for first, _ in segments]
+            start = max(bisect.bisect_right(firsts, since + 1) - 1, 0)
+
+        for path in paths[start:]:
+            for event, end in _read_segment(path, offsets.get(path, 0)):
+                if event.seq > since:
+                    yield event, path, end
+
+
+def _read_segment(path, offset=0):
+    """
+    Yield (event, end offset) from one segment, skipping damaged lines
+    and stopping at a line still being written.
+    """
+    try:
+        with open(path, "rb") as file:
+            file.seek(offset)
+            for line in file:
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    return
+                checksum, _, payload = line.rstrip(b"\n").partition(b" ")
+                try:
+                    if int(checksum, 16) != zlib.crc32(payload):
+                        raise ValueError("checksum mismatch")
+                    event = ChangeEvent.from_dict(
+                        serializers.loads_json(payload))
+                except (KeyError, TypeError, ValueError):
+                    print(f"Invalid change entry skipped: {line.strip()}")
+                    continue
+                yield event, offset
+    except FileNotFoundError:
+        return
+
+
+def set_data_directory(directory):
+    """Report every store's changes to the log of ``directory``."""
+    global DATA_DIRECTORY  # pylint: disable=global-statement
+    DATA_DIRECTORY = directory
+
+
+def configured_directory():
+    """Return the folder whose change log the stores report to."""
+    if DATA_DIRECTORY is not None:
+        return Path(DATA_DIRECTORY)
+    # The reservation module imports this one through the repository.
+    from app.reservation import (  # pylint: disable=import-outside-toplevel
+        Reservation)
+    return Path(Reservation.file_path).parent
+
+
+def log_for(data_directory=None):
+    """
+    Return the change log of a data folder, by default the configured
+    one, or None while its ``changes`` folder does not exist.
+    """
+    data_directory = str(data_directory or configured_directory())
+    log = _LOGS.get(data_directory)
+    if log is None:
+        log = _LOGS[data_directory] = ChangeLog(
+            Path(data_directory) / LOG_DIRECTORY)
+    return log if os.path.isdir(log.directory) else None
+
+
+def enable(data_directory=None):
+    """
+    Start logging the changes to the files in ``data_directory``, by
+    default the configured folder.
+    """
+    data_directory = data_directory or configured_directory()
+    (Path(data_directory) / LOG_DIRECTORY).mkdir(parents=True, exist_ok=True)
+    return log_for(data_directory)
+
+
+def subscribe(callback, entity=None):
+    """
+    Call ``callback(event)`` for every change this process makes, or
+    only those of the entity class named ``entity``. Callbacks run in
+    commit order while the store is locked, so they must be quick and
+    must not write. Returns a function that unsubscribes.
+    """
+    subscription = (callback, entity)
+    with _subscribers_lock:
+        _subscribers.append(subscription)
+
+    def unsubscribe():
+        with _subscribers_lock:
+            if subscription in _subscribers:
+                _subscribers.remove(subscription)
+    return unsubscribe
+
+
+def active():
+    """Return True if changes are reported."""
+    return bool(_subscribers) or log_for() is not None
+
+
+def publish(entity, ops):
+    """
+    Report (op, key, record) operations written to a store. Events are
+    logged when the configured folder has a change log; without one,
+    subscribers get process-local sequence numbers. A failing callback
+    is reported and skipped; the write stands.
+    """
+    log = log_for()
+    if log is None and not _subscribers:
+        return []
+
+    if log is not None:
+        events = log.append(entity, ops)
+    else:
+        now = time.time()
+        events = [ChangeEvent(next(_local_sequence), entity, op, key,
+                              record, now)
+                  for op, key, record in ops]
+
+    for callback, wanted in list(_subscribers):
+        for event in events:
+            if wanted is None or wanted == event.entity:
+                try:
+                    callback(event)
+                except Exception as error:  # pylint: disable=broad-except
+                    print(f"Change subscriber failed: {error!r}")
+    return events
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.changes``."""
+    # Every repository imports this module; only the CLI needs argparse.
+    import argparse  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(
+        description="Print the change log of a data folder.")
+    parser.add_argument("--data", type=Path, default=Path("data"),
+                        help="data folder (default: data)")
+    parser.add_argument("--enable", action="store_true",
+                        help="start logging changes to this folder")
+    parser.add_argument("--since", type=int, default=0,
+                        help="print events after this sequence number")
+    parser.add_argument("--follow", action="store_true",
+                        help="keep waiting for new events")
+    parser.add_argument("--prune", type=int, metavar="SEQ",
+                        help="delete segments holding only older events")
+    args = parser.parse_args(argv)
+
+    log = enable(args.data) if args.enable else log_for(args.data)
+    if log is None:
+        parser.error(f"{args.data} has no change log; use --enable")
+    if args.prune is not None:
+        print(f"{log.prune(args.prune)} segments removed")
+        return
+
+    events = log.tail(args.since) if args.follow else log.read(args.since)
+    for event in events:
+        print(json.dumps(event.to_dict()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Columnar collections module"""
+
+import datetime
+from array import array
+
+from app.hotel import Hotel
+from app.inventory import night
+from app.reservation import Reservation
+
+STATUS_CODES = {Reservation.STATUS_ACTIVE: 0, Reservation.STATUS_CANCELLED: 1}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+
+class HotelColumns:
+    """
+    Hotels stored column by column for bulk scans.
+
+    Room counts live in ``array('i')`` columns, so scanning them touches
+    a few bytes per hotel instead of a full Python object.
+    """
+
+    def __init__(self):
+        self.hotel_ids = []
+        self.hotel_names = []
+        self.total_rooms = array("i")
+        self.available_rooms = array("i")
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.hotel_ids)
+
+    @classmethod
+    def from_entities(cls, hotels):
+        """Build the columns from an iterable of hotels."""
+        columns = cls()
+        for hotel in hotels:
+            columns.append(hotel)
+        return columns
+
+    @classmethod
+    def load(cls):
+        """Stream every stored hotel into columns."""
+        return cls.from_entities(Hotel.iter_all())
+
+    def append(self, hotel):
+        """Add one hotel as a new row."""
+        self.rows[hotel.hotel_id] = len(self.hotel_ids)
+        self.hotel_ids.append(hotel.hotel_id)
+        self.hotel_names.append(hotel.hotel_name)
+        self.total_rooms.append(hotel.total_rooms)
+        self.available_rooms.append(hotel.available_rooms)
+
+    def row(self, hotel_id):
+        """Return the hotel stored under ``hotel_id``."""
+        row = self.rows[hotel_id]
+        return Hotel(self.hotel_ids[row], self.hotel_names[row],
+                     self.total_rooms[row], self.available_rooms[row])
+
+    def with_free_rooms(self, minimum):
+        """Return the ids of hotels with at least ``minimum`` free rooms."""
+        return [hotel_id for hotel_id, free
+                in zip(self.hotel_ids, self.available_rooms)
+                if free >= minimum]
+
+
+class ReservationColumns:
+    """
+    Reservations stored column by column with status codes.
+
+    Stay dates are day ordinals, 0 for undated reservations.
+    """
+
+    def __init__(self):
+        self.reservation_ids = []
+        self.hotel_ids = []
+        self.customer_ids = []
+        self.status_codes = array("b")
+        self.check_ins = array("i")
+        self.check_outs = array("i")
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.reservation_ids)
+
+    @classmethod
+    def from_entities(cls, reservations):
+        """Build the columns from an iterable of reservations."""
+        columns = cls()
+        for reservation in reservations:
+            columns.append(reservation)
+        return columns
+
+    @classmethod
+    def load(cls):
+        """Stream every stored reservation into columns."""
+        return cls.from_entities(Reservation.iter_all())
+
+    def append(self, reservation):
+        """Add one reservation as a new row."""
+        self.rows[reservation.reservation_id] = len(self.reservation_ids)
+        self.reservation_ids.append(reservation.reservation_id)
+        self.hotel_ids.append(reservation.hotel_id)
+        self.customer_ids.append(reservation.customer_id)
+        self.status_codes.append(STATUS_CODES[reservation.status])
+        if reservation.check_in is None:
+            self.check_ins.append(0)
+            self.check_outs.append(0)
+        else:
+            self.check_ins.append(night(reservation.check_in))
+            self.check_outs.append(night(reservation.check_out))
+
+    def row(self, reservation_id):
+        """Return the reservation stored under ``reservation_id``."""
+        row = self.rows[reservation_id]
+        dates = (None, None)
+        if self.check_ins[row]:
+            dates = (datetime.date.fromordinal(self.check_ins[row]),
+                     datetime.date.fromordinal(self.check_outs[row]))
+        return Reservation(self.reservation_ids[row], self.hotel_ids[row],
+                           self.customer_ids[row],
+                           STATUS_NAMES[self.status_codes[row]], *dates)
+
+    def count(self, status):
+        """Return how many reservations have the given status."""
+        return self.status_codes.count(STATUS_CODES[status])
@@ -0,0 +1,394 @@
+"""Memory-mapped counter storage module"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from app import storage
+from app.locking import lock_for
+from app.storage import (
+    OP_CREATE,
+    OP_DELETE,
+    OP_UPDATE,
+    CorruptFileError,
+    JournalStorage,
+)
+
+MAGIC = b"CNTRS001"
+# Magic, change sequence, layout version.
+_HEADER = struct.Struct("<8sQQ")
+
+
+def counters_path(path):
+    """Return the counter file kept next to the data file ``path``."""
+    path = Path(path)
+    return path.with_name(path.name + ".counters")
+
+
+class CounterStorage(JournalStorage):
+    """
+    Journal storage whose integer ``counter_fields`` live in fixed-width
+    slots of a memory-mapped file, one slot per record.
+
+    Each slot holds the sequence number of its last change, the
+    counters, a crc32 of the other fields and the key. An id -> slot
+    index is built by scanning the slots and rebuilt only when a slot
+    is claimed or freed. ``adjust`` changes one counter in place, and a
+    modification that leaves every other field unchanged only rewrites
+    its slot, so neither parses nor writes any other record. Slot
+    values take precedence over the counters in the JSON records.
+
+    Keys are strings of 1 to ``key_bytes`` UTF-8 bytes. Every process
+    maps the same file; writers hold the store's file
+    lock, and readers see each 8-byte field whole. Like journal appends,
+    slot writes are synced as storage.DURABILITY says. ``changes_since``
+    reports in-place changes as OP_UPDATE operations found through the
+    slot sequence numbers, so other processes refresh without reloading.
+    """
+
+    counter_fields = ()
+    key_bytes = 64
+    initial_slots = 64
+
+    def __init__(self, path, key_field, fields=(), indexes=(),
+                 data_format=None):
+        super().__init__(path, key_field, fields, indexes, data_format)
+        self.counters_path = counters_path(self.path)
+        self._lock = lock_for(self.path)
+        self._slot = struct.Struct(
+            f"<Q{len(self.counter_fields)}qI4x{self.key_bytes}s")
+        # The key alone, read across a whole slot.
+        self._slot_key = struct.Struct(
+            f"<{self._slot.size - self.key_bytes}x{self.key_bytes}s")
+        self._map = None
+        self._inode = None
+        self._layout = None
+        self._slots = {}
+        self._free = []
+
+    def load(self):
+        """Return every record with its counters read from the slots."""
+        records = super().load()
+        if self._mapped() is None:
+            self._build(records)
+        return self._overlay(records)
+
+    def iter_records(self):
+        """Yield records one at a time with their current counters."""
+        if self._mapped() is None:
+            yield from self.load()
+            return
+        for record in super().iter_records():
+            yield self._overlay_one(record)
+
+    def stamp(self):
+        """
+        Return a fingerprint covering the journal and the counters,
+        creating the counter file on first use.
+        """
+        data = self._mapped()
+        if data is None:
+            self._build(super().load())
+            data = self._map
+        return super().stamp(), (self._inode, _HEADER.unpack_from(data)[1])
+
+    def save(self, records):
+        """Write a fresh snapshot and a counter file matching it."""
+        records = list(records)
+        with self._lock:
+            temp = self._write_counters(records)
+            super().save(records)
+            os.replace(temp, self.counters_path)
+            self._close()
+
+    def apply(self, ops):
+        """
+        Persist (op, key, record) operations. Changes to the counters
+        alone only rewrite slots; everything else is journaled first and
+        then mirrored into the slots.
+        """
+        with self._lock:
+            if self._mapped() is None:
+                self._build(super().load())
+
+            journaled, slotted = [], []
+            for op, key, record in ops:
+                if op == OP_DELETE:
+                    journaled.append((op, key, record))
+                    slotted.append((key, None, None))
+                    continue
+                self._encode_key(key)
+                signature = self._signature(record)
+                slot = self._slots.get(key)
+                if (op == OP_CREATE or slot is None or
+                        self._read(slot)[2] != signature):
+                    journaled.append((op, key, record))
+                slotted.append((key, record, signature))
+
+            appended = self._append(journaled)
+            for key, record, signature in slotted:
+                if record is None:
+                    self._release(key)
+                else:
+                    self._store(key, record, signature)
+            if slotted:
+                storage.sync_mapped(self._map, self.counters_path)
+
+            if appended and self._needs_compaction():
+                self.compact()
+
+    def adjust(self, key, field, delta, minimum=None, maximum_field=None):
+        """
+        Add ``delta`` to a counter in place if the result stays within
+        [minimum, maximum_field].
+
+        Returns the record's counters, None if ``key`` has no record, or
+        False if the new value would leave the bounds.
+        """
+        if field not in self.counter_fields:
+            raise ValueError(f"{field} is not a counter field")
+        with self._lock:
+            if self._mapped() is None:
+                self._build(super().load())
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+
+            values = dict(zip(self.counter_fields, self._read(slot)[1]))
+            value = values[field] + delta
+            if ((minimum is not None and value < minimum) or
+                    (maximum_field is not None and
+                     value > values[maximum_field])):
+                return False
+
+            values[field] = value
+            self._write_values(slot, values)
+            storage.sync_mapped(self._map, self.counters_path)
+            return values
+
+    def changes_since(self, old_stamp, new_stamp):
+        """
+        Return the journal entries plus an OP_UPDATE for every slot
+        changed between two stamps.
+        """
+        if old_stamp is None or new_stamp is None:
+            return None
+        old_base, old_counters = old_stamp
+        new_base, new_counters = new_stamp
+
+        ops = []
+        if old_base != new_base:
+            ops = super().changes_since(old_base, new_base)
+            if ops is None:
+                return None
+        if old_counters == new_counters:
+            return ops
+        if old_counters is None and new_counters is not None:
+            # Built from the records since: its slots start at zero.
+            old_counters = new_counters[0], 0
+        if (new_counters is None or old_counters[0] != new_counters[0] or
+                new_counters[1] < old_counters[1]):
+            return None
+
+        data = self._mapped()
+        if data is None or self._inode != new_counters[0]:
+            return None
+        since = old_counters[1]
+        size = self._slot.size
+        for offset in range(_HEADER.size, len(data), size):
+            sequence, values, _, key = self._unpack(data, offset)
+            if sequence > since and key:
+                ops.append((OP_UPDATE, key,
+                            dict(zip(self.counter_fields, values))))
+        return ops
+
+    def _overlay(self, records):
+        """Replace the counters of raw records with their slot values."""
+        return [self._overlay_one(record) for record in records]
+
+    def _overlay_one(self, record):
+        """Return ``record`` with the counters of its slot, if it has one."""
+        if not isinstance(record, dict):
+            return record
+        slot = self._slots.get(record.get(self.key_field))
+        if slot is not None:
+            record.update(zip(self.counter_fields, self._read(slot)[1]))
+        return record
+
+    def _signature(self, record):
+        """Return the crc32 of every field of ``record`` but the counters."""
+        rest = {field: value for field, value in record.items()
+                if field not in self.counter_fields}
+        return zlib.crc32(json.dumps(rest, sort_keys=True).encode("utf-8"))
+
+    def _encode_key(self, key):
+        """
+        Return ``key`` as the fixed-width bytes of a slot. Keys must be
+        strings: the slot index is rebuilt from the decoded bytes, so
+        any other type would not be found again.
+        """
+        if not isinstance(key, str):
+            raise ValueError(f"{self.key_field} must be a string")
+        encoded = key.encode("utf-8")
+        if not encoded or len(encoded) > self.key_bytes:
+            raise ValueError(
+                f"{self.key_field} must be 1 to {self.key_bytes} bytes")
+        return encoded
+
+    def _unpack(self, data, offset):
+        """Return (sequence, counters, signature, key) of one slot."""
+        fields = self._slot.unpack_from(data, offset)
+        count = len(self.counter_fields)
+        return (fields[0], fields[1:1 + count], fields[1 + count],
+                fields[-1].rstrip(b"\0").decode("utf-8"))
+
+    def _read(self, slot):
+        """Return (sequence, counters, signature, key) of slot ``slot``."""
+        return self._unpack(self._map, _HEADER.size + slot * self._slot.size)
+
+    def _pack_slot(self, slot, *fields):
+        """
+        Write ``fields`` to a slot under the next change sequence, then
+        publish that sequence in the header. Readers take stamps without
+        the lock, so a stamp never covers a slot not yet written.
+        """
+        magic, sequence, layout = _HEADER.unpack_from(self._map)
+        self._slot.pack_into(self._map, _HEADER.size + slot * self._slot.size,
+                             sequence + 1, *fields)
+        _HEADER.pack_into(self._map, 0, magic, sequence + 1, layout)
+
+    def _write_values(self, slot, values):
+        """Set the counters of a slot, keeping its key and signature."""
+        _, _, signature, key = self._read(slot)
+        self._write(slot, key.encode("utf-8"), values, signature)
+
+    def _write(self, slot, key, values, signature):
+        """Write a whole slot under a new sequence number."""
+        self._pack_slot(
+            slot, *(values[field] for field in self.counter_fields),
+            signature, key)
+
+    def _store(self, key, record, signature):
+        """Write a record's counters to its slot, claiming one if needed."""
+        encoded = self._encode_key(key)
+        slot = self._slots.get(key)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[key] = slot
+            self._bump_layout()
+        self._write(slot, encoded, record, signature)
+
+    def _release(self, key):
+        """Free the slot of a deleted record."""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._pack_slot(slot, *(0 for _ in self.counter_fields), 0, b"")
+        self._free.append(slot)
+        self._bump_layout()
+
+    def _bump_layout(self):
+        """Tell other processes to rebuild their slot index."""
+        magic, sequence, layout = _HEADER.unpack_from(self._map)
+        _HEADER.pack_into(self._map, 0, magic, sequence, layout + 1)
+        self._layout = layout + 1
+
+    def _grow(self):
+        """Double the slot count; the caller holds the lock."""
+        slots = (len(self._map) - _HEADER.size) // self._slot.size
+        os.truncate(self.counters_path, _HEADER.size +
+                    max(slots * 2, self.initial_slots) * self._slot.size)
+        self._bump_layout()
+        self._layout = None
+        self._mapped()
+
+    def _write_counters(self, records):
+        """Write a counter file for ``records`` next to the real one."""
+        capacity = max(self.initial_slots, 2 * len(records))
+        data = bytearray(_HEADER.size + capacity * self._slot.size)
+        _HEADER.pack_into(data, 0, MAGIC, 0, 0)
+        slot = 0
+        for record in records:
+            if not isinstance(record, dict) or self.key_field not in record:
+                continue
+            try:
+                self._slot.pack_into(
+                    data, _HEADER.size + slot * self._slot.size, 0,
+                    *(record[field] for field in self.counter_fields),
+                    self._signature(record),
+                    self._encode_key(record[self.key_field]))
+            except (KeyError, TypeError, ValueError, struct.error):
+                print(f"Invalid record skipped: {record}")
+                continue
+            slot += 1
+
+        temp = self.counters_path.with_name(
+            f".{self.counters_path.name}.{os.getpid()}.tmp")
+        temp.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp, "wb") as file:
+            file.write(data)
+            if storage.DURABILITY != storage.DURABILITY_NONE:
+                file.flush()
+                os.fsync(file.fileno())
+        return temp
+
+    def _build(self, records):
+        """Create the counter file from ``records`` if it is missing."""
+        with self._lock:
+            if self._mapped() is None:
+                os.replace(self._write_counters(records), self.counters_path)
+        self._mapped()
+
+    def _mapped(self):
+        """
+        Return the mapping of the counter file, or None if there is none,
+        remapping after the file was replaced or grown and re-reading
+        the slot index after its layout changed.
+        """
+        try:
+            stat = os.stat(self.counters_path)
+        except FileNotFoundError:
+            self._close()
+            return None
+
+        if (self._map is None or stat.st_ino != self._inode or
+                stat.st_size != len(self._map)):
+            self._close()
+            with open(self.counters_path, "r+b") as file:
+                self._map = mmap.mmap(file.fileno(), 0)
+            self._inode = stat.st_ino
+            if _HEADER.unpack_from(self._map)[0] != MAGIC:
+                self._close()
+                raise CorruptFileError(
+                    f"{self.counters_path} is not a counter file")
+
+        layout = _HEADER.unpack_from(self._map)[2]
+        if layout != self._layout:
+            self._scan()
+            self._layout = layout
+        return self._map
+
+    def _scan(self):
+        """Rebuild the key -> slot index and the free slot list."""
+        self._slots, self._free = {}, []
+        for slot, (key,) in enumerate(
+                self._slot_key.iter_unpack(self._map[_HEADER.size:])):
+            if key[0]:
+                self._slots[key.rstrip(b"\0").decode("utf-8")] = slot
+            else:
+                self._free.append(slot)
+        self._free.reverse()
+
+    def _close(self):
+        """Drop the current mapping."""
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._inode = None
+        self._layout = None
+        self._slots, self._free = {}, []
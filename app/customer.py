@@ -1,14 +1,28 @@
 """Customer module"""
 # pylint: disable=duplicate-code
 
-import json
 from pathlib import Path
 
+from app import bulk, metrics
+from app.repository import iter_entities, repository_for
+from app.storage import (
+    JournalStorage,
+    OP_CREATE,
+    OP_DELETE,
+    OP_MODIFY,
+    write_json_lines,
+)
+
 
 class Customer:
     """Customer Module takes data from JSON file"""
 
     file_path = Path(r"A00828432_6.2\data\customers.json")
+    storage_class = JournalStorage
+    key_field = "customer_id"
+    fields = ("customer_id", "customer_name")
+
+    __slots__ = fields
 
     def __init__(self, customer_id, customer_name):
         if not customer_id:
@@ -35,92 +49,114 @@ class Customer:
         )
 
     @classmethod
+    def _repository(cls, transaction=None):
+        """Return the repository, or its view inside ``transaction``."""
+        if transaction is not None:
+            return transaction.view(cls)
+        return repository_for(cls)
+
+    @classmethod
+    def _storage(cls):
+        """Return the storage backend bound to the current file_path."""
+        return cls._repository().storage
+
+    @classmethod
+    @metrics.timed("customer.load_all")
     def _load_all(cls):
         """Load all Hotel information from JSON file"""
-        if not cls.file_path.exists():
-            return []
-
-        try:
-            with open(cls.file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-        except json.JSONDecodeError:
-            print("Invalid JSON file")
-            return []
-
-        customers = []
-        for item in data:
-            try:
-                customers.append(cls.from_dict(item))
-            except (KeyError, TypeError, ValueError):
-                print(f"Invalid record skipped: {item}")
-        return customers
+        return cls._repository().all()
 
     @classmethod
+    @metrics.timed("customer.save_all")
     def _save_all(cls, customers):
         """Save all customers to JSON file."""
-        cls.file_path.parent.mkdir(parents=True,
-                                   exist_ok=True)
+        cls._repository().save(customers)
+
+    @classmethod
+    def iter_all(cls):
+        """Yield customers one at a time without loading the whole file."""
+        return iter_entities(cls._repository().iter_records(),
+                             cls.from_dict)
 
-        with open(cls.file_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [customer.to_dict() for customer in customers],
-                file,
-                indent=2,
-            )
+    @classmethod
+    def export_json_lines(cls, path):
+        """Stream every customer to a JSON Lines file in constant memory."""
+        write_json_lines(
+            path, (customer.to_dict() for customer in cls.iter_all())
+        )
 
     @classmethod
+    @metrics.timed("customer.create_customer")
     def create_customer(cls, customer):
         """Create a customer and persist it."""
-        customers = cls._load_all()
+        repository = cls._repository()
 
-        if any(c.customer_id == customer.customer_id for c in customers):
-            raise ValueError("Customer already exists")
+        with repository.lock:
+            if repository.exists(customer.customer_id):
+                raise ValueError("Customer already exists")
 
-        customers.append(customer)
-        cls._save_all(customers)
+            repository.apply([(OP_CREATE, customer.customer_id, customer)])
 
     @classmethod
+    @metrics.timed("customer.bulk_create")
+    def bulk_create(cls, records):
+        """Create many customers from entities or dicts with one write."""
+        return bulk.bulk_create(cls, cls._repository(), records,
+                                "Customer already exists")
+
+    @classmethod
+    @metrics.timed("customer.bulk_delete")
+    def bulk_delete(cls, customer_ids):
+        """Delete many customers by id with one write."""
+        return bulk.bulk_delete(cls._repository(), customer_ids,
+                                "Customer not found")
+
+    @classmethod
+    @metrics.timed("customer.bulk_modify")
+    def bulk_modify(cls, records):
+        """Apply partial updates keyed by customer_id with one write."""
+        return bulk.bulk_modify(cls, cls._repository(), records,
+                                "Customer not found")
+
+    @classmethod
+    @metrics.timed("customer.delete_customer")
     def delete_customer(cls, customer_id):
         """Delete a customer by id."""
-        customers = cls._load_all()
-        filtered = [c for c in customers if c.customer_id != customer_id]
+        repository = cls._repository()
 
-        if len(filtered) == len(customers):
-            raise KeyError("Customer not found")
+        with repository.lock:
+            if not repository.exists(customer_id):
+                raise KeyError("Customer not found")
 
-        cls._save_all(filtered)
+            repository.apply([(OP_DELETE, customer_id, None)])
 
     @classmethod
-    def display_customer_info(cls, customer_id):
+    @metrics.timed("customer.display_customer_info")
+    def display_customer_info(cls, customer_id, transaction=None):
         """Return a customer by id."""
-        customers = cls._load_all()
+        customer = cls._repository(transaction).get(customer_id)
 
-        for customer in customers:
-            if customer.customer_id == customer_id:
-                return customer
+        if customer is None:
+            raise KeyError("Customer not found")
 
-        raise KeyError("Customer not found")
+        return customer
 
     @classmethod
+    @metrics.timed("customer.modify_customer_info")
     def modify_customer_info(cls, customer_id, **kwargs):
         """Modify fields of an existing customer."""
-        customers = cls._load_all()
-        found = False
+        repository = cls._repository()
 
-        for customer in customers:
-            if customer.customer_id == customer_id:
-                for key, value in kwargs.items():
-                    if hasattr(customer, key):
-                        setattr(customer, key, value)
+        with repository.lock:
+            customer = cls.display_customer_info(customer_id)
 
-                if not customer.customer_id:
-                    raise ValueError("customer_id cannot be empty")
-                if not customer.customer_name:
-                    raise ValueError("customer_name cannot be empty")
+            for key, value in kwargs.items():
+                if hasattr(customer, key):
+                    setattr(customer, key, value)
 
-                found = True
-
-        if not found:
-            raise KeyError("Customer not found")
+            if not customer.customer_id:
+                raise ValueError("customer_id cannot be empty")
+            if not customer.customer_name:
+                raise ValueError("customer_name cannot be empty")
 
-        cls._save_all(customers)
+            repository.apply([(OP_MODIFY, customer_id, customer)])
@@ -1,19 +1,51 @@
 """Hotel module"""
 # pylint: disable=duplicate-code
 
-import json
+import functools
 from pathlib import Path
 
+from app import bulk, metrics
+from app.counter_storage import CounterStorage
+from app.repository import iter_entities, repository_for
+from app.search import search_index_for
+from app.storage import (
+    OP_CREATE,
+    OP_DELETE,
+    OP_MODIFY,
+    write_json_lines,
+)
+from app.transaction import run_with_retries
+
+
+class HotelStorage(CounterStorage):
+    """Hotel journal with both room counts in memory-mapped slots."""
+
+    counter_fields = ("total_rooms", "available_rooms")
+
 
 class Hotel:
     """This class represents a hotel and its operations"""
 
     file_path = Path(r"data\hotels.json")
+    storage_class = HotelStorage
+    key_field = "hotel_id"
+    fields = ("hotel_id", "hotel_name", "total_rooms", "available_rooms")
+    # Number of files the hotels are split across by hotel_id; change it
+    # together with Reservation.shards after running app.reshard.
+    shards = 1
+
+    __slots__ = fields
 
     def __init__(self, hotel_id, hotel_name,
                  total_rooms, available_rooms):
         if not hotel_id:
             raise ValueError("hotel_id is empty")
+        if not isinstance(hotel_id, str):
+            raise ValueError("hotel_id must be a string")
+        if len(hotel_id.encode("utf-8")) > HotelStorage.key_bytes:
+            # Room counts live in slots of this many bytes per id.
+            raise ValueError(
+                f"hotel_id is longer than {HotelStorage.key_bytes} bytes")
         if not hotel_name:
             raise ValueError("hotel_id is empty")
         if not total_rooms:
@@ -48,133 +80,195 @@ class Hotel:
         )
 
     @classmethod
-    def _load_all(cls):
-        """Load all Hotel information from JSON file"""
-        if not cls.file_path.exists():
-            return []
+    def _repository(cls, transaction=None, hotel_id=None):
+        """
+        Return the repository, or its view inside ``transaction``; with
+        ``hotel_id``, only the shard holding that hotel.
+        """
+        if transaction is not None:
+            return transaction.view(cls)
+        return repository_for(cls, hotel_id)
 
-        try:
-            with open(cls.file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-        except json.JSONDecodeError:
-            print("Invalid JSON file")
-            return []
-
-        if not isinstance(data, list):
-            print("Invalid JSON structure: expected a list")
-            return []
+    @classmethod
+    def _storage(cls):
+        """Return the storage backend bound to the current file_path."""
+        return cls._repository().storage
 
-        hotels = []
-        for item in data:
-            try:
-                hotels.append(cls.from_dict(item))
-            except (KeyError, TypeError, ValueError):
-                print(f"Invalid record skipped: {item}")
-        return hotels
+    @classmethod
+    @metrics.timed("hotel.load_all")
+    def _load_all(cls):
+        """Load all Hotel information from JSON file"""
+        return cls._repository().all()
 
     @classmethod
+    @metrics.timed("hotel.save_all")
     def _save_all(cls, hotels):
         """Save all hotels to JSON file."""
-        cls.file_path.parent.mkdir(parents=True, exist_ok=True)
+        cls._repository().save(hotels)
 
-        with open(cls.file_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [hotel.to_dict() for hotel in hotels],
-                file,
-                indent=2,
-            )
+    @classmethod
+    def iter_all(cls):
+        """Yield hotels one at a time without loading the whole file."""
+        return iter_entities(cls._repository().iter_records(),
+                             cls.from_dict)
 
     @classmethod
+    def export_json_lines(cls, path):
+        """Stream every hotel to a JSON Lines file in constant memory."""
+        write_json_lines(
+            path, (hotel.to_dict() for hotel in cls.iter_all())
+        )
+
+    @classmethod
+    @metrics.timed("hotel.create_hotel")
     def create_hotel(cls, hotel):
         """Creates new hotel register."""
-        hotels = cls._load_all()
+        repository = cls._repository(hotel_id=hotel.hotel_id)
 
-        if any(h.hotel_id == hotel.hotel_id for h in hotels):
-            raise ValueError("Hotel already exists")
+        with repository.lock:
+            if repository.exists(hotel.hotel_id):
+                raise ValueError("Hotel already exists")
+
+            repository.apply([(OP_CREATE, hotel.hotel_id, hotel)])
 
-        hotels.append(hotel)
-        cls._save_all(hotels)
+    @classmethod
+    @metrics.timed("hotel.bulk_create")
+    def bulk_create(cls, records):
+        """Create many hotels from entities or dicts with one write."""
+        return bulk.bulk_create(cls, cls._repository(), records,
+                                "Hotel already exists")
+
+    @classmethod
+    @metrics.timed("hotel.bulk_delete")
+    def bulk_delete(cls, hotel_ids):
+        """Delete many hotels by id with one write."""
+        return bulk.bulk_delete(cls._repository(), hotel_ids,
+                                "Hotel not found")
+
+    @classmethod
+    @metrics.timed("hotel.bulk_modify")
+    def bulk_modify(cls, records):
+        """Apply partial updates keyed by hotel_id with one write."""
+        return bulk.bulk_modify(cls, cls._repository(), records,
+                                "Hotel not found")
 
     @classmethod
+    @metrics.timed("hotel.delete_hotel")
     def delete_hotel(cls, hotel_id):
         """Deletes existing hotel register"""
-        hotels = cls._load_all()
+        repository = cls._repository(hotel_id=hotel_id)
 
-        filtered = [h for h in hotels if h.hotel_id != hotel_id]
+        with repository.lock:
+            if not repository.exists(hotel_id):
+                raise KeyError("Hotel not found")
 
-        if len(filtered) == len(hotels):
-            raise KeyError("Hotel not found")
-
-        cls._save_all(filtered)
+            repository.apply([(OP_DELETE, hotel_id, None)])
 
     @classmethod
-    def display_hotel_info(cls, hotel_id):
+    @metrics.timed("hotel.display_hotel_info")
+    def display_hotel_info(cls, hotel_id, transaction=None):
         """Displays information from a selected hotel"""
-        hotels = cls._load_all()
+        hotel = cls._repository(transaction, hotel_id).get(hotel_id)
 
-        for hotel in hotels:
-            if hotel.hotel_id == hotel_id:
-                return hotel
+        if hotel is None:
+            raise KeyError("Hotel not found")
 
-        raise KeyError("Hotel not found")
+        return hotel
 
     @classmethod
-    def modify_hotel_info(cls, hotel_id, **kwargs):
-        """Modifies information from a selected hotel"""
-        hotels = cls._load_all()
-        found = False
-
-        for hotel in hotels:
-            if hotel.hotel_id == hotel_id:
+    @metrics.timed("hotel.search")
+    def search(cls, min_free_rooms=None, name_prefix=None,
+               min_capacity=None, max_capacity=None, limit=None):
+        """
+        Return the hotels matching every given filter, ordered by id.
+
+        Answered from sorted indexes kept up to date by every write, so
+        no file is scanned.
+        """
+        repository = cls._repository()
+        hotel_ids = search_index_for(cls).search(
+            min_free_rooms=min_free_rooms, name_prefix=name_prefix,
+            min_capacity=min_capacity, max_capacity=max_capacity,
+            limit=limit,
+        )
+        hotels = (repository.get(hotel_id) for hotel_id in hotel_ids)
+        return [hotel for hotel in hotels if hotel is not None]
 
-                # actualizar solo atributos existentes
-                for key, value in kwargs.items():
-                    if hasattr(hotel, key):
-                        setattr(hotel, key, value)
+    @classmethod
+    @metrics.timed("hotel.modify_hotel_info")
+    def modify_hotel_info(cls, hotel_id, /, **kwargs):
+        """
+        Modifies information from a selected hotel. A new hotel_id, given
+        as a keyword, must be free; it may move the hotel to another
+        shard, so the change runs in a transaction.
+        """
+        # app.reservation imports this module.
+        # pylint: disable-next=import-outside-toplevel
+        from app.reservation import Reservation
+        run_with_retries(Reservation.transaction, functools.partial(
+            cls._modify_hotel_info, hotel_id, kwargs))
 
-                # validar coherencia después de cambios
-                if hotel.total_rooms <= 0:
-                    raise ValueError("total_rooms must be positive")
+    @classmethod
+    def _modify_hotel_info(cls, hotel_id, changes, transaction):
+        """Stage the changes to one hotel inside ``transaction``."""
+        hotel = cls.display_hotel_info(hotel_id, transaction)
 
-                if (hotel.available_rooms < 0 or
-                        hotel.available_rooms > hotel.total_rooms):
-                    raise ValueError("Invalid available_rooms value")
+        # actualizar solo atributos existentes
+        for key, value in changes.items():
+            if hasattr(hotel, key):
+                setattr(hotel, key, value)
 
-                found = True
+        # validar coherencia después de cambios
+        if hotel.total_rooms <= 0:
+            raise ValueError("total_rooms must be positive")
 
-        if not found:
-            raise KeyError("Hotel not found")
+        if (hotel.available_rooms < 0 or
+                hotel.available_rooms > hotel.total_rooms):
+            raise ValueError("Invalid available_rooms value")
 
-        cls._save_all(hotels)
+        repository = cls._repository(transaction)
+        if hotel.hotel_id != hotel_id and repository.exists(hotel.hotel_id):
+            raise ValueError("Hotel already exists")
+        repository.apply([(OP_MODIFY, hotel_id, hotel)])
 
     @classmethod
-    def reserve_room(cls, hotel_id):
+    @metrics.timed("hotel.reserve_room")
+    def reserve_room(cls, hotel_id, transaction=None):
         """Creates a reservation for a selected hotel"""
-        hotels = cls._load_all()
+        if transaction is None:
+            hotel = cls._repository(hotel_id=hotel_id).adjust(
+                hotel_id, "available_rooms", -1, minimum=0)
+            if hotel is None:
+                raise KeyError("Hotel not found")
+            if hotel is False:
+                raise ValueError("No available rooms")
+            return
 
-        for hotel in hotels:
-            if hotel.hotel_id == hotel_id:
-                if hotel.available_rooms <= 0:
-                    raise ValueError("No available rooms")
+        hotel = cls.display_hotel_info(hotel_id, transaction)
 
-                hotel.available_rooms -= 1
-                cls._save_all(hotels)
-                return
+        if hotel.available_rooms <= 0:
+            raise ValueError("No available rooms")
 
-        raise KeyError("Hotel not found")
+        hotel.available_rooms -= 1
+        cls._repository(transaction).apply([(OP_MODIFY, hotel_id, hotel)])
 
     @classmethod
-    def cancel_reservation(cls, hotel_id):
+    @metrics.timed("hotel.cancel_reservation")
+    def cancel_reservation(cls, hotel_id, transaction=None):
         """Cancels a reservation for a selected hotel"""
-        hotels = cls._load_all()
-
-        for hotel in hotels:
-            if hotel.hotel_id == hotel_id:
-                if hotel.available_rooms >= hotel.total_rooms:
-                    raise ValueError("All rooms already available")
-
-                hotel.available_rooms += 1
-                cls._save_all(hotels)
-                return
-
-        raise KeyError("Hotel not found")
+        if transaction is None:
+            hotel = cls._repository(hotel_id=hotel_id).adjust(
+                hotel_id, "available_rooms", 1, maximum_field="total_rooms")
+            if hotel is None:
+                raise KeyError("Hotel not found")
+            if hotel is False:
+                raise ValueError("All rooms already available")
+            return
+
+        hotel = cls.display_hotel_info(hotel_id, transaction)
+
+        if hotel.available_rooms >= hotel.total_rooms:
+            raise ValueError("All rooms already available")
+
+        hotel.available_rooms += 1
+        cls._repository(transaction).apply([(OP_MODIFY, hotel_id, hotel)])
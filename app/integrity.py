@@ -0,0 +1,357 @@
+"""Hotel and reservation integrity module"""
+
+import argparse
+import functools
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+from app.sharding import partitions
+from app.storage import OP_DELETE, OP_MODIFY, read_verified, replace_file
+from app.transaction import run_with_retries
+
+ENTITY_CLASSES = (Hotel, Customer, Reservation)
+RESERVATION_FIELDS = ("reservation_id", "hotel_id", "customer_id")
+
+
+class IntegrityReport:
+    """
+    Inconsistencies found by a check.
+
+    ``availability`` lists (hotel_id, stored, expected) for hotels whose
+    available_rooms differ from total_rooms minus their active undated
+    reservations. ``orphans`` lists (reservation_id, field) for active
+    reservations whose hotel_id or customer_id names nothing.
+    """
+
+    def __init__(self, incremental=False):
+        self.incremental = incremental
+        self.availability = []
+        self.orphans = []
+        self.repaired = 0
+
+    @property
+    def ok(self):
+        """True when nothing inconsistent was found."""
+        return not self.availability and not self.orphans
+
+    def to_dict(self):
+        """Convert the report to a JSON-ready dictionary."""
+        return {
+            "incremental": self.incremental,
+            "availability": [list(item) for item in self.availability],
+            "orphans": [list(item) for item in self.orphans],
+            "repaired": self.repaired,
+        }
+
+
+def _is_valid(record, *fields):
+    """
+    Return True if the raw ``record`` is a dict naming every one of
+    ``fields``, reporting it otherwise.
+    """
+    try:
+        if any(record[field] is None for field in fields):
+            raise ValueError("missing id")
+        return True
+    except (KeyError, TypeError, ValueError):
+        print(f"Invalid record skipped: {record}")
+        return False
+
+
+def _records(entity_cls, *fields):
+    """
+    Stream the raw records of every shard of ``entity_cls`` that name
+    all of ``fields``.
+    """
+    for repository in partitions(repository_for(entity_cls)):
+        for record in repository.iter_records():
+            if _is_valid(record, *fields):
+                yield record
+
+
+def _missing(reservation, hotel_exists, customer_exists):
+    """Return the field of ``reservation`` naming nothing, or None."""
+    if not hotel_exists(reservation["hotel_id"]):
+        return "hotel_id"
+    if not customer_exists(reservation["customer_id"]):
+        return "customer_id"
+    return None
+
+
+def _countable(hotel):
+    """
+    Return True if the room counts of a raw hotel can be checked,
+    reporting it otherwise. The hotel still exists for its reservations.
+    """
+    if (isinstance(hotel.get("total_rooms"), int) and
+            isinstance(hotel.get("available_rooms"), int)):
+        return True
+    print(f"Invalid record skipped: {hotel}")
+    return False
+
+
+def _active(reservation):
+    """Return True if the raw reservation is active."""
+    return (reservation.get("status", Reservation.STATUS_ACTIVE) ==
+            Reservation.STATUS_ACTIVE)
+
+
+def check(repair=False):
+    """
+    Check every hotel and reservation.
+
+    Hotels and customer ids are read first, then the reservations are
+    streamed once, counting the rooms held per hotel by active undated
+    reservations. Active reservations with a missing hotel or customer
+    are reported as orphans and hold no room; cancelled ones are kept
+    as history. With ``repair``, orphans are cancelled and then every
+    mismatched hotel is corrected.
+    """
+    hotels = {record["hotel_id"]: record
+              for record in _records(Hotel, "hotel_id")}
+    customers = {record["customer_id"]
+                 for record in _records(Customer, "customer_id")}
+
+    report = IntegrityReport()
+    held = Counter()
+    for reservation in _records(Reservation, *RESERVATION_FIELDS):
+        if not _active(reservation):
+            continue
+        missing = _missing(reservation, hotels.__contains__,
+                           customers.__contains__)
+        if missing is not None:
+            report.orphans.append((reservation["reservation_id"], missing))
+        elif reservation.get("check_in") is None:
+            held[reservation["hotel_id"]] += 1
+
+    for hotel_id, hotel in hotels.items():
+        if not _countable(hotel):
+            continue
+        expected = hotel["total_rooms"] - held.get(hotel_id, 0)
+        if hotel["available_rooms"] != expected:
+            report.availability.append(
+                (hotel_id, hotel["available_rooms"], expected))
+
+    if repair:
+        _repair(report)
+    return report
+
+
+def check_incremental(checkpoint=None, repair=False):
+    """
+    Check only what changed since the checkpoint, then move it forward.
+
+    The checkpoint records the storage stamp of every data file. The
+    journal entries written since then name the hotels to recount and
+    the reservations to look at; deleted hotels and customers bring in
+    the reservations that referenced them. Without a usable change log
+    (first run, compaction, a store without a journal, a deleted
+    reservation) a full check runs instead.
+    """
+    checkpoint = Path(checkpoint or default_checkpoint())
+    stamps = _stamps()
+    changes = _changes(_load_checkpoint(checkpoint), stamps)
+
+    if changes is None:
+        report = check(repair)
+    else:
+        report = _check_changes(*changes)
+        if repair:
+            _repair(report)
+
+    _save_checkpoint(checkpoint, stamps)
+    return report
+
+
+def default_checkpoint():
+    """Return the checkpoint file kept next to the reservations."""
+    return Path(Reservation.file_path).with_name("integrity.checkpoint.json")
+
+
+def _stamps():
+    """Return the current stamp of every data file by path."""
+    return {str(repository.storage.path): repository.storage.stamp()
+            for entity_cls in ENTITY_CLASSES
+            for repository in partitions(repository_for(entity_cls))}
+
+
+def _changes(saved, stamps):
+    """
+    Return (hotel ids, deleted hotel ids, deleted customer ids,
+    reservation records) changed between two sets of stamps, or None if
+    some store cannot tell.
+    """
+    hotel_ids, deleted_hotels, deleted_customers = set(), set(), set()
+    reservations = {}
+    for entity_cls in ENTITY_CLASSES:
+        for repository in partitions(repository_for(entity_cls)):
+            path = str(repository.storage.path)
+            if path not in saved:
+                return None
+            if saved[path] == stamps[path]:
+                continue
+            ops = repository.storage.changes_since(saved[path], stamps[path])
+            if ops is None:
+                return None
+
+            for op, key, record in ops:
+                if entity_cls is Hotel:
+                    hotel_ids.add(key)
+                    if op == OP_DELETE:
+                        deleted_hotels.add(key)
+                elif entity_cls is Customer:
+                    if op == OP_DELETE:
+                        deleted_customers.add(key)
+                elif op == OP_DELETE:
+                    return None
+                elif _is_valid(record, *RESERVATION_FIELDS):
+                    reservations[key] = record
+    return hotel_ids, deleted_hotels, deleted_customers, reservations
+
+
+def _check_changes(hotel_ids, deleted_hotels, deleted_customers,
+                   reservations):
+    """Check the hotels and reservations named by a change set."""
+    hotels = repository_for(Hotel)
+    customers = repository_for(Customer)
+    stored = repository_for(Reservation)
+
+    for hotel_id in deleted_hotels:
+        for reservation in stored.find(hotel_id=hotel_id):
+            reservations[reservation.reservation_id] = reservation.to_dict()
+    for customer_id in deleted_customers:
+        for reservation in stored.find(customer_id=customer_id):
+            reservations[reservation.reservation_id] = reservation.to_dict()
+
+    report = IntegrityReport(incremental=True)
+    for reservation_id, reservation in sorted(reservations.items()):
+        hotel_ids.add(reservation["hotel_id"])
+        if not _active(reservation):
+            continue
+        missing = _missing(reservation, hotels.exists, customers.exists)
+        if missing is not None:
+            report.orphans.append((reservation_id, missing))
+
+    for hotel_id in sorted(hotel_ids):
+        hotel = hotels.get(hotel_id)
+        if hotel is None:
+            continue
+        held = sum(1 for reservation in stored.find(
+            hotel_id=hotel_id, status=Reservation.STATUS_ACTIVE)
+            if reservation.check_in is None and
+            customers.exists(reservation.customer_id))
+        expected = hotel.total_rooms - held
+        if hotel.available_rooms != expected:
+            report.availability.append(
+                (hotel_id, hotel.available_rooms, expected))
+    return report
+
+
+def _repair(report):
+    """
+    Cancel the active orphans, then correct every hotel they or the
+    report name. Each fix re-reads its data in a transaction, so
+    concurrent bookings are never overwritten.
+    """
+    hotel_ids = {hotel_id for hotel_id, _, _ in report.availability}
+    for reservation_id, _ in report.orphans:
+        hotel_id = run_with_retries(
+            Reservation.transaction,
+            functools.partial(_cancel_orphan, reservation_id))
+        if hotel_id is not None:
+            report.repaired += 1
+            hotel_ids.add(hotel_id)
+
+    for hotel_id in sorted(hotel_ids):
+        if run_with_retries(Reservation.transaction,
+                            functools.partial(_fix_availability, hotel_id)):
+            report.repaired += 1
+
+
+def _cancel_orphan(reservation_id, transaction):
+    """Cancel a still-orphaned active reservation; return its hotel_id."""
+    view = transaction.view(Reservation)
+    reservation = view.get(reservation_id)
+    if (reservation is None or
+            reservation.status != Reservation.STATUS_ACTIVE or
+            _missing(reservation.to_dict(), transaction.view(Hotel).exists,
+                     transaction.view(Customer).exists) is None):
+        return None
+
+    reservation.status = Reservation.STATUS_CANCELLED
+    view.apply([(OP_MODIFY, reservation_id, reservation)])
+    return reservation.hotel_id
+
+
+def _fix_availability(hotel_id, transaction):
+    """Set available_rooms from the rooms held; return True if changed."""
+    hotel = transaction.view(Hotel).get(hotel_id)
+    if hotel is None:
+        return False
+
+    customers = transaction.view(Customer)
+    held = sum(1 for reservation in transaction.view(Reservation).find(
+        hotel_id=hotel_id, status=Reservation.STATUS_ACTIVE)
+        if reservation.check_in is None and
+        customers.exists(reservation.customer_id))
+    expected = max(hotel.total_rooms - held, 0)
+    if hotel.available_rooms == expected:
+        return False
+
+    hotel.available_rooms = expected
+    transaction.view(Hotel).apply([(OP_MODIFY, hotel_id, hotel)])
+    return True
+
+
+def _tuples(value):
+    """Turn the nested lists of a JSON-decoded stamp back into tuples."""
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+    return value
+
+
+def _load_checkpoint(path):
+    """Return the stamps saved by the last run, or an empty dict."""
+    try:
+        raw = read_verified(path)
+        if raw is None:
+            return {}
+        return {store: _tuples(stamp)
+                for store, stamp in json.loads(raw).items()}
+    except (ValueError, AttributeError):
+        return {}
+
+
+def _save_checkpoint(path, stamps):
+    """Write the stamps the next incremental run starts from."""
+    replace_file(path, [json.dumps(stamps).encode("utf-8")])
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.integrity``."""
+    parser = argparse.ArgumentParser(
+        description="Check hotels and reservations for inconsistencies.")
+    parser.add_argument("--repair", action="store_true",
+                        help="cancel orphans and correct available_rooms")
+    parser.add_argument("--incremental", action="store_true",
+                        help="check only what changed since the last run")
+    parser.add_argument("--checkpoint", type=Path,
+                        help="checkpoint file for --incremental")
+    args = parser.parse_args(argv)
+
+    if args.incremental:
+        report = check_incremental(args.checkpoint, args.repair)
+    else:
+        report = check(args.repair)
+    print(json.dumps(report.to_dict(), indent=2))
+    return 0 if report.ok or args.repair else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Per-night room inventory module"""
+
+import datetime
+import threading
+from array import array
+
+from app.repository import repository_for
+
+_INVENTORIES = {}
+_INVENTORIES_LOCK = threading.Lock()
+
+
+def inventory_for(hotel_cls, reservation_cls):
+    """
+    Return the room inventory kept in step with the repositories of
+    ``hotel_cls`` and ``reservation_cls``.
+    """
+    hotels = repository_for(hotel_cls)
+    reservations = repository_for(reservation_cls)
+    with _INVENTORIES_LOCK:
+        inventory = _INVENTORIES.get((hotels, reservations))
+        if inventory is None:
+            inventory = RoomInventory(reservation_cls.STATUS_ACTIVE)
+            hotels.add_listener(_Feed(inventory.reset_hotels,
+                                      inventory.update_hotel))
+            reservations.add_listener(_Feed(inventory.reset_reservations,
+                                            inventory.update_reservation))
+            _INVENTORIES[(hotels, reservations)] = inventory
+    return inventory
+
+
+def night(value):
+    """Return a date or ISO date string as a day ordinal."""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value)
+    return value.toordinal()
+
+
+def stay(check_in, check_out):
+    """Return the [first, last) night ordinals of a stay."""
+    first, last = night(check_in), night(check_out)
+    if last <= first:
+        raise ValueError("check_out must be after check_in")
+    return first, last
+
+
+class NightCounter:
+    """
+    Booked rooms per night for one hotel.
+
+    Counts live in an ``array('i')`` indexed from the first booked night
+    and grow as later nights are booked, so the busiest night of a range
+    is a ``max`` over an array slice, which runs in C.
+    """
+
+    def __init__(self):
+        self.base = None
+        self.counts = array("i")
+
+    def add(self, first, last, delta=1):
+        """Add ``delta`` booked rooms to the nights [first, last)."""
+        if self.base is None:
+            self.base = first
+        if first < self.base:
+            self.counts[0:0] = array("i", bytes(4 * (self.base - first)))
+            self.base = first
+        end = last - self.base
+        if end > len(self.counts):
+            self.counts.extend(array("i", bytes(4 * (end - len(self.counts)))))
+
+        for position in range(first - self.base, end):
+            self.counts[position] += delta
+
+    def peak(self, first=None, last=None):
+        """Return the most rooms booked on any night of [first, last)."""
+        if self.base is None:
+            return 0
+        start = 0 if first is None else max(first - self.base, 0)
+        end = len(self.counts) if last is None else last - self.base
+        if end <= start:
+            return 0
+        return max(self.counts[start:end], default=0)
+
+
+class _Feed:
+    """Passes one repository's cache events on to a RoomInventory."""
+
+    def __init__(self, reset, update):
+        self.reset = reset
+        self.update = update
+
+
+class RoomInventory:
+    """
+    Free rooms per hotel and night.
+
+    A hotel's ``available_rooms`` is its capacity for dated stays (rooms
+    held by undated reservations are already subtracted from it); the
+    rooms free on a night are that capacity minus the dated reservations
+    covering the night.
+
+    ``inventory_for`` keeps one up to date through repository listeners:
+    a write adjusts the capacity of one hotel or the nights of one
+    reservation instead of rebuilding the whole inventory.
+    """
+
+    def __init__(self, active_status=None):
+        self.active_status = active_status
+        self.capacity = {}
+        self.booked = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, hotels, reservations):
+        """Build the inventory from hotels and their active reservations."""
+        inventory = cls()
+        for hotel in hotels:
+            inventory.capacity[hotel.hotel_id] = hotel.available_rooms
+        for reservation in reservations:
+            inventory.book(reservation)
+        return inventory
+
+    def book(self, reservation, delta=1):
+        """Count a dated reservation; undated ones are ignored."""
+        if reservation.check_in is None:
+            return
+        counter = self.booked.get(reservation.hotel_id)
+        if counter is None:
+            counter = self.booked[reservation.hotel_id] = NightCounter()
+        counter.add(*stay(reservation.check_in, reservation.check_out),
+                    delta)
+
+    def reset_hotels(self, hotels):
+        """Take every hotel's capacity from ``hotels``."""
+        with self._lock:
+            self.capacity = {hotel.hotel_id: hotel.available_rooms
+                             for hotel in hotels}
+
+    def update_hotel(self, hotel_id, old, new):
+        """Follow one hotel being created, modified or deleted."""
+        # pylint: disable=unused-argument
+        with self._lock:
+            if new is None:
+                self.capacity.pop(hotel_id, None)
+            else:
+                self.capacity[hotel_id] = new.available_rooms
+
+    def reset_reservations(self, reservations):
+        """Count the nights of every active reservation again."""
+        with self._lock:
+            self.booked = {}
+            for reservation in reservations:
+                if reservation.status == self.active_status:
+                    self.book(reservation)
+
+    def update_reservation(self, reservation_id, old, new):
+        """Move the nights of one reservation that changed."""
+        # pylint: disable=unused-argument
+        with self._lock:
+            if old is not None and old.status == self.active_status:
+                self.book(old, -1)
+            if new is not None and new.status == self.active_status:
+                self.book(new)
+
+    def free_rooms(self, hotel_id, check_in, check_out):
+        """Return the rooms of a hotel free on every night of a stay."""
+        first, last = stay(check_in, check_out)
+        with self._lock:
+            return self._free(hotel_id, first, last)
+
+    def hotels_with_free_rooms(self, rooms, check_in, check_out):
+        """Return the ids of hotels with ``rooms`` free for a whole stay."""
+        first, last = stay(check_in, check_out)
+        with self._lock:
+            return [hotel_id for hotel_id in self.capacity
+                    if self._free(hotel_id, first, last) >= rooms]
+
+    def _free(self, hotel_id, first, last):
+        """Return the rooms free on every night of [first, last)."""
+        counter = self.booked.get(hotel_id)
+        booked = counter.peak(first, last) if counter is not None else 0
+        return self.capacity[hotel_id] - booked
@@ -0,0 +1,123 @@
+"""File locking module"""
+
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+# Serializes opening lock files, so threads racing to take a fresh lock
+# share one file descriptor and one thread lock.
+_OPEN_GUARD = threading.Lock()
+
+
+def _reset_guards():
+    """Replace the guards in a forked child; a parent thread may hold one."""
+    global _LOCKS_GUARD, _OPEN_GUARD  # pylint: disable=global-statement
+    _LOCKS_GUARD = threading.Lock()
+    _OPEN_GUARD = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_guards)
+
+
+def lock_for(path):
+    """Return the process-wide lock guarding the file at ``path``."""
+    path = Path(path)
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(path)
+        if lock is None:
+            lock = _LOCKS[path] = FileLock(path)
+        return lock
+
+
+class FileLock:
+    """
+    Re-entrant advisory lock on ``<path>.lock`` plus a generation counter.
+
+    The lock combines an in-process ``RLock`` with an exclusive ``flock``
+    so it serializes both threads and processes. The lock file holds a
+    64-bit generation number that writers bump on every change, giving
+    readers a version to compare against for optimistic concurrency.
+    Where ``fcntl`` is unavailable only threads are serialized.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).with_name(Path(path).name + ".lock")
+        self._thread_lock = threading.RLock()
+        self._io_lock = threading.Lock()
+        self._depth = 0
+        self._fd = None
+        self._pid = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
+
+    def acquire(self):
+        """Take the lock, blocking until it is available."""
+        self._check_pid()
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                fcntl.flock(self._fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        """Release one level of the lock."""
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fileno(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def generation(self):
+        """Return the current generation number."""
+        fd = self._fileno()
+        with self._io_lock:
+            os.lseek(fd, 0, os.SEEK_SET)
+            return int.from_bytes(os.read(fd, 8), "little")
+
+    def bump(self, count=1):
+        """Add ``count`` to the generation; call only under the lock."""
+        generation = self.generation() + count
+        fd = self._fileno()
+        with self._io_lock:
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, generation.to_bytes(8, "little"))
+        return generation
+
+    def _fileno(self):
+        """Return the lock file descriptor."""
+        self._check_pid()
+        return self._fd
+
+    def _check_pid(self):
+        """Open the lock file, or reopen it in a forked child."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with _OPEN_GUARD:
+            if self._pid == pid:
+                return
+            # A forked child must not share the parent's open file
+            # description, or both would hold the same flock.
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._thread_lock = threading.RLock()
+            self._io_lock = threading.Lock()
+            self._depth = 0
+            # Set last: other threads skip the guard once it matches.
+            self._pid = pid
@@ -0,0 +1,226 @@
+"""Instrumentation module"""
+
+import bisect
+import functools
+import threading
+import time
+from pathlib import Path
+
+# Checked on every instrumented call; while False an instrumented call
+# costs one global lookup and a branch.
+ENABLED = False
+PROFILE = False
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_local = threading.local()
+_profiles = {}
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return (str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+class Counter:
+    """Monotonic counter with one optional label."""
+
+    def __init__(self, name, documentation, label=None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.values = {}
+
+    def inc(self, amount=1, label_value=None):
+        """Add ``amount`` to the series for ``label_value``."""
+        with _lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        """Return the current value of one series."""
+        return self.values.get(label_value, 0)
+
+    def render(self):
+        """Return the counter in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(self.values.items(),
+                                         key=lambda item: str(item[0])):
+            labels = ("" if self.label is None else
+                      f'{{{self.label}="{_escape(label_value)}"}}')
+            lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one optional label."""
+
+    def __init__(self, name, documentation, label=None,
+                 buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, label_value=None):
+        """Record one observation in the series for ``label_value``."""
+        with _lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [
+                    [0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def count(self, label_value=None):
+        """Return the number of observations in one series."""
+        series = self.series.get(label_value)
+        return sum(series[0]) if series is not None else 0
+
+    def render(self):
+        """Return the histogram in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(
+                self.series.items(), key=lambda item: str(item[0])):
+            prefix = ("" if self.label is None else
+                      f'{self.label}="{_escape(label_value)}",')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} '
+                             f"{cumulative}")
+            labels = f"{{{prefix.rstrip(',')}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+OPERATION_SECONDS = Histogram(
+    "hotel_operation_seconds",
+    "Time spent in public entity operations.", "operation")
+STAGE_SECONDS = Histogram(
+    "hotel_storage_stage_seconds",
+    "Time spent decoding, building and encoding records.", "stage")
+RECORDS_PARSED = Counter(
+    "hotel_records_parsed_total",
+    "Records turned into entities by full loads.", "store")
+BYTES_READ = Counter(
+    "hotel_bytes_read_total", "Bytes read from data files.", "store")
+BYTES_WRITTEN = Counter(
+    "hotel_bytes_written_total", "Bytes written to data files.", "store")
+
+METRICS = (OPERATION_SECONDS, STAGE_SECONDS, RECORDS_PARSED, BYTES_READ,
+           BYTES_WRITTEN)
+
+
+def enable(profile=False):
+    """Start collecting metrics, and cProfile data when ``profile``."""
+    global ENABLED, PROFILE  # pylint: disable=global-statement
+    ENABLED = True
+    PROFILE = profile
+
+
+def disable():
+    """Stop collecting metrics and profiles."""
+    global ENABLED, PROFILE  # pylint: disable=global-statement
+    ENABLED = False
+    PROFILE = False
+
+
+def reset():
+    """Drop every collected value and profile."""
+    with _lock:
+        for metric in METRICS:
+            if isinstance(metric, Counter):
+                metric.values.clear()
+            else:
+                metric.series.clear()
+        _profiles.clear()
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed(name, histogram=OPERATION_SECONDS):
+    """
+    Decorate a function so its duration is observed under ``name``.
+
+    Calls nested inside a call with the same name (retries, recursion)
+    are only counted once, by the outermost call. With profiling on, the
+    outermost instrumented call of each thread is run under cProfile and
+    its statistics are added to the profile kept for ``name``.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            return _observe(name, histogram, function, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def _observe(name, histogram, function, args, kwargs):
+    """Run an instrumented call and record its duration."""
+    active = getattr(_local, "active", None)
+    if active is None:
+        active = _local.active = set()
+    if name in active:
+        return function(*args, **kwargs)
+
+    profiler = None
+    if PROFILE and not active:
+        # Imported on first use: profiling is rare and slow to import.
+        import cProfile  # pylint: disable=import-outside-toplevel
+        profiler = cProfile.Profile()
+
+    active.add(name)
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(function, *args, **kwargs)
+        return function(*args, **kwargs)
+    finally:
+        histogram.observe(time.perf_counter() - start, name)
+        active.discard(name)
+        if profiler is not None:
+            _add_profile(name, profiler)
+
+
+def _add_profile(name, profiler):
+    """Merge one call's profile into the statistics kept for ``name``."""
+    with _lock:
+        stats = _profiles.get(name)
+        if stats is None:
+            import pstats  # pylint: disable=import-outside-toplevel
+            _profiles[name] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+
+
+def profiles():
+    """Return the collected ``pstats.Stats`` by operation name."""
+    with _lock:
+        return dict(_profiles)
+
+
+def dump_profiles(directory):
+    """Write one ``<operation>.prof`` file per profiled operation."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, stats in profiles().items():
+        path = directory / f"{name}.prof"
+        stats.dump_stats(path)
+        paths.append(path)
+    return paths
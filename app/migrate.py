@@ -0,0 +1,52 @@
+"""JSON to SQLite migration module"""
+
+import argparse
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JournalStorage
+
+ENTITY_CLASSES = (Hotel, Customer, Reservation)
+
+
+def migrate(entity_classes=ENTITY_CLASSES):
+    """
+    Copy every collection from its JSON file (and journal) into the
+    SQLite database next to it.
+
+    Each table is replaced in one transaction, so the migration can be
+    re-run safely. Returns the number of records copied per class name.
+    """
+    counts = {}
+    for entity_cls in entity_classes:
+        # Journal-based classes (such as Hotel's counter storage) know
+        # where their newest values are.
+        source_class = entity_cls.storage_class
+        if not issubclass(source_class, JournalStorage):
+            source_class = JournalStorage
+        source = source_class(entity_cls.file_path, entity_cls.key_field)
+        target = SQLiteStorage(
+            entity_cls.file_path, entity_cls.key_field,
+            fields=entity_cls.fields,
+            indexes=getattr(entity_cls, "indexed_fields", ()),
+        )
+        records = source.load()
+        target.save(records)
+        counts[entity_cls.__name__] = len(records)
+    return counts
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.migrate``."""
+    parser = argparse.ArgumentParser(
+        description="Copy the JSON data files into SQLite databases.")
+    parser.parse_args(argv)
+
+    for name, count in migrate().items():
+        print(f"{name}: {count} records migrated")
+
+
+if __name__ == "__main__":
+    main()
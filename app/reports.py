@@ -0,0 +1,342 @@
+"""Reservation reporting module"""
+
+import datetime
+import heapq
+import itertools
+import mmap
+import operator
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from app import serializers
+from app.archive import archive_for
+from app.hotel import Hotel
+from app.inventory import night, stay
+from app.repository import repository_for
+from app.reservation import Reservation
+from app.sharding import partitions
+from app.storage import OP_DELETE, JsonFileStorage
+
+# "{", optional blanks, a key and a colon: an object holding a first
+# key. An unescaped quote after "{" never occurs inside a JSON string,
+# so in a file of flat records the matches are the record boundaries.
+_RECORD_START = re.compile(rb'\{\s*"[^"\\]*"\s*:')
+
+# Smallest range handed to a worker when the size is picked per run.
+MIN_CHUNK_BYTES = 1024 * 1024
+# Ranges per worker, so a slow range does not leave the others idle.
+CHUNKS_PER_WORKER = 4
+
+
+class Partial:
+    """
+    Reservation counters over part of the data, merged by summing.
+
+    Per hotel: reservations, cancelled ones and room-nights booked in
+    the period. Per customer: reservations and cancelled ones.
+    """
+
+    __slots__ = ("hotel_reservations", "hotel_cancelled", "hotel_nights",
+                 "customer_reservations", "customer_cancelled")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, Counter())
+
+    def add(self, records, first, last):
+        """
+        Count raw reservation records for the nights [first, last). An
+        undated active reservation holds its room on every night.
+        """
+        records = list(records)
+        try:
+            counted = _count(records, first, last)
+        except (KeyError, TypeError, ValueError):
+            counted = _count([record for record in records
+                              if _is_valid(record)], first, last)
+        return self.merge(counted)
+
+    def merge(self, other):
+        """Add the counters of another partial into this one."""
+        for name in self.__slots__:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+
+def _is_valid(record):
+    """Return True if ``record`` can be counted, reporting it otherwise."""
+    try:
+        if record["hotel_id"] is None or record["customer_id"] is None:
+            raise ValueError("missing id")
+        if record.get("check_in") is not None:
+            stay(record["check_in"], record["check_out"])
+        return True
+    except (KeyError, TypeError, ValueError):
+        print(f"Invalid record skipped: {record}")
+        return False
+
+
+def _is_valid_hotel(hotel):
+    """Return True if ``hotel`` has rooms to occupy, reporting it otherwise."""
+    try:
+        if hotel["hotel_id"] is None or hotel["total_rooms"] <= 0:
+            raise ValueError("no rooms")
+        return True
+    except (KeyError, TypeError, ValueError):
+        print(f"Invalid record skipped: {hotel}")
+        return False
+
+
+def _count(records, first, last):
+    """
+    Count valid records into a new Partial.
+
+    Grouping runs through ``Counter.update`` over key columns, which
+    counts in C; only dated stays overlapping the period are handled
+    one by one, and ISO dates are compared as strings before parsing.
+    """
+    partial = Partial()
+    hotel_of = operator.itemgetter("hotel_id")
+    customer_of = operator.itemgetter("customer_id")
+    active_status = Reservation.STATUS_ACTIVE
+
+    partial.hotel_reservations.update(map(hotel_of, records))
+    partial.customer_reservations.update(map(customer_of, records))
+    active = [record for record in records
+              if record.get("status", active_status) == active_status]
+    if len(active) < len(records):
+        cancelled = [record for record in records
+                     if record.get("status", active_status) != active_status]
+        partial.hotel_cancelled.update(map(hotel_of, cancelled))
+        partial.customer_cancelled.update(map(customer_of, cancelled))
+
+    nights = partial.hotel_nights
+    held = Counter(map(hotel_of, [record for record in active
+                                  if record.get("check_in") is None]))
+    for hotel_id, count in held.items():
+        nights[hotel_id] = count * (last - first)
+
+    first_day = datetime.date.fromordinal(first).isoformat()
+    last_day = datetime.date.fromordinal(last).isoformat()
+    ordinals = {}
+    for record in active:
+        check_in = record.get("check_in")
+        if check_in is None or check_in >= last_day:
+            continue
+        check_out = record["check_out"]
+        if check_out <= first_day:
+            continue
+        start = ordinals.get(check_in)
+        if start is None:
+            start = ordinals[check_in] = night(check_in)
+        end = ordinals.get(check_out)
+        if end is None:
+            end = ordinals[check_out] = night(check_out)
+        hotel_id = record["hotel_id"]
+        nights[hotel_id] = (nights.get(hotel_id, 0) +
+                            min(end, last) - max(start, first))
+    return partial
+
+
+class Report:
+    """Occupancy, cancellation and customer rankings for a period."""
+
+    def __init__(self, check_in, check_out, occupancy, hotel_cancellation,
+                 customer_cancellation, top_customers):
+        self.check_in = check_in
+        self.check_out = check_out
+        self.occupancy = occupancy
+        self.hotel_cancellation = hotel_cancellation
+        self.customer_cancellation = customer_cancellation
+        self.top_customers = top_customers
+
+    @classmethod
+    def from_partial(cls, partial, hotels, check_in, check_out, top):
+        """
+        Turn merged counters and raw hotel records into rates; hotels
+        without a positive total_rooms get no occupancy.
+        """
+        first, last = stay(check_in, check_out)
+        nights = partial.hotel_nights
+        occupancy = {
+            hotel["hotel_id"]: nights.get(hotel["hotel_id"], 0) /
+            (hotel["total_rooms"] * (last - first))
+            for hotel in hotels if _is_valid_hotel(hotel)
+        }
+
+        reservations = partial.customer_reservations
+        cancelled = partial.customer_cancelled
+        top_customers = heapq.nsmallest(
+            top,
+            ((customer_id, total - cancelled.get(customer_id, 0))
+             for customer_id, total in reservations.items()
+             if total > cancelled.get(customer_id, 0)),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return cls(
+            str(check_in), str(check_out), occupancy,
+            _rates(partial.hotel_cancelled, partial.hotel_reservations),
+            _rates(cancelled, reservations),
+            top_customers,
+        )
+
+    def to_dict(self):
+        """Convert the report to a JSON-ready dictionary."""
+        return {
+            "check_in": self.check_in,
+            "check_out": self.check_out,
+            "occupancy": self.occupancy,
+            "hotel_cancellation": self.hotel_cancellation,
+            "customer_cancellation": self.customer_cancellation,
+            "top_customers": [list(item) for item in self.top_customers],
+        }
+
+
+def _rates(parts, totals):
+    """Return ``parts[key] / totals[key]`` for every key of ``totals``."""
+    return {key: parts.get(key, 0) / total for key, total in totals.items()}
+
+
+def build_report(check_in=None, check_out=None, top=10, workers=None,
+                 chunk_bytes=None):
+    """
+    Report on every reservation for the nights [check_in, check_out),
+    by default tonight only.
+
+    Data files are cut into ranges at record boundaries (each shard
+    separately) and the ranges are counted by ``workers`` processes
+    (default: one per core), which only send back their counters.
+    Ranges are ``chunk_bytes`` long, by default a few per worker.
+    Journal entries and archived reservations are counted in this
+    process.
+    """
+    if check_in is None:
+        check_in = datetime.date.today()
+    if check_out is None:
+        check_out = datetime.date.fromordinal(night(check_in) + 1)
+    first, last = stay(check_in, check_out)
+
+    partial = aggregate(first, last, workers, chunk_bytes)
+    return Report.from_partial(partial, _hotel_records(), check_in,
+                               check_out, top)
+
+
+def _hotel_records():
+    """Yield every raw hotel record, decoding each file in one go."""
+    for shard in partitions(repository_for(Hotel)):
+        yield from shard.storage.load()
+
+
+def aggregate(first, last, workers=None, chunk_bytes=None):
+    """Return the merged Partial of every reservation."""
+    workers = workers or os.cpu_count() or 1
+    chunks, pending = _plan(workers, chunk_bytes)
+    partial = Partial()
+    for records in pending:
+        partial.add(records, first, last)
+
+    if workers == 1 or len(chunks) <= 1:
+        results = (_scan(chunk, first, last) for chunk in chunks)
+        for result in results:
+            partial.merge(result)
+        return partial
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_scan, chunks, itertools.repeat(first),
+                               itertools.repeat(last)):
+            partial.merge(result)
+    return partial
+
+
+def _plan(workers, chunk_bytes):
+    """
+    Return the (path, start, end, key field, skipped keys) chunks of
+    every reservation file, plus record lists to count directly: the
+    final state of journaled keys, stores that are not files, and the
+    archive one partition at a time.
+    """
+    files, pending = [], []
+    for shard in partitions(repository_for(Reservation)):
+        storage = shard.storage
+        if not isinstance(storage, JsonFileStorage):
+            pending.append(storage.iter_records())
+            continue
+
+        journaled = {}
+        for op, key, record in getattr(storage, "journal_ops", list)():
+            journaled[key] = None if op == OP_DELETE else record
+        pending.append([record for record in journaled.values()
+                        if record is not None])
+
+        size = storage.path.stat().st_size if storage.path.exists() else 0
+        files.append((storage, size, frozenset(journaled)))
+
+    archive = archive_for(Reservation)
+    seen = set()
+    for partition in sorted({segment["partition"]
+                             for segment in archive.segments()}):
+        pending.append(_unique(archive.iter_records(partition, partition),
+                               seen))
+
+    if chunk_bytes is None:
+        total = sum(size for _, size, _ in files)
+        chunk_bytes = max(MIN_CHUNK_BYTES,
+                          -(-total // (workers * CHUNKS_PER_WORKER)))
+        if workers == 1:
+            chunk_bytes = max(total, 1)
+    chunks = [(str(storage.path), start, min(start + chunk_bytes, size),
+               storage.key_field, skipped)
+              for storage, size, skipped in files
+              for start in range(0, size, chunk_bytes)]
+    return chunks, pending
+
+
+def _unique(records, seen):
+    """
+    Yield the archived records whose id is not in ``seen``, adding it:
+    an interrupted archiving run can leave a record in two segments.
+    """
+    for record in records:
+        key = record.get("reservation_id")
+        if key not in seen:
+            seen.add(key)
+            yield record
+
+
+def _scan(chunk, first, last):
+    """Count the records of one chunk; runs in a worker process."""
+    path, start, end, key_field, skipped = chunk
+    with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        records = _chunk_records(data, start, end)
+    if skipped:
+        records = (record for record in records
+                   if record.get(key_field) not in skipped)
+    return Partial().add(records, first, last)
+
+
+def _chunk_records(data, start, end):
+    """
+    Decode the records of a JSON array or JSON Lines file that begin in
+    [start, end). Other formats cannot be cut, so the chunk at offset 0
+    decodes the whole file and the others none.
+    """
+    head = serializers.first_byte(data[:64])
+    if head not in (b"[", b"{"):
+        fmt = serializers.detect(head)
+        return fmt.loads(data[:]) if fmt is not None and not start else []
+
+    begin = _RECORD_START.search(data, start)
+    if begin is None or begin.start() >= end:
+        return []
+    stop = _RECORD_START.search(data, end)
+    piece = data[begin.start():stop.start() if stop else len(data)].rstrip()
+
+    if head == b"{":
+        return [serializers.loads_json(line)
+                for line in piece.splitlines() if line.strip()]
+    if piece.endswith(b"]"):
+        piece = piece[:-1].rstrip()
+    return serializers.loads_json(b"[" + piece.rstrip(b",") + b"]")
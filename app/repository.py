@@ -0,0 +1,494 @@
+"""Repository module"""
+
+import copy
+import threading
+from pathlib import Path
+
+from app import changes, metrics
+from app.cache import MISSING, CacheStats, LRUCache
+from app.locking import lock_for
+from app.sharding import ShardedRepository, shard_path
+from app.storage import OP_CREATE, OP_DELETE, OP_MODIFY, OP_UPDATE
+
+_REPOSITORIES = {}
+_SHARDED = {}
+
+
+def repository_for(entity_cls, hotel_id=None, shard=None):
+    """
+    Return the shared repository for an entity class and its file.
+
+    Classes with ``shards`` above one keep one file per shard: the
+    shard holding ``hotel_id``, or shard number ``shard``, gets its own
+    repository, and without either a ShardedRepository over all of them
+    is returned.
+    """
+    count = getattr(entity_cls, "shards", 1)
+    if count > 1:
+        sharded = _sharded_repository(entity_cls, count)
+        if hotel_id is not None:
+            return sharded.shards[sharded.shard_number(hotel_id)]
+        return sharded.shards[shard] if shard is not None else sharded
+    return _repository_at(entity_cls, Path(entity_cls.file_path))
+
+
+def _repository_at(entity_cls, path):
+    """Return the shared repository for an entity class and one file."""
+    key = (entity_cls, entity_cls.storage_class, path)
+    repository = _REPOSITORIES.get(key)
+    if repository is None:
+        indexes = getattr(entity_cls, "indexed_fields", ())
+        storage = entity_cls.storage_class(
+            path, entity_cls.key_field,
+            fields=entity_cls.fields, indexes=indexes,
+        )
+        repository = Repository(storage, entity_cls.from_dict,
+                                entity_cls.key_field, indexes,
+                                name=entity_cls.__name__)
+        _REPOSITORIES[key] = repository
+    return repository
+
+
+def _sharded_repository(entity_cls, count):
+    """Return the shared facade over the ``count`` shards of a class."""
+    key = (entity_cls, entity_cls.storage_class, Path(entity_cls.file_path),
+           count)
+    repository = _SHARDED.get(key)
+    if repository is None:
+        repository = ShardedRepository(
+            [_repository_at(entity_cls,
+                            shard_path(entity_cls.file_path, shard, count))
+             for shard in range(count)],
+            entity_cls.key_field,
+        )
+        _SHARDED[key] = repository
+    return repository
+
+
+def cache_stats():
+    """Return the lookup counters of every repository by storage path."""
+    return {str(repository.storage.path): repository.stats.as_dict()
+            for repository in _REPOSITORIES.values()}
+
+
+def iter_entities(records, from_dict):
+    """Yield entities built from raw records, skipping invalid ones."""
+    for item in records:
+        try:
+            yield from_dict(item)
+        except (KeyError, TypeError, ValueError):
+            print(f"Invalid record skipped: {item}")
+
+
+class Repository:
+    """
+    Keeps an entity collection in memory keyed by its primary key.
+
+    The collection is loaded from storage on first use and refreshed only
+    when its version changes: the generation counter kept in the file
+    lock plus the storage fingerprint (mtime, size, inode). Warm lookups
+    therefore never parse the file, and appends made by other processes
+    are replayed incrementally when the storage supports it. Entities are
+    handed out as copies so callers cannot change the cached state.
+
+    Writers hold ``lock`` while they read, check and write, so concurrent
+    processes cannot lose each other's updates. An internal mutex makes
+    the cache itself safe to share between threads.
+
+    Fields listed in ``indexes`` get a secondary index mapping each value
+    to the keys holding it, maintained incrementally on every write.
+    Other structures can follow the cache through ``add_listener``.
+
+    Storages with point reads (a ``get`` method) are not loaded whole
+    for ``get`` and ``exists``: those go through a bounded LRU cache of
+    single entities, checked against the same version and cleared when
+    another process changes the store. Writes drop exactly the keys they
+    touch. Hit, miss, eviction and reload counts are kept in ``stats``.
+
+    Every write is reported to the change stream (see ``app.changes``)
+    under ``name`` while the lock is still held, so events come in the
+    order the writes were made.
+    """
+
+    def __init__(self, storage, from_dict, key_field, indexes=(),
+                 cache_size=1024, cache_ttl=None, name=None):
+        self.storage = storage
+        self.name = name or storage.path.stem
+        self.from_dict = from_dict
+        self.key_field = key_field
+        self.indexes = tuple(indexes)
+        self.lock = lock_for(storage.path)
+        self._mutex = threading.RLock()
+        self._entities = None
+        self._index = {}
+        self._stamp = None
+        self._listeners = []
+        self.stats = CacheStats()
+        self.lookups = LRUCache(cache_size, cache_ttl, stats=self.stats)
+        self._lookup_stamp = None
+
+    def add_listener(self, listener):
+        """
+        Keep ``listener`` in step with the cache: ``listener.reset(entities)``
+        is called whenever the collection is (re)loaded and
+        ``listener.update(key, old, new)`` for every single change, with
+        None standing for a missing entity. Both run under the cache mutex
+        and must not modify the entities they receive.
+        """
+        with self._mutex:
+            entities = self._loaded()
+            self._listeners.append(listener)
+            listener.reset(entities.values())
+
+    def get(self, key):
+        """Return a copy of the entity with the given key, or None."""
+        with self._mutex:
+            entity = self._lookup(key)
+            return copy.copy(entity) if entity is not None else None
+
+    def exists(self, key):
+        """Return True if an entity with the given key exists."""
+        with self._mutex:
+            return self._lookup(key) is not None
+
+    def all(self):
+        """Return copies of every entity in storage order."""
+        with self._mutex:
+            return [copy.copy(entity)
+                    for entity in self._loaded().values()]
+
+    def find(self, **criteria):
+        """Return copies of the entities whose fields equal ``criteria``."""
+        with self._mutex:
+            return self._find(criteria)
+
+    def _find(self, criteria):
+        """Look up ``criteria``; the caller holds the mutex."""
+        entities = self._loaded()
+        indexed = [self._index[field].get(value, {})
+                   for field, value in criteria.items()
+                   if field in self._index]
+        others = [(field, value) for field, value in criteria.items()
+                  if field not in self._index]
+
+        if indexed:
+            indexed.sort(key=len)
+            keys = (key for key in indexed[0]
+                    if all(key in index for index in indexed[1:]))
+        else:
+            keys = iter(entities)
+
+        return [
+            copy.copy(entities[key]) for key in keys
+            if all(getattr(entities[key], field) == value
+                   for field, value in others)
+        ]
+
+    def iter_records(self):
+        """Yield raw records straight from storage."""
+        return self.storage.iter_records()
+
+    def preload(self):
+        """Load the whole collection now; return the number of entities."""
+        with self._mutex:
+            return len(self._loaded())
+
+    def snapshot(self):
+        """
+        Return the (version, entities, index) of the loaded collection.
+
+        The mappings are copies; the entities are shared, which is safe
+        because the cache replaces entities rather than changing them.
+        """
+        with self._mutex:
+            entities = self._loaded()
+            return self._stamp, dict(entities), {
+                field: {value: dict(keys) for value, keys in index.items()}
+                for field, index in self._index.items()}
+
+    def restore(self, version, entities, index=None):
+        """
+        Adopt a collection taken by ``snapshot`` at ``version`` unless one
+        is loaded already; return True if it was adopted.
+
+        The next access catches up from ``version`` like any stale cache:
+        incrementally when the storage can list the changes since, with a
+        full reload otherwise. An index for other fields is rebuilt.
+        """
+        with self._mutex:
+            if self._entities is not None:
+                return False
+            self._entities = entities
+            if index is not None and set(index) == set(self.indexes):
+                self._index = index
+            else:
+                self._index = {field: {} for field in self.indexes}
+                for key, entity in entities.items():
+                    self._reindex(key, None, entity)
+            self._stamp = version
+            self.lookups.clear()
+            self._lookup_stamp = None
+            for listener in self._listeners:
+                listener.reset(entities.values())
+            return True
+
+    def version(self):
+        """Return the current (generation, storage fingerprint) pair."""
+        return self.lock.generation(), self.storage.stamp()
+
+    def refresh(self):
+        """Bring the cache up to date and return the version it reflects."""
+        with self._mutex:
+            if self._point_reads():
+                return self._synced_lookups()
+            self._loaded()
+            return self._stamp
+
+    def apply(self, ops):
+        """Persist (op, key, entity) operations and update the cache."""
+        ops = self._normalize(ops)
+        if not ops:
+            return
+
+        records = [
+            (op, key, entity.to_dict() if entity is not None else None)
+            for op, key, entity in ops
+        ]
+        with self.lock, self._mutex:
+            before = self.version()
+            self.storage.apply(records)
+            self.lock.bump()
+            changes.publish(self.name, records)
+            self._written(before, ops)
+
+    def adjust(self, key, field, delta, minimum=None, maximum_field=None):
+        """
+        Add ``delta`` to a numeric field if the result stays within
+        [minimum, maximum_field]; storages that offer ``adjust`` do it in
+        a single conditional update and return the changed fields.
+
+        Returns a copy of the updated entity, None if ``key`` does not
+        exist, or False if the bounds would be violated.
+        """
+        with self.lock, self._mutex:
+            current = self._lookup(key)
+            if current is None:
+                return None
+            entity = copy.copy(current)
+
+            if not hasattr(self.storage, "adjust"):
+                value = getattr(entity, field) + delta
+                if ((minimum is not None and value < minimum) or
+                        (maximum_field is not None and
+                         value > getattr(entity, maximum_field))):
+                    return False
+                setattr(entity, field, value)
+                self.apply([(OP_MODIFY, key, entity)])
+                return entity
+
+            before = self.version()
+            record = self.storage.adjust(key, field, delta,
+                                         minimum, maximum_field)
+            if not record:
+                return record
+            self.lock.bump()
+
+            # The storage may return only the fields it changed.
+            for name, value in record.items():
+                setattr(entity, name, value)
+            changes.publish(self.name, [(OP_MODIFY, key, entity.to_dict())])
+            self._written(before, [(OP_MODIFY, key, entity)])
+            return copy.copy(entity)
+
+    def save(self, entities):
+        """
+        Replace the whole collection with the given entities; the change
+        stream gets the difference to the previous collection.
+        """
+        with self.lock, self._mutex:
+            records = [entity.to_dict() for entity in entities]
+            ops = None
+            if changes.active():
+                ops = self._differences(records)
+            self.storage.save(records)
+            self.lock.bump()
+            if ops:
+                changes.publish(self.name, ops)
+            self.invalidate()
+
+    def _differences(self, records):
+        """Return the operations that turn the store into ``records``."""
+        old = {key: entity.to_dict()
+               for key, entity in self._loaded().items()}
+        ops = []
+        for record in records:
+            key = record[self.key_field]
+            previous = old.pop(key, None)
+            if previous is None:
+                ops.append((OP_CREATE, key, record))
+            elif previous != record:
+                ops.append((OP_MODIFY, key, record))
+        ops.extend((OP_DELETE, key, None) for key in old)
+        return ops
+
+    def invalidate(self):
+        """Drop the cached collection so the next access reloads it."""
+        with self._mutex:
+            self._entities = None
+            self._index = {}
+            self._stamp = None
+            self.lookups.clear()
+            self._lookup_stamp = None
+
+    def _written(self, before, ops):
+        """
+        Bring the caches past ``ops``, written by this process while the
+        store was at version ``before``; a cache that was already stale
+        is dropped instead.
+        """
+        stamp = self.version()
+
+        if before == self._lookup_stamp:
+            for _, key, _ in ops:
+                self.lookups.discard(key)
+        else:
+            self.lookups.clear()
+        self._lookup_stamp = stamp
+
+        if self._entities is None:
+            return
+        if before != self._stamp:
+            self._entities = None
+            self._index = {}
+            self._stamp = None
+            return
+        for op, key, entity in ops:
+            self._cache(op, key, copy.copy(entity))
+        self._stamp = stamp
+
+    def _point_reads(self):
+        """Return True while lookups read single records from storage."""
+        return (self._entities is None and not self._listeners and
+                hasattr(self.storage, "get"))
+
+    def _synced_lookups(self):
+        """Clear the lookup cache if the store changed; return its version."""
+        stamp = self.version()
+        if stamp != self._lookup_stamp:
+            self.lookups.clear()
+            self._lookup_stamp = stamp
+        return stamp
+
+    def _lookup(self, key):
+        """Return the cached entity for ``key``; the caller holds the mutex."""
+        if not self._point_reads():
+            # _loaded() replaces the stamp object only when it reloads.
+            before = self._stamp
+            entity = self._loaded().get(key)
+            if before is not None and before is self._stamp:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+            return entity
+
+        self._synced_lookups()
+        entity = self.lookups.get(key)
+        if entity is MISSING:
+            record = self.storage.get(key)
+            entity = None
+            if record is not None:
+                entity = next(iter_entities([record], self.from_dict), None)
+            self.lookups.put(key, entity)
+        return entity
+
+    def _loaded(self):
+        """Return the cached mapping, refreshing it if storage changed."""
+        stamp = self.version()
+        if self._entities is not None and stamp != self._stamp:
+            ops = self.storage.changes_since(self._stamp[1], stamp[1])
+            if ops is not None:
+                for op, key, entity in self._to_entities(ops):
+                    self._cache(op, key, entity)
+                self._stamp = stamp
+
+        if self._entities is None or stamp != self._stamp:
+            self._entities = self._load()
+            self._index = {field: {} for field in self.indexes}
+            for key, entity in self._entities.items():
+                self._reindex(key, None, entity)
+            self._stamp = stamp
+            self.stats.reloads += 1
+            for listener in self._listeners:
+                listener.reset(self._entities.values())
+        return self._entities
+
+    def _load(self):
+        """Build the key -> entity mapping from storage."""
+        return self._build(self.storage.load())
+
+    @metrics.timed("from_dict", metrics.STAGE_SECONDS)
+    def _build(self, records):
+        """Turn raw records into the key -> entity mapping."""
+        entities = {
+            getattr(entity, self.key_field): entity
+            for entity in iter_entities(records, self.from_dict)
+        }
+        if metrics.ENABLED:
+            metrics.RECORDS_PARSED.inc(len(entities), self.storage.path.name)
+        return entities
+
+    def _to_entities(self, ops):
+        """Convert raw storage operations, skipping invalid records."""
+        for op, key, record in ops:
+            if op == OP_DELETE:
+                yield op, key, None
+                continue
+            if op == OP_UPDATE:
+                entity = self._entities.get(key)
+                if entity is not None:
+                    entity = copy.copy(entity)
+                    for name, value in record.items():
+                        setattr(entity, name, value)
+                    yield OP_MODIFY, key, entity
+                continue
+            for entity in iter_entities([record], self.from_dict):
+                yield op, key, entity
+
+    def _cache(self, op, key, entity):
+        """Apply one operation to the cached mapping and its indexes."""
+        old = self._entities.get(key)
+        if op == OP_DELETE:
+            self._entities.pop(key, None)
+        else:
+            self._entities[key] = entity
+        self._reindex(key, old, entity)
+        for listener in self._listeners:
+            listener.update(key, old, entity)
+
+    def _reindex(self, key, old, new):
+        """Move ``key`` between index buckets for the fields that changed."""
+        for field, index in self._index.items():
+            old_value = getattr(old, field) if old is not None else None
+            new_value = getattr(new, field) if new is not None else None
+            if old is not None and new is not None and old_value == new_value:
+                continue
+
+            if old is not None:
+                keys = index[old_value]
+                keys.pop(key, None)
+                if not keys:
+                    del index[old_value]
+            if new is not None:
+                index.setdefault(new_value, {})[key] = None
+
+    def _normalize(self, ops):
+        """Split modifications that change the primary key."""
+        normalized = []
+        for op, key, entity in ops:
+            new_key = getattr(entity, self.key_field, key)
+            if op == OP_MODIFY and new_key != key:
+                normalized.append((OP_DELETE, key, None))
+                normalized.append((OP_CREATE, new_key, entity))
+            else:
+                normalized.append((op, key, entity))
+        return normalized
@@ -1,20 +1,45 @@
 """Reservation Module"""
 # pylint: disable=duplicate-code
 
-import json
+import datetime
+import functools
 from pathlib import Path
 
+from app import bulk, metrics
 from app.hotel import Hotel
 from app.customer import Customer
+from app.inventory import NightCounter, inventory_for, stay
+from app.repository import iter_entities, repository_for
+from app.storage import (
+    JournalStorage,
+    OP_CREATE,
+    OP_MODIFY,
+    write_json_lines,
+)
+from app.transaction import Transaction, run_with_retries
 
 
 class Reservation:
     """Represents a reservation linking a customer to a hotel."""
 
     file_path = Path("data/reservations.json")
+    storage_class = JournalStorage
+    key_field = "reservation_id"
+    fields = ("reservation_id", "hotel_id", "customer_id", "status",
+              "check_in", "check_out")
+    indexed_fields = ("hotel_id", "customer_id", "status")
+    # Reservations are split by hotel_id, like hotels; keep equal to
+    # Hotel.shards so a booking touches a single shard.
+    shards = 1
 
     STATUS_ACTIVE = "ACTIVE"
     STATUS_CANCELLED = "CANCELLED"
+    # Maps every valid status to its shared string instance.
+    _STATUSES = {STATUS_ACTIVE: STATUS_ACTIVE,
+                 STATUS_CANCELLED: STATUS_CANCELLED}
+
+    __slots__ = ("reservation_id", "hotel_id", "customer_id", "_status",
+                 "check_in", "check_out")
 
     def __init__(
         self,
@@ -22,6 +47,8 @@ class Reservation:
         hotel_id,
         customer_id,
         status=STATUS_ACTIVE,
+        check_in=None,
+        check_out=None,
     ):
         if not reservation_id:
             raise ValueError("reservation_id cannot be empty")
@@ -29,22 +56,47 @@ class Reservation:
             raise ValueError("hotel_id cannot be empty")
         if not customer_id:
             raise ValueError("customer_id cannot be empty")
-        if status not in (self.STATUS_ACTIVE, self.STATUS_CANCELLED):
-            raise ValueError("Invalid reservation status")
 
         self.reservation_id = reservation_id
         self.hotel_id = hotel_id
         self.customer_id = customer_id
         self.status = status
 
+        # Dates are optional: an undated reservation holds a room until it
+        # is cancelled, a dated one only for the nights [check_in,
+        # check_out). Both are kept as ISO strings.
+        if (check_in is None) != (check_out is None):
+            raise ValueError("check_in and check_out must be given together")
+        if check_in is not None:
+            check_in, check_out = str(check_in), str(check_out)
+            stay(check_in, check_out)
+        self.check_in = check_in
+        self.check_out = check_out
+
+    @property
+    def status(self):
+        """Reservation status, one of the STATUS_* constants."""
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        try:
+            self._status = self._STATUSES[value]
+        except (KeyError, TypeError):
+            raise ValueError("Invalid reservation status") from None
+
     def to_dict(self):
         """Convert object to dictionary."""
-        return {
+        data = {
             "reservation_id": self.reservation_id,
             "hotel_id": self.hotel_id,
             "customer_id": self.customer_id,
             "status": self.status,
         }
+        if self.check_in is not None:
+            data["check_in"] = self.check_in
+            data["check_out"] = self.check_out
+        return data
 
     @classmethod
     def from_dict(cls, data):
@@ -54,91 +106,221 @@ class Reservation:
             data["hotel_id"],
             data["customer_id"],
             data.get("status", cls.STATUS_ACTIVE),
+            data.get("check_in"),
+            data.get("check_out"),
         )
 
     @classmethod
+    def _repository(cls, transaction=None, hotel_id=None):
+        """
+        Return the repository, or its view inside ``transaction``; with
+        ``hotel_id``, only the shard holding that hotel.
+        """
+        if transaction is not None:
+            return transaction.view(cls)
+        return repository_for(cls, hotel_id)
+
+    @classmethod
+    def _storage(cls):
+        """Return the storage backend bound to the current file_path."""
+        return cls._repository().storage
+
+    @classmethod
+    @metrics.timed("reservation.load_all")
     def _load_all(cls):
         """Load all reservations from JSON file."""
-        if not cls.file_path.exists():
-            return []
+        return cls._repository().all()
 
-        try:
-            with open(cls.file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-        except json.JSONDecodeError:
-            print("Invalid JSON file")
-            return []
+    @classmethod
+    @metrics.timed("reservation.save_all")
+    def _save_all(cls, reservations):
+        """Save all reservations to JSON file."""
+        cls._repository().save(reservations)
 
-        if not isinstance(data, list):
-            print("Invalid JSON structure: expected a list")
-            return []
+    @classmethod
+    def iter_all(cls):
+        """Yield reservations one at a time without loading the whole file."""
+        return iter_entities(cls._repository().iter_records(),
+                             cls.from_dict)
+
+    @classmethod
+    def export_json_lines(cls, path):
+        """Stream every reservation to a JSON Lines file in constant memory."""
+        write_json_lines(
+            path, (reservation.to_dict() for reservation in cls.iter_all())
+        )
+
+    @classmethod
+    @metrics.timed("reservation.display_reservation_info")
+    def display_reservation_info(cls, reservation_id, transaction=None):
+        """Return a reservation by id."""
+        reservation = cls._repository(transaction).get(reservation_id)
+
+        if reservation is None:
+            raise KeyError("Reservation not found")
 
-        reservations = []
-        for item in data:
-            try:
-                reservations.append(cls.from_dict(item))
-            except (KeyError, TypeError, ValueError):
-                print(f"Invalid record skipped: {item}")
+        return reservation
 
-        return reservations
+    @classmethod
+    @metrics.timed("reservation.find_by_hotel")
+    def find_by_hotel(cls, hotel_id, status=None):
+        """Return the reservations of a hotel, optionally by status."""
+        if status is None:
+            return cls._repository().find(hotel_id=hotel_id)
+        return cls._repository().find(hotel_id=hotel_id, status=status)
 
     @classmethod
-    def _save_all(cls, reservations):
-        """Save all reservations to JSON file."""
-        cls.file_path.parent.mkdir(parents=True,
-                                   exist_ok=True)
-
-        with open(cls.file_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [reservation.to_dict() for reservation in reservations],
-                file,
-                indent=2,
-            )
+    @metrics.timed("reservation.find_by_customer")
+    def find_by_customer(cls, customer_id, status=None):
+        """Return the reservations of a customer, optionally by status."""
+        if status is None:
+            return cls._repository().find(customer_id=customer_id)
+        return cls._repository().find(customer_id=customer_id,
+                                      status=status)
+
+    @classmethod
+    @metrics.timed("reservation.find_by_status")
+    def find_by_status(cls, status):
+        """Return every reservation with the given status."""
+        return cls._repository().find(status=status)
 
     @classmethod
-    def create_reservation(cls, reservation):
+    @metrics.timed("reservation.available_hotels")
+    def available_hotels(cls, check_in, check_out, rooms=1):
+        """
+        Return the ids of hotels with ``rooms`` free on every night from
+        ``check_in`` to ``check_out``.
+
+        The per-night inventory follows every write to hotels and
+        reservations, so a search costs one array scan per hotel.
+        """
+        repository_for(Hotel).refresh()
+        cls._repository().refresh()
+        return inventory_for(Hotel, cls).hotels_with_free_rooms(
+            rooms, check_in, check_out)
+
+    @classmethod
+    def _booked_nights(cls, hotel_id, transaction):
+        """Return the dated rooms booked per night at a hotel."""
+        counter = NightCounter()
+        for reservation in cls._repository(transaction).find(
+                hotel_id=hotel_id, status=cls.STATUS_ACTIVE):
+            if reservation.check_in is not None:
+                counter.add(*stay(reservation.check_in,
+                                  reservation.check_out))
+        return counter
+
+    @classmethod
+    def _archived(cls, reservation_id):
+        """Return True if ``reservation_id`` was moved to the archive."""
+        # app.archive imports this module.
+        from app.archive import (  # pylint: disable=import-outside-toplevel
+            archive_for,
+        )
+        return archive_for(cls).get(reservation_id) is not None
+
+    @classmethod
+    def transaction(cls):
+        """Start a transaction over hotels, customers and reservations."""
+        return Transaction(cls.file_path.with_name("transactions.wal"),
+                           (Hotel, Customer, cls))
+
+    @classmethod
+    @metrics.timed("reservation.create_reservation")
+    def create_reservation(cls, reservation, transaction=None):
         """
         Create a reservation (Customer, Hotel).
+
+        The room count and the reservation are committed together.
         """
-        reservations = cls._load_all()
+        if transaction is None:
+            run_with_retries(
+                cls.transaction,
+                functools.partial(cls.create_reservation, reservation),
+            )
+            return
 
-        if any(
-            r.reservation_id == reservation.reservation_id
-            for r in reservations
-                ):
+        repository = cls._repository(transaction)
+
+        if (repository.exists(reservation.reservation_id) or
+                cls._archived(reservation.reservation_id)):
             raise ValueError("Reservation already exists")
 
         # Validate existence of hotel & customer
-        Hotel.display_hotel_info(reservation.hotel_id)
-        Customer.display_customer_info(reservation.customer_id)
+        hotel = Hotel.display_hotel_info(reservation.hotel_id, transaction)
+        Customer.display_customer_info(reservation.customer_id, transaction)
+        booked = cls._booked_nights(reservation.hotel_id, transaction)
+
+        if reservation.check_in is not None:
+            # A dated stay needs a free room on each of its nights.
+            first, last = stay(reservation.check_in, reservation.check_out)
+            if booked.peak(first, last) >= hotel.available_rooms:
+                raise ValueError("No available rooms")
+        else:
+            # An undated hold takes a room from every night, so it must
+            # leave enough for the busiest night already booked.
+            today = datetime.date.today().toordinal()
+            if booked.peak(today) >= hotel.available_rooms:
+                raise ValueError("No available rooms")
 
-        # Reserve one room (may raise KeyError/ValueError)
-        Hotel.reserve_room(reservation.hotel_id)
+            # Reserve one room (may raise KeyError/ValueError)
+            Hotel.reserve_room(reservation.hotel_id, transaction)
 
-        reservations.append(reservation)
-        cls._save_all(reservations)
+        repository.apply(
+            [(OP_CREATE, reservation.reservation_id, reservation)]
+        )
 
     @classmethod
-    def cancel_reservation(cls, reservation_id):
+    @metrics.timed("reservation.cancel_reservation")
+    def cancel_reservation(cls, reservation_id, transaction=None):
         """
         Cancel a reservation by id and persist changes.
         """
-        reservations = cls._load_all()
-        found = False
+        if transaction is None:
+            run_with_retries(
+                cls.transaction,
+                functools.partial(cls.cancel_reservation, reservation_id),
+            )
+            return
 
-        for reservation in reservations:
-            if reservation.reservation_id == reservation_id:
-                found = True
+        repository = cls._repository(transaction)
+        reservation = cls.display_reservation_info(reservation_id,
+                                                   transaction)
 
-                if reservation.status == cls.STATUS_CANCELLED:
-                    raise ValueError("Reservation already cancelled")
+        if reservation.status == cls.STATUS_CANCELLED:
+            raise ValueError("Reservation already cancelled")
 
-                reservation.status = cls.STATUS_CANCELLED
-                cls._save_all(reservations)
+        # Release the room of an undated hold (may raise KeyError/ValueError)
+        if reservation.check_in is None:
+            Hotel.cancel_reservation(reservation.hotel_id, transaction)
 
-                # Release one room back to the hotel
-                Hotel.cancel_reservation(reservation.hotel_id)
-                return
+        reservation.status = cls.STATUS_CANCELLED
+        repository.apply([(OP_MODIFY, reservation_id, reservation)])
 
-        if not found:
-            raise KeyError("Reservation not found")
+    @classmethod
+    @metrics.timed("reservation.bulk_create")
+    def bulk_create(cls, records):
+        """
+        Create many reservations from entities or dicts, collecting
+        per-record errors. Records are read lazily and committed in
+        transactions of ``bulk.BATCH_SIZE``.
+        """
+        def create(record, transaction):
+            reservation = bulk.to_entity(cls, record)
+            cls.create_reservation(reservation, transaction)
+            return reservation.reservation_id
+
+        return bulk.run_batches(cls.transaction, records, create)
+
+    @classmethod
+    @metrics.timed("reservation.bulk_cancel")
+    def bulk_cancel(cls, reservation_ids):
+        """
+        Cancel many reservations, collecting per-id errors, in
+        transactions of ``bulk.BATCH_SIZE``.
+        """
+        def cancel(reservation_id, transaction):
+            cls.cancel_reservation(reservation_id, transaction)
+            return reservation_id
+
+        return bulk.run_batches(cls.transaction, reservation_ids, cancel)
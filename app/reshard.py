@@ -0,0 +1,93 @@
+"""Resharding module"""
+
+import argparse
+from pathlib import Path
+
+from app.counter_storage import counters_path
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+from app.sharding import SHARD_FIELD, detect_shards, shard_files, shard_of
+from app.storage import backup_path, checksum_path
+from app.warmup import image_path
+
+ENTITY_CLASSES = (Hotel, Reservation)
+
+
+def _data_files(path):
+    """
+    Return a data file plus its journal, checksums, backup, counters and
+    warm-start image, if they exist.
+    """
+    path = Path(path)
+    image = image_path(path)
+    return [candidate for candidate
+            in (path, path.with_name(path.name + ".journal"),
+                checksum_path(path), backup_path(path), counters_path(path),
+                image, checksum_path(image), backup_path(image))
+            if candidate.exists()]
+
+
+def reshard(entity_cls, count):
+    """
+    Rewrite every record of ``entity_cls`` into ``count`` shard files
+    (one plain file when ``count`` is 1) and set ``entity_cls.shards``.
+
+    The current layout is read from the files on disk, whatever
+    ``shards`` says. Run it while no other process uses the data.
+    Returns the number of records moved.
+    """
+    if count < 1:
+        raise ValueError("Shard count must be at least 1")
+
+    entity_cls.shards = detect_shards(entity_cls.file_path)
+    source = repository_for(entity_cls)
+    old_files = [data_file
+                 for path in [entity_cls.file_path] +
+                 shard_files(entity_cls.file_path)
+                 for data_file in _data_files(path)]
+    if entity_cls.shards == count:
+        return sum(1 for _ in source.iter_records())
+
+    grouped = [[] for _ in range(count)]
+    for record in source.iter_records():
+        grouped[shard_of(record[SHARD_FIELD], count)].append(record)
+    source.invalidate()
+
+    entity_cls.shards = count
+    written = set()
+    for shard, records in enumerate(grouped):
+        target = repository_for(entity_cls, shard=shard)
+        with target.lock:
+            target.storage.save(records)
+            target.lock.bump()
+            target.invalidate()
+        written.update(_data_files(target.storage.path))
+
+    for path in old_files:
+        if path not in written and path.exists():
+            path.unlink()
+    return sum(len(records) for records in grouped)
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.reshard --shards N``."""
+    parser = argparse.ArgumentParser(
+        description="Split hotels and reservations into shard files.")
+    parser.add_argument("--shards", type=int, required=True,
+                        help="number of shards to write (1 to merge)")
+    args = parser.parse_args(argv)
+
+    # Pending transactions are replayed into the old layout first.
+    for entity_cls in ENTITY_CLASSES:
+        entity_cls.shards = detect_shards(entity_cls.file_path)
+    Reservation.transaction().recover()
+    for entity_cls in ENTITY_CLASSES:
+        moved = reshard(entity_cls, args.shards)
+        print(f"{entity_cls.__name__}: {moved} records in "
+              f"{args.shards} shard(s)")
+    print(f"Set Hotel.shards and Reservation.shards to {args.shards}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Hotel availability search module"""
+
+import bisect
+import heapq
+import threading
+
+from app.repository import repository_for
+
+# Sorts after every character, closing prefix ranges in the name index.
+_PREFIX_END = "\U0010ffff"
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def search_index_for(hotel_cls):
+    """Return the search index attached to the repository of ``hotel_cls``."""
+    repository = repository_for(hotel_cls)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(repository)
+        if index is None:
+            index = _INDEXES[repository] = HotelSearchIndex(repository)
+            repository.add_listener(index)
+    return index
+
+
+def _remove(entries, entry):
+    """Remove ``entry`` from a sorted list."""
+    position = bisect.bisect_left(entries, entry)
+    if position < len(entries) and entries[position] == entry:
+        del entries[position]
+
+
+class HotelSearchIndex:
+    """
+    Sorted views of the hotels kept in step with their repository.
+
+    Free rooms, capacity and case-folded names are each held in a sorted
+    list of ``(value, hotel_id)`` pairs, updated in place on every write.
+    A search bisects each filter to its range of matches and scans only
+    the narrowest one, so its cost follows the number of matches rather
+    than the number of hotels.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self._hotels = {}
+        self._by_available = []
+        self._by_total = []
+        self._by_name = []
+        self._lock = threading.Lock()
+
+    def reset(self, hotels):
+        """Rebuild every sorted list from ``hotels``."""
+        with self._lock:
+            self._hotels = {hotel.hotel_id: self._entry(hotel)
+                            for hotel in hotels}
+            self._by_name = sorted(
+                (name, hotel_id)
+                for hotel_id, (name, _, _) in self._hotels.items())
+            self._by_total = sorted(
+                (total, hotel_id)
+                for hotel_id, (_, total, _) in self._hotels.items())
+            self._by_available = sorted(
+                (available, hotel_id)
+                for hotel_id, (_, _, available) in self._hotels.items())
+
+    def update(self, hotel_id, old, new):
+        """Move one hotel within the sorted lists whose value changed."""
+        with self._lock:
+            before = self._hotels.pop(hotel_id, None)
+            after = self._entry(new) if new is not None else None
+            if after is not None:
+                self._hotels[hotel_id] = after
+
+            lists = (self._by_name, self._by_total, self._by_available)
+            for position, entries in enumerate(lists):
+                if (before is not None and after is not None and
+                        before[position] == after[position]):
+                    continue
+                if before is not None:
+                    _remove(entries, (before[position], hotel_id))
+                if after is not None:
+                    bisect.insort(entries, (after[position], hotel_id))
+
+    def search(self, min_free_rooms=None, name_prefix=None,
+               min_capacity=None, max_capacity=None, limit=None):
+        """
+        Return the ids, in order, of hotels matching every given filter.
+
+        ``name_prefix`` is matched case-insensitively and the capacity
+        bounds are inclusive. ``limit`` caps the number of ids returned.
+        """
+        self.repository.refresh()
+
+        with self._lock:
+            ranges = []
+            if min_free_rooms is not None:
+                ranges.append(self._range(self._by_available,
+                                          (min_free_rooms,), None))
+            if name_prefix is not None:
+                prefix = name_prefix.casefold()
+                ranges.append(self._range(self._by_name, (prefix,),
+                                          (prefix + _PREFIX_END,)))
+            if min_capacity is not None or max_capacity is not None:
+                ranges.append(self._range(
+                    self._by_total,
+                    (min_capacity,) if min_capacity is not None else None,
+                    (max_capacity + 1,) if max_capacity is not None else None,
+                ))
+
+            if ranges:
+                entries, low, high = min(ranges,
+                                         key=lambda item: item[2] - item[1])
+                candidates = (entries[i][1] for i in range(low, high))
+            else:
+                candidates = iter(self._hotels)
+
+            matches = [
+                hotel_id for hotel_id in candidates
+                if self._matches(self._hotels[hotel_id], min_free_rooms,
+                                 name_prefix, min_capacity, max_capacity)
+            ]
+
+        if limit is not None:
+            return heapq.nsmallest(limit, matches)
+        return sorted(matches)
+
+    @staticmethod
+    def _entry(hotel):
+        """Return the indexed values of a hotel."""
+        return (hotel.hotel_name.casefold(), hotel.total_rooms,
+                hotel.available_rooms)
+
+    @staticmethod
+    def _range(entries, low, high):
+        """Return (entries, start, stop) for the pairs in [low, high)."""
+        start = bisect.bisect_left(entries, low) if low is not None else 0
+        stop = (bisect.bisect_left(entries, high) if high is not None
+                else len(entries))
+        return entries, start, max(start, stop)
+
+    @staticmethod
+    def _matches(entry, min_free_rooms, name_prefix, min_capacity,
+                 max_capacity):
+        """Return True if an indexed hotel passes every filter."""
+        name, total, available = entry
+        return ((min_free_rooms is None or available >= min_free_rooms) and
+                (name_prefix is None or
+                 name.startswith(name_prefix.casefold())) and
+                (min_capacity is None or total >= min_capacity) and
+                (max_capacity is None or total <= max_capacity))
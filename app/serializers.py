@@ -0,0 +1,131 @@
+"""Serialization formats module"""
+
+import functools
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_LEADING_SPACE = re.compile(rb"\s*")
+
+
+def dumps_json(value):
+    """Encode ``value`` as compact JSON text, with orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads_json(data):
+    """Decode JSON text or bytes, with orjson if installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonFormat:
+    """
+    Compact JSON: no indentation or spaces after separators.
+
+    Encoded with orjson when it is installed, otherwise with the stdlib.
+    Files written with indentation by older versions load unchanged.
+    """
+
+    name = "json"
+
+    @staticmethod
+    def available():
+        """JSON needs no optional dependency."""
+        return True
+
+    @staticmethod
+    def dumps(records):
+        """Encode a list of records to bytes."""
+        if orjson is not None:
+            return orjson.dumps(records)
+        return json.dumps(records, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        """Decode bytes holding a JSON array."""
+        return loads_json(data)
+
+    @staticmethod
+    def matches(head):
+        """Return True if ``head`` (the first non-blank byte) opens JSON."""
+        return head in (b"[", b"{")
+
+
+@functools.lru_cache(maxsize=None)
+def _msgpack():
+    """
+    Return the msgpack module, or None if it is not installed. Only
+    msgpack snapshots need it, so it is imported on first use.
+    """
+    try:
+        import msgpack  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return msgpack
+
+
+class MsgpackFormat:
+    """MessagePack arrays of maps; needs the ``msgpack`` package."""
+
+    name = "msgpack"
+
+    @staticmethod
+    def available():
+        """Return True if the msgpack package is installed."""
+        return _msgpack() is not None
+
+    @staticmethod
+    def dumps(records):
+        """Encode a list of records to bytes."""
+        return _msgpack().packb(records, use_bin_type=True)
+
+    @staticmethod
+    def loads(data):
+        """Decode bytes holding one MessagePack array."""
+        return _msgpack().unpackb(data, raw=False)
+
+    @staticmethod
+    def matches(head):
+        """Return True if ``head`` starts a MessagePack array."""
+        return bool(head) and (0x90 <= head[0] <= 0x9f or
+                               head[0] in (0xdc, 0xdd))
+
+
+FORMATS = {fmt.name: fmt for fmt in (JsonFormat, MsgpackFormat)}
+
+
+def get_format(name):
+    """Return the format called ``name``, checking it can be used."""
+    try:
+        fmt = FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown data format: {name}") from None
+    if not fmt.available():
+        raise ValueError(f"Data format {name} needs the {name} package")
+    return fmt
+
+
+def first_byte(data):
+    """Return the first non-whitespace byte of ``data`` (b"" if none)."""
+    start = _LEADING_SPACE.match(data).end()
+    return data[start:start + 1]
+
+
+def detect(head):
+    """
+    Return the format whose files start with ``head``, the first
+    non-whitespace byte, or None.
+    """
+    for fmt in FORMATS.values():
+        if fmt.matches(head):
+            return fmt
+    return None
@@ -0,0 +1,239 @@
+"""Sharding module"""
+
+import itertools
+import re
+import zlib
+from pathlib import Path
+
+from app.storage import OP_CREATE, OP_DELETE
+
+# Every sharded collection is partitioned by the hotel it belongs to, so
+# a hotel and its reservations always share a shard number.
+SHARD_FIELD = "hotel_id"
+
+
+def shard_of(value, count):
+    """Return the shard of ``value``: a stable crc32 hash modulo ``count``."""
+    return zlib.crc32(str(value).encode("utf-8")) % count
+
+
+def shard_path(path, shard, count):
+    """Return the file holding shard ``shard`` of ``count`` for ``path``."""
+    path = Path(path)
+    return path.with_name(
+        f"{path.stem}.shard-{shard:03d}-of-{count:03d}{path.suffix}")
+
+
+def _shards_on_disk(path):
+    """Return the (shard, count) pairs with a file or journal for ``path``."""
+    path = Path(path)
+    pattern = re.compile(
+        rf"{re.escape(path.stem)}\.shard-(\d+)-of-(\d+)"
+        rf"{re.escape(path.suffix)}(?:\.journal)?")
+    found = set()
+    for candidate in path.parent.glob(f"{path.stem}.shard-*"):
+        match = pattern.fullmatch(candidate.name)
+        if match:
+            found.add((int(match.group(1)), int(match.group(2))))
+    return sorted(found)
+
+
+def shard_files(path):
+    """
+    Return the shard paths of ``path`` that have a file or journal on
+    disk, whatever their shard count.
+    """
+    return [shard_path(path, shard, count)
+            for shard, count in _shards_on_disk(path)]
+
+
+def detect_shards(path):
+    """Return the shard count of the files on disk for ``path`` (1 if none)."""
+    return max((count for _, count in _shards_on_disk(path)), default=1)
+
+
+def partitions(repository):
+    """Return the shard repositories behind ``repository``, or itself."""
+    return list(getattr(repository, "shards", [repository]))
+
+
+def split_ops(ops, key_field, locate, target):
+    """
+    Group (op, key, entity) operations by shard number.
+
+    ``locate(key)`` returns the shard currently holding a key (or None)
+    and ``target(entity)`` the shard an entity belongs in. An entity
+    whose shard changes is deleted from the old shard and created in the
+    new one; deleting a key no shard holds is a no-op.
+    """
+    grouped = {}
+    for op, key, entity in ops:
+        source = None if op == OP_CREATE else locate(key)
+        if op == OP_DELETE:
+            if source is not None:
+                grouped.setdefault(source, []).append((op, key, None))
+            continue
+
+        destination = target(entity)
+        if source is not None and source != destination:
+            grouped.setdefault(source, []).append((OP_DELETE, key, None))
+            grouped.setdefault(destination, []).append(
+                (OP_CREATE, getattr(entity, key_field), entity))
+        else:
+            grouped.setdefault(destination, []).append((op, key, entity))
+    return grouped
+
+
+class LockSet:
+    """Holds several file locks at once, always taken in path order."""
+
+    def __init__(self, locks):
+        self.locks = sorted(locks, key=lambda lock: str(lock.path))
+
+    def __enter__(self):
+        taken = []
+        try:
+            for lock in self.locks:
+                lock.acquire()
+                taken.append(lock)
+        except BaseException:
+            for lock in reversed(taken):
+                lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for lock in reversed(self.locks):
+            lock.release()
+        return False
+
+
+class _ShardListener:
+    """Passes one shard's cache events on to a listener of the whole set."""
+
+    def __init__(self, listener, loaded, shard):
+        self.listener = listener
+        self.loaded = loaded
+        self.shard = shard
+
+    def reset(self, entities):
+        """Record the shard's (live) entity view and reset from all shards."""
+        self.loaded[self.shard] = entities
+        self.listener.reset(itertools.chain.from_iterable(self.loaded))
+
+    def update(self, key, old, new):
+        """Forward a single change."""
+        self.listener.update(key, old, new)
+
+
+class ShardedRepository:
+    """
+    Repository facade over one repository per shard.
+
+    Each shard has its own data file, journal and lock, so writers to
+    different shards never wait on each other. Lookups by ``hotel_id``
+    (or by a key that is the hotel id) go straight to one shard; other
+    lookups ask every shard and merge the answers in shard order.
+
+    ``lock`` takes every shard lock and is meant for bulk operations;
+    single-entity writers should lock the shard repository returned by
+    ``repository_for(entity_cls, hotel_id)`` instead.
+    """
+
+    def __init__(self, shards, key_field, shard_field=SHARD_FIELD):
+        self.shards = list(shards)
+        self.key_field = key_field
+        self.shard_field = shard_field
+        self.lock = LockSet([shard.lock for shard in self.shards])
+
+    def shard_number(self, value):
+        """Return the shard number for a ``shard_field`` value."""
+        return shard_of(value, len(self.shards))
+
+    def locate(self, key):
+        """Return the number of the shard holding ``key``, or None."""
+        for number in self._candidates(key):
+            if self.shards[number].exists(key):
+                return number
+        return None
+
+    def get(self, key):
+        """Return a copy of the entity with the given key, or None."""
+        number = self.locate(key)
+        return self.shards[number].get(key) if number is not None else None
+
+    def exists(self, key):
+        """Return True if an entity with the given key exists."""
+        return self.locate(key) is not None
+
+    def all(self):
+        """Return copies of every entity, shard by shard."""
+        return [entity for shard in self.shards for entity in shard.all()]
+
+    def find(self, **criteria):
+        """Return copies of the entities whose fields equal ``criteria``."""
+        if self.shard_field in criteria:
+            number = self.shard_number(criteria[self.shard_field])
+            return self.shards[number].find(**criteria)
+        return [entity for shard in self.shards
+                for entity in shard.find(**criteria)]
+
+    def iter_records(self):
+        """Yield raw records from every shard in turn."""
+        for shard in self.shards:
+            yield from shard.iter_records()
+
+    def version(self):
+        """Return the versions of every shard."""
+        return tuple(shard.version() for shard in self.shards)
+
+    def refresh(self):
+        """Bring every shard up to date and return their versions."""
+        return tuple(shard.refresh() for shard in self.shards)
+
+    def apply(self, ops):
+        """Persist operations, each shard under its own lock."""
+        grouped = split_ops(
+            ops, self.key_field, self.locate,
+            lambda entity: self.shard_number(
+                getattr(entity, self.shard_field)))
+        for number, shard_ops in sorted(grouped.items()):
+            self.shards[number].apply(shard_ops)
+
+    def adjust(self, key, field, delta, minimum=None, maximum_field=None):
+        """Adjust a numeric field in the shard holding ``key``."""
+        number = self.locate(key)
+        if number is None:
+            return None
+        return self.shards[number].adjust(key, field, delta, minimum,
+                                          maximum_field)
+
+    def save(self, entities):
+        """Replace the whole collection, splitting it across shards."""
+        grouped = [[] for _ in self.shards]
+        for entity in entities:
+            grouped[self.shard_number(
+                getattr(entity, self.shard_field))].append(entity)
+        with self.lock:
+            for shard, group in zip(self.shards, grouped):
+                shard.save(group)
+
+    def invalidate(self):
+        """Drop every shard's cache."""
+        for shard in self.shards:
+            shard.invalidate()
+
+    def add_listener(self, listener):
+        """
+        Keep ``listener`` in step with every shard; a shard reload resets
+        it from the entities of all shards.
+        """
+        loaded = [() for _ in self.shards]
+        for number, shard in enumerate(self.shards):
+            shard.add_listener(_ShardListener(listener, loaded, number))
+
+    def _candidates(self, key):
+        """Return the numbers of the shards that may hold ``key``."""
+        if self.key_field == self.shard_field:
+            return (self.shard_number(key),)
+        return range(len(self.shards))
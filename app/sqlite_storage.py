@@ -0,0 +1,191 @@
+"""SQLite storage backend module"""
+
+import contextlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.storage import OP_DELETE, file_stamp
+
+
+def _quote(name):
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteStorage:
+    """
+    Stores a collection as an indexed SQLite table in WAL mode.
+
+    The database lives next to the JSON file with a ``.sqlite3`` suffix
+    and holds one table named after the file stem, with one column per
+    entity field; fields added since the table was created become new
+    columns when a connection opens. Columns are always qualified with
+    the table name, so a missing one is an error rather than a string
+    literal. Every statement text is built once, so sqlite3's statement
+    cache reuses the prepared statements. Connections are per thread and
+    reopened after a fork.
+    """
+
+    def __init__(self, path, key_field, fields=(), indexes=()):
+        self.json_path = Path(path)
+        self.path = self.json_path.with_suffix(".sqlite3")
+        self.key_field = key_field
+        self.fields = tuple(fields) or (key_field,)
+        self.indexes = tuple(indexes)
+        self.table = _quote(self.json_path.stem)
+        self._local = threading.local()
+        self._adjust_sql = {}
+
+        columns = ", ".join(_quote(field) for field in self.fields)
+        selected = ", ".join(self._column(field) for field in self.fields)
+        key = self._column(key_field)
+        self._select_sql = (f"SELECT {selected} FROM {self.table} "
+                            f"ORDER BY rowid")
+        self._get_sql = (f"SELECT {selected} FROM {self.table} "
+                         f"WHERE {key} = ?")
+        self._delete_sql = f"DELETE FROM {self.table} WHERE {key} = ?"
+        updates = ", ".join(f"{_quote(f)} = excluded.{_quote(f)}"
+                            for f in self.fields if f != key_field)
+        self._upsert_sql = (
+            f"INSERT INTO {self.table} ({columns}) "
+            f"VALUES ({', '.join('?' for _ in self.fields)}) "
+            f"ON CONFLICT({_quote(key_field)}) DO "
+            + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+
+    def load(self):
+        """Return every record in insertion order."""
+        return list(self.iter_records())
+
+    def iter_records(self):
+        """Yield records one at a time from a database cursor."""
+        for row in self._connection().execute(self._select_sql):
+            yield dict(zip(self.fields, row))
+
+    def get(self, key):
+        """Return the record stored under ``key``, or None."""
+        row = self._connection().execute(self._get_sql, (key,)).fetchone()
+        return dict(zip(self.fields, row)) if row is not None else None
+
+    def stamp(self):
+        """Return a fingerprint of the database and its WAL file."""
+        return (file_stamp(self.path),
+                file_stamp(self.path.with_name(self.path.name + "-wal")))
+
+    def save(self, records):
+        """Replace the whole table in one transaction."""
+        connection = self._connection()
+        with _transaction(connection):
+            connection.execute(f"DELETE FROM {self.table}")
+            connection.executemany(self._upsert_sql, (
+                tuple(record.get(field) for field in self.fields)
+                for record in records
+            ))
+
+    def apply(self, ops):
+        """Persist (op, key, record) operations in one transaction."""
+        connection = self._connection()
+        with _transaction(connection):
+            for op, key, record in ops:
+                if op == OP_DELETE:
+                    connection.execute(self._delete_sql, (key,))
+                else:
+                    connection.execute(self._upsert_sql, tuple(
+                        record.get(field) for field in self.fields))
+
+    def changes_since(self, old_stamp, new_stamp):
+        """SQLite keeps no change feed; callers reload instead."""
+        # pylint: disable=unused-argument
+        return None
+
+    def adjust(self, key, field, delta, minimum=None, maximum_field=None):
+        """
+        Add ``delta`` to a numeric field with one conditional UPDATE.
+
+        Returns the updated record, None if ``key`` does not exist, or
+        False if the new value would leave [minimum, maximum_field].
+        """
+        sql = self._adjust_sql.get((field, minimum is None, maximum_field))
+        if sql is None:
+            column = self._column(field)
+            conditions = [f"{self._column(self.key_field)} = :key"]
+            if minimum is not None:
+                conditions.append(f"{column} + :delta >= :minimum")
+            if maximum_field is not None:
+                conditions.append(
+                    f"{column} + :delta <= {self._column(maximum_field)}")
+            sql = (f"UPDATE {self.table} SET {_quote(field)} = "
+                   f"{column} + :delta WHERE {' AND '.join(conditions)}")
+            self._adjust_sql[(field, minimum is None, maximum_field)] = sql
+
+        connection = self._connection()
+        with _transaction(connection):
+            cursor = connection.execute(
+                sql, {"key": key, "delta": delta, "minimum": minimum})
+            record = self.get(key)
+
+        if cursor.rowcount == 0:
+            return None if record is None else False
+        return record
+
+    def _connection(self):
+        """Return this thread's connection, creating the schema if needed."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            + ", ".join(
+                _quote(field) + (" PRIMARY KEY" if field == self.key_field
+                                 else "")
+                for field in self.fields)
+            + ")"
+        )
+        self._add_missing_columns(connection)
+        for field in self.indexes:
+            if field != self.key_field:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{_quote(self.json_path.stem + '_' + field)} "
+                    f"ON {self.table} ({_quote(field)})"
+                )
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _column(self, field):
+        """Return ``field`` as a column reference qualified by the table."""
+        return f"{self.table}.{_quote(field)}"
+
+    def _add_missing_columns(self, connection):
+        """Add a column for every field a table from an older version lacks."""
+        sql = f"PRAGMA table_info({self.table})"
+        if set(self.fields) <= {row[1] for row in connection.execute(sql)}:
+            return
+        with _transaction(connection):
+            existing = {row[1] for row in connection.execute(sql)}
+            for field in self.fields:
+                if field not in existing:
+                    connection.execute(f"ALTER TABLE {self.table} "
+                                       f"ADD COLUMN {_quote(field)}")
+
+
+@contextlib.contextmanager
+def _transaction(connection):
+    """Run a block inside BEGIN IMMEDIATE ... COMMIT, rolling back on error."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
@@ -0,0 +1,733 @@
+"""Storage backends module"""
+
+import atexit
+import contextlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from app import metrics, serializers
+
+OP_CREATE = "create"
+OP_MODIFY = "modify"
+OP_DELETE = "delete"
+# Only reported by changes_since: (OP_UPDATE, key, {field: value}) sets
+# some fields of an existing record.
+OP_UPDATE = "update"
+
+
+CHUNK_SIZE = 64 * 1024
+_SEPARATOR = re.compile(r"[\s,]*")
+
+# How writes reach the disk. "fsync" syncs every file replacement and
+# every append (transaction log entries, journal lines, counter slots)
+# before returning. "group" still syncs replacements, but syncs appends
+# at most once per GROUP_COMMIT_SECONDS per file, so a crash can lose
+# the writes of that window, and a transaction of that window may be
+# found applied to some stores only (a replaced file is never torn).
+# "none" leaves flushing to the operating system.
+DURABILITY_FSYNC = "fsync"
+DURABILITY_GROUP = "group"
+DURABILITY_NONE = "none"
+DURABILITY_MODES = (DURABILITY_FSYNC, DURABILITY_GROUP, DURABILITY_NONE)
+DURABILITY = DURABILITY_FSYNC
+GROUP_COMMIT_SECONDS = 0.05
+
+_sync_lock = threading.Lock()
+_last_sync = {}
+_unsynced = set()
+_sync_timer = None
+# Per thread: the files whose syncs a grouped_sync() block holds back.
+_grouped = threading.local()
+
+
+class CorruptFileError(ValueError):
+    """Raised when a data file and its backup both fail their checksums."""
+
+
+def set_durability(mode, group_commit_seconds=None):
+    """Choose how writes are synced; see DURABILITY_MODES."""
+    global DURABILITY, GROUP_COMMIT_SECONDS  # pylint: disable=global-statement
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"Unknown durability mode: {mode}")
+    sync_pending()
+    DURABILITY = mode
+    if group_commit_seconds is not None:
+        GROUP_COMMIT_SECONDS = group_commit_seconds
+
+
+def sync_appended(file):
+    """Make the data appended to an open ``file`` durable per DURABILITY."""
+    if DURABILITY == DURABILITY_NONE:
+        return
+    file.flush()
+    if not _held_back(file.name):
+        os.fsync(file.fileno())
+
+
+def sync_mapped(mapping, path):
+    """Make the changes to a shared ``mapping`` of ``path`` durable."""
+    if DURABILITY == DURABILITY_NONE:
+        return
+    if not _held_back(str(path)):
+        mapping.flush()
+
+
+@contextlib.contextmanager
+def grouped_sync():
+    """
+    Hold back the syncs of the appends made by this thread in the block
+    and sync each file once when it ends, so a write touching several
+    stores pays one sync per file rather than one per append.
+    """
+    if getattr(_grouped, "names", None) is not None:
+        yield
+        return
+    _grouped.names = set()
+    try:
+        yield
+    finally:
+        names, _grouped.names = _grouped.names, None
+        for name in sorted(names):
+            if not _held_back(name):
+                _sync_path(name)
+
+
+def _held_back(name):
+    """
+    Return True if the sync of file ``name`` is left to the enclosing
+    grouped_sync() block or to the group commit timer, False if the
+    caller has to sync now.
+    """
+    names = getattr(_grouped, "names", None)
+    if names is not None:
+        names.add(name)
+        return True
+    if DURABILITY != DURABILITY_GROUP:
+        return False
+
+    global _sync_timer  # pylint: disable=global-statement
+    now = time.monotonic()
+    with _sync_lock:
+        if now - _last_sync.get(name, 0.0) < GROUP_COMMIT_SECONDS:
+            # Synced by the timer along with every other append of the
+            # window.
+            _unsynced.add(name)
+            if _sync_timer is None:
+                _sync_timer = threading.Timer(GROUP_COMMIT_SECONDS,
+                                              sync_pending)
+                _sync_timer.daemon = True
+                _sync_timer.start()
+            return True
+        _last_sync[name] = now
+        _unsynced.discard(name)
+    return False
+
+
+def _sync_path(name):
+    """Sync the file called ``name``, if it still exists."""
+    try:
+        descriptor = os.open(name, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def sync_pending():
+    """Sync every file whose appends a group commit has held back."""
+    global _sync_timer  # pylint: disable=global-statement
+    with _sync_lock:
+        names = list(_unsynced)
+        _unsynced.clear()
+        if _sync_timer is not None:
+            _sync_timer.cancel()
+            _sync_timer = None
+    for name in names:
+        _sync_path(name)
+        _last_sync[name] = time.monotonic()
+
+
+atexit.register(sync_pending)
+
+
+def checksum_path(path):
+    """Return the file recording the checksums of ``path``."""
+    path = Path(path)
+    return path.with_name(path.name + ".sum")
+
+
+def backup_path(path):
+    """Return the last-known-good copy of ``path``."""
+    path = Path(path)
+    return path.with_name(path.name + ".bak")
+
+
+def read_checksums(path):
+    """
+    Return the (crc32, size) pairs accepted for ``path``: its current
+    contents first, then its backup. Empty if none were recorded.
+    """
+    try:
+        text = checksum_path(path).read_text(encoding="ascii")
+    except FileNotFoundError:
+        return []
+    sums = []
+    for line in text.splitlines():
+        try:
+            checksum, size = line.split()
+            sums.append((int(checksum, 16), int(size)))
+        except ValueError:
+            continue
+    return sums
+
+
+def _checksum(data):
+    """Return the (crc32, size) pair of ``data``."""
+    return zlib.crc32(data), len(data)
+
+
+def _read_bytes(path):
+    """Return the contents of ``path``, or None if it is missing."""
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def read_verified(path):
+    """
+    Return the bytes of ``path``, or of its backup when ``path`` does not
+    match its recorded checksums, or None if there is no file. Files
+    written before checksums existed are returned as they are.
+    """
+    path = Path(path)
+    for _ in range(3):
+        sums = read_checksums(path)
+        raw = _read_bytes(path)
+        if raw is None or not sums or _checksum(raw) in sums:
+            return raw
+        # A writer may have replaced the file between the two reads.
+        if read_checksums(path) == sums:
+            break
+
+    backup = _read_bytes(backup_path(path))
+    if backup is not None and _checksum(backup) in read_checksums(path):
+        print(f"Checksum mismatch in {path.name}: "
+              f"reading the last good backup")
+        return backup
+    raise CorruptFileError(
+        f"{path} does not match its checksum and has no good backup")
+
+
+def _fsync_directory(path):
+    """Sync a directory so a rename inside it survives a crash."""
+    if DURABILITY == DURABILITY_NONE or not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _write_temp(path, chunks):
+    """
+    Write ``chunks`` to a temporary file next to ``path``, synced per
+    DURABILITY; return the temporary path and the (crc32, size) pair.
+    """
+    temp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    checksum, size = 0, 0
+    try:
+        with open(temp, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                checksum = zlib.crc32(chunk, checksum)
+                size += len(chunk)
+            if DURABILITY != DURABILITY_NONE:
+                file.flush()
+                os.fsync(file.fileno())
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    return temp, (checksum, size)
+
+
+def replace_file(path, chunks):
+    """
+    Atomically replace ``path`` with the bytes in ``chunks``; return the
+    number of bytes written.
+
+    The data goes to a temporary file in the same directory, is synced
+    and renamed over ``path``, so readers see the old contents or the
+    new ones, never a mix. The replaced file becomes the backup if it
+    still matches its checksum. The checksum file, which lists both
+    the new contents and the backup, is replaced before the data, so it
+    matches whichever of the two a reader finds.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp, new = _write_temp(path, chunks)
+
+    sums = read_checksums(path)
+    kept = sums[1:2]
+    current = _read_bytes(path)
+    if current is not None and (not sums or _checksum(current) in sums):
+        kept = [_checksum(current)]
+        backup = backup_path(path)
+        link = backup.with_name(f".{backup.name}.{os.getpid()}.tmp")
+        link.unlink(missing_ok=True)
+        try:
+            os.link(path, link)
+        except OSError:
+            shutil.copyfile(path, link)
+        os.replace(link, backup)
+
+    text = "".join(f"{checksum:08x} {size}\n"
+                   for checksum, size in [new] + kept)
+    sums_temp, _ = _write_temp(checksum_path(path), [text.encode("ascii")])
+    os.replace(sums_temp, checksum_path(path))
+    os.replace(temp, path)
+    _fsync_directory(path.parent)
+    return new[1]
+
+
+def remove_file(path):
+    """Delete ``path`` together with its checksums and backup."""
+    for candidate in (path, checksum_path(path), backup_path(path)):
+        Path(candidate).unlink(missing_ok=True)
+
+
+@metrics.timed("json_decode", metrics.STAGE_SECONDS)
+def read_json_array(path):
+    """
+    Read a JSON array file, returning [] when missing or invalid.
+
+    The contents are checked against the recorded checksums first; a
+    torn or damaged file is read from its backup instead, and
+    CorruptFileError is raised when neither copy is intact.
+    """
+    path = Path(path)
+    raw = read_verified(path)
+    if raw is None:
+        return []
+    if metrics.ENABLED:
+        metrics.BYTES_READ.inc(len(raw), path.name)
+
+    head = serializers.first_byte(raw)
+    if head == b"{":
+        return _decode_lines(raw)
+    if head and serializers.detect(head) is None:
+        print("Invalid JSON structure: expected a list")
+        return []
+
+    fmt = serializers.detect(head) or serializers.JsonFormat
+    if not fmt.available():
+        print(f"Cannot read {fmt.name} file: package not installed")
+        return []
+    try:
+        data = fmt.loads(raw)
+    except ValueError:
+        print("Invalid JSON file")
+        return []
+
+    if not isinstance(data, list):
+        print("Invalid JSON structure: expected a list")
+        return []
+
+    return data
+
+
+def _decode_lines(raw):
+    """Decode JSON Lines bytes, stopping at the first malformed line."""
+    records = []
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(serializers.loads_json(line))
+        except ValueError:
+            print("Invalid JSON file")
+            break
+    return records
+
+
+def iter_json_records(path):
+    """
+    Yield records one at a time from a JSON array or JSON Lines file.
+
+    Arrays are decoded incrementally chunk by chunk, so memory stays
+    bounded by the largest record rather than the file size. Decoding
+    stops with a message at the first malformed record. Binary formats
+    are decoded whole, and so is a file whose size does not match its
+    checksums, so that it is verified and read from its backup.
+    """
+    path = Path(path)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return
+    sums = read_checksums(path)
+    if sums and all(size != stamp[1] for _, size in sums):
+        yield from read_json_array(path)
+        return
+
+    with open(path, "rb") as file:
+        head = serializers.first_byte(file.read(CHUNK_SIZE))
+    fmt = serializers.detect(head)
+    if fmt is not None and fmt is not serializers.JsonFormat:
+        yield from read_json_array(path)
+        return
+
+    with open(path, "r", encoding="utf-8") as file:
+        first = _first_char(file)
+        if first == "[":
+            yield from _iter_json_array(file)
+        elif first == "{":
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield serializers.loads_json(line)
+                except ValueError:
+                    print("Invalid JSON file")
+                    return
+        elif first:
+            print("Invalid JSON structure: expected a list")
+
+
+def _first_char(file):
+    """Return the first non-whitespace character and rewind the file."""
+    while True:
+        char = file.read(1)
+        if not char or not char.isspace():
+            file.seek(0)
+            return char
+
+
+def _iter_json_array(file):
+    """Incrementally decode the elements of a JSON array."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE)
+    pos = buffer.index("[") + 1
+    eof = False
+
+    while True:
+        pos = _SEPARATOR.match(buffer, pos).end()
+        if buffer.startswith("]", pos):
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+            # A trailing number may continue in the next chunk.
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                print("Invalid JSON file")
+                return
+            complete = False
+
+        if not complete:
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield record
+        pos = end
+
+
+def write_json_lines(path, records):
+    """Atomically write records as JSON Lines, one record at a time."""
+    replace_file(path, ((serializers.dumps_json(record) + "\n")
+                        .encode("utf-8") for record in records))
+
+
+def write_json_array(path, records):
+    """Write records to a compact JSON array file."""
+    write_records(path, records, serializers.JsonFormat.name)
+
+
+@metrics.timed("json_encode", metrics.STAGE_SECONDS)
+def write_records(path, records, data_format):
+    """
+    Atomically write records as one array in the named serialization
+    format.
+    """
+    path = Path(path)
+    data = serializers.get_format(data_format).dumps(list(records))
+    replace_file(path, [data])
+    if metrics.ENABLED:
+        metrics.BYTES_WRITTEN.inc(len(data), path.name)
+
+
+def file_stamp(path):
+    """Return (mtime_ns, size, inode) of a file, or None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def apply_ops(records, key_field, ops):
+    """Apply (op, key, record) operations to a list of raw records."""
+    records = list(records)
+    positions = {}
+    for index, record in enumerate(records):
+        if isinstance(record, dict) and key_field in record:
+            positions[record[key_field]] = index
+
+    deleted = set()
+    for op, key, record in ops:
+        if op == OP_DELETE:
+            if key in positions:
+                deleted.add(positions.pop(key))
+        elif key in positions:
+            records[positions[key]] = record
+        else:
+            positions[key] = len(records)
+            records.append(record)
+
+    return [r for i, r in enumerate(records) if i not in deleted]
+
+
+class JsonFileStorage:
+    """
+    Stores a collection as one JSON array rewritten on every change.
+
+    Snapshots are written in ``data_format`` ("json" or "msgpack");
+    reads detect the format from the file itself, so changing it only
+    affects the next write.
+    """
+
+    data_format = serializers.JsonFormat.name
+
+    def __init__(self, path, key_field, fields=(), indexes=(),
+                 data_format=None):
+        self.path = Path(path)
+        self.key_field = key_field
+        self.fields = tuple(fields)
+        self.indexes = tuple(indexes)
+        if data_format is not None:
+            self.data_format = serializers.get_format(data_format).name
+
+    def load(self):
+        """Return every raw record in the collection."""
+        return read_json_array(self.path)
+
+    def iter_records(self):
+        """Yield raw records one at a time."""
+        return iter_json_records(self.path)
+
+    def stamp(self):
+        """Return a cheap fingerprint that changes when the file changes."""
+        return file_stamp(self.path)
+
+    def save(self, records):
+        """Replace the whole collection with the given raw records."""
+        write_records(self.path, records, self.data_format)
+
+    def apply(self, ops):
+        """Persist a sequence of (op, key, record) operations."""
+        self.save(apply_ops(self.load(), self.key_field, ops))
+
+    def changes_since(self, old_stamp, new_stamp):
+        """
+        Return the operations between two stamps, or None when the only
+        way to catch up is a full reload.
+        """
+        # pylint: disable=unused-argument
+        return None
+
+
+class JournalStorage(JsonFileStorage):
+    """
+    Stores a collection as a JSON array snapshot plus an append-only
+    journal with one line per create/modify/delete.
+
+    The snapshot keeps the original JSON array format, so existing data
+    files are read as-is. Appends are synced as DURABILITY says. The
+    journal is folded back into the snapshot once it grows larger than
+    the snapshot itself.
+    """
+
+    compact_min_bytes = 64 * 1024
+
+    def __init__(self, path, key_field, fields=(), indexes=(),
+                 data_format=None):
+        super().__init__(path, key_field, fields, indexes, data_format)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+
+    def load(self):
+        """Return the snapshot records with the journal replayed on top."""
+        return apply_ops(read_json_array(self.path), self.key_field,
+                         self._read_journal())
+
+    def iter_records(self):
+        """
+        Yield snapshot records with the journal applied, streaming the
+        snapshot and holding only the (bounded) journal in memory.
+        """
+        changes = {}
+        moved = set()
+        for op, key, record in self._read_journal():
+            if op == OP_DELETE:
+                changes[key] = None
+            elif key in changes and changes[key] is None:
+                del changes[key]
+                changes[key] = record
+                moved.add(key)
+            else:
+                changes[key] = record
+
+        for record in iter_json_records(self.path):
+            key = (record.get(self.key_field)
+                   if isinstance(record, dict) else None)
+            if key is None or key not in changes:
+                yield record
+            elif key not in moved and changes[key] is not None:
+                yield changes.pop(key)
+
+        for record in changes.values():
+            if record is not None:
+                yield record
+
+    def stamp(self):
+        """Return a fingerprint covering both snapshot and journal."""
+        return file_stamp(self.path), file_stamp(self.journal_path)
+
+    def save(self, records):
+        """Write a fresh snapshot and discard the journal."""
+        super().save(records)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+
+    def apply(self, ops):
+        """Append the operations to the journal."""
+        if self._append(ops) and self._needs_compaction():
+            self.compact()
+
+    def _append(self, ops):
+        """Write journal lines for ``ops``; return False if there were none."""
+        lines = []
+        for op, key, record in ops:
+            entry = {"op": op, "key": key}
+            if op != OP_DELETE:
+                entry["record"] = record
+            lines.append(serializers.dumps_json(entry) + "\n")
+
+        if not lines:
+            return False
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        prefix = "" if self._journal_ends_cleanly() else "\n"
+        text = prefix + "".join(lines)
+        with open(self.journal_path, "a", encoding="utf-8") as file:
+            file.write(text)
+            sync_appended(file)
+        if metrics.ENABLED:
+            metrics.BYTES_WRITTEN.inc(len(text.encode("utf-8")),
+                                      self.journal_path.name)
+        return True
+
+    def changes_since(self, old_stamp, new_stamp):
+        """Return the journal entries appended between two stamps."""
+        if old_stamp is None or new_stamp is None:
+            return None
+        old_snapshot, old_journal = old_stamp
+        new_snapshot, new_journal = new_stamp
+        if old_snapshot != new_snapshot or new_journal is None:
+            return None
+        if old_journal is not None and old_journal[2] != new_journal[2]:
+            return None
+
+        start = old_journal[1] if old_journal is not None else 0
+        end = new_journal[1]
+        if end < start:
+            return None
+
+        try:
+            with open(self.journal_path, "rb") as file:
+                file.seek(max(start - 1, 0))
+                data = file.read(end - max(start - 1, 0))
+        except FileNotFoundError:
+            return None
+        if metrics.ENABLED:
+            metrics.BYTES_READ.inc(len(data), self.journal_path.name)
+
+        if start > 0:
+            if not data.startswith(b"\n"):
+                return None
+            data = data[1:]
+        if data and not data.endswith(b"\n"):
+            return None
+
+        ops = []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = serializers.loads_json(line)
+                if entry["op"] not in (OP_CREATE, OP_MODIFY, OP_DELETE):
+                    return None
+                ops.append((entry["op"], entry["key"], entry.get("record")))
+            except (ValueError, KeyError, TypeError):
+                return None
+        return ops
+
+    def compact(self):
+        """Fold the journal into the snapshot."""
+        self.save(self.load())
+
+    def journal_ops(self):
+        """Return the (op, key, record) entries not yet in the snapshot."""
+        return list(self._read_journal())
+
+    def _read_journal(self):
+        """Yield (op, key, record) tuples from the journal."""
+        if not self.journal_path.exists():
+            return
+        if metrics.ENABLED:
+            metrics.BYTES_READ.inc(self.journal_path.stat().st_size,
+                                   self.journal_path.name)
+
+        with open(self.journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entry = serializers.loads_json(line)
+                    op, key = entry["op"], entry["key"]
+                    if op not in (OP_CREATE, OP_MODIFY, OP_DELETE):
+                        raise ValueError(op)
+                    yield op, key, entry.get("record")
+                except (KeyError, TypeError, ValueError):
+                    print(f"Invalid journal entry skipped: {line.strip()}")
+
+    def _journal_ends_cleanly(self):
+        """Check that a previous append was not torn mid-line."""
+        try:
+            with open(self.journal_path, "rb") as file:
+                file.seek(0, os.SEEK_END)
+                if file.tell() == 0:
+                    return True
+                file.seek(-1, os.SEEK_END)
+                return file.read(1) == b"\n"
+        except FileNotFoundError:
+            return True
+
+    def _needs_compaction(self):
+        """Return True once the journal outweighs the snapshot."""
+        journal_size = self.journal_path.stat().st_size
+        snapshot_size = (self.path.stat().st_size
+                         if self.path.exists() else 0)
+        return journal_size > max(snapshot_size, self.compact_min_bytes)
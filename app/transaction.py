@@ -0,0 +1,406 @@
+"""Transaction module"""
+
+import contextlib
+import copy
+import json
+import uuid
+import zlib
+from pathlib import Path
+
+from app.locking import lock_for
+from app.repository import repository_for
+from app.sharding import (
+    SHARD_FIELD,
+    shard_files,
+    shard_of,
+    shard_path,
+    split_ops,
+)
+from app.storage import (
+    OP_CREATE,
+    OP_DELETE,
+    OP_MODIFY,
+    grouped_sync,
+    sync_appended,
+)
+
+
+TRANSACTION_RETRIES = 20
+
+# (log path, shard counts) -> every log a transaction has to recover.
+_WAL_PATHS = {}
+
+
+class TransactionConflict(RuntimeError):
+    """Raised on commit when a store changed after the transaction read it."""
+
+
+def run_with_retries(begin, work, retries=TRANSACTION_RETRIES):
+    """
+    Run ``work(transaction)`` in a fresh transaction from ``begin()``,
+    retrying when the commit hits a conflict.
+    """
+    for attempt in range(retries):
+        try:
+            with begin() as transaction:
+                return work(transaction)
+        except TransactionConflict:
+            if attempt == retries - 1:
+                raise
+    return None
+
+
+def _state(entity):
+    """Return a comparable snapshot of an entity, or None."""
+    return entity.to_dict() if entity is not None else None
+
+
+class TransactionView:
+    """Repository-like view of one entity class inside a transaction."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.version = repository.refresh()
+        self._staged = {}
+        self._read = {}
+        self._queries = {}
+
+    def get(self, key):
+        """Return a copy of the staged or stored entity, or None."""
+        if key in self._staged:
+            entity = self._staged[key]
+            return copy.copy(entity) if entity is not None else None
+        return self._read_through(key)
+
+    def exists(self, key):
+        """Return True if the entity exists once staged changes apply."""
+        if key in self._staged:
+            return self._staged[key] is not None
+        return self._read_through(key) is not None
+
+    def find(self, **criteria):
+        """
+        Return the entities matching ``criteria`` once staged changes
+        apply, remembering the stored matches.
+        """
+        stored = self.repository.find(**criteria)
+        self._queries.setdefault(tuple(sorted(criteria.items())),
+                                 [_state(entity) for entity in stored])
+
+        found = {getattr(entity, self.repository.key_field): entity
+                 for entity in stored}
+        for key, entity in self._staged.items():
+            found.pop(key, None)
+            if entity is not None and all(
+                    getattr(entity, field) == value
+                    for field, value in criteria.items()):
+                found[key] = copy.copy(entity)
+        return list(found.values())
+
+    def conflicts(self):
+        """
+        Return True if an entity or query result this view read has
+        changed since.
+        """
+        if self.repository.version() == self.version:
+            return False
+        if any(_state(self.repository.get(key)) != state
+               for key, state in self._read.items()):
+            return True
+        return any([_state(entity) for entity
+                    in self.repository.find(**dict(criteria))] != states
+                   for criteria, states in self._queries.items())
+
+    def apply(self, ops):
+        """Stage (op, key, entity) operations without persisting them."""
+        for op, key, entity in ops:
+            if op == OP_DELETE:
+                self._staged[key] = None
+                continue
+
+            new_key = getattr(entity, self.repository.key_field)
+            if new_key != key:
+                self._staged[key] = None
+            self._staged[new_key] = copy.copy(entity)
+
+    def _read_through(self, key):
+        """Read ``key`` from the repository and remember what was seen."""
+        entity = self.repository.get(key)
+        self._read.setdefault(key, _state(entity))
+        return entity
+
+    def staged_ops(self):
+        """Return one operation per key holding its final staged state."""
+        ops = []
+        for key, entity in self._staged.items():
+            if entity is None:
+                ops.append((OP_DELETE, key, None))
+            elif self.repository.exists(key):
+                ops.append((OP_MODIFY, key, entity))
+            else:
+                ops.append((OP_CREATE, key, entity))
+        return ops
+
+
+class ShardedView:
+    """
+    TransactionView-like router over the shard views of a sharded class.
+
+    Keys and queries that name a hotel go to that hotel's shard; others
+    are looked up in every shard, so a missing key is remembered as
+    missing in each of them.
+    """
+
+    def __init__(self, transaction, entity_cls, count):
+        self.transaction = transaction
+        self.entity_cls = entity_cls
+        self.count = count
+
+    def get(self, key):
+        """Return a copy of the staged or stored entity, or None."""
+        shard = self._locate(key)
+        return self._shard(shard).get(key) if shard is not None else None
+
+    def exists(self, key):
+        """Return True if the entity exists once staged changes apply."""
+        return self._locate(key) is not None
+
+    def find(self, **criteria):
+        """Return the matching entities once staged changes apply."""
+        if SHARD_FIELD in criteria:
+            shard = shard_of(criteria[SHARD_FIELD], self.count)
+            return self._shard(shard).find(**criteria)
+        return [entity for shard in range(self.count)
+                for entity in self._shard(shard).find(**criteria)]
+
+    def apply(self, ops):
+        """Stage operations in the views of the shards they belong to."""
+        grouped = split_ops(
+            ops, self.entity_cls.key_field, self._locate,
+            lambda entity: shard_of(getattr(entity, SHARD_FIELD),
+                                    self.count))
+        for shard, shard_ops in grouped.items():
+            self._shard(shard).apply(shard_ops)
+
+    def _shard(self, shard):
+        """Return the transaction's view of one shard."""
+        return self.transaction.view(self.entity_cls, shard)
+
+    def _locate(self, key):
+        """Return the shard holding ``key`` once staged changes apply."""
+        if self.entity_cls.key_field == SHARD_FIELD:
+            shards = (shard_of(key, self.count),)
+        else:
+            shards = range(self.count)
+        for shard in shards:
+            if self._shard(shard).exists(key):
+                return shard
+        return None
+
+
+class Transaction:
+    """
+    Unit of work spanning several entity classes.
+
+    Reads go through the shared repositories, so each store is loaded at
+    most once, and writes are staged in memory. On commit the final state
+    of every staged entity is written as one checksummed line to a
+    write-ahead log and synced (see ``storage.DURABILITY``) before being
+    applied to the stores. The store writes are synced together, one
+    sync per file touched, before the log is emptied, so a synced commit
+    is always either in the log or on disk in every store. A log line
+    left behind by a crash is replayed the next time a transaction
+    starts; a torn line is discarded.
+
+    Concurrency is optimistic: each view remembers the entities and
+    ``find`` results it read, and the commit, holding the log lock and
+    the lock of every store it writes, raises TransactionConflict if any
+    of them changed in the meantime. Writes to other keys of the same
+    store do not conflict. Stores that are only read are checked without
+    being locked.
+
+    Sharded classes get one view per shard touched. A commit whose
+    writes all fall in one shard logs to that shard's own write-ahead
+    log, so commits to different shards share no lock at all.
+
+    Used as a context manager, the transaction commits on success and
+    discards its staged changes when the block raises.
+    """
+
+    def __init__(self, wal_path, entity_classes):
+        self.wal_path = Path(wal_path)
+        self.entity_classes = {cls.__name__: cls for cls in entity_classes}
+        self._views = {}
+        self._sharded = {}
+
+    def __enter__(self):
+        self.recover()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def view(self, entity_cls, shard=None):
+        """
+        Return the staged view for an entity class, or for one shard of
+        a sharded class.
+        """
+        count = getattr(entity_cls, "shards", 1)
+        if count > 1 and shard is None:
+            view = self._sharded.get(entity_cls)
+            if view is None:
+                view = ShardedView(self, entity_cls, count)
+                self._sharded[entity_cls] = view
+            return view
+
+        view = self._views.get((entity_cls, shard))
+        if view is None:
+            view = TransactionView(repository_for(entity_cls, shard=shard))
+            self._views[(entity_cls, shard)] = view
+        return view
+
+    def commit(self):
+        """Log staged changes and apply them to the stores."""
+        views, self._views = self._views, {}
+        self._sharded = {}
+        written = {key: view for key, view in views.items()
+                   if view.staged_ops()}
+        if not written:
+            return
+
+        wal_path = self._wal_for(written)
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(lock_for(wal_path))
+            for view in sorted(written.values(),
+                               key=lambda v: str(v.repository.storage.path)):
+                stack.enter_context(view.repository.lock)
+
+            # A committer that crashed after logging left its entry here.
+            self._recover_file(wal_path)
+            if any(view.conflicts() for view in views.values()):
+                raise TransactionConflict("Entity changed during transaction")
+
+            self._commit(written, wal_path)
+
+    def _wal_for(self, keys):
+        """
+        Return the log for a commit writing the (entity class, shard)
+        pairs in ``keys``: the shard's own log when all of them lie in
+        the same shard, otherwise the shared one.
+        """
+        shards = {(shard, getattr(entity_cls, "shards", 1))
+                  for entity_cls, shard in keys}
+        if len(shards) == 1:
+            shard, count = shards.pop()
+            if shard is not None:
+                return shard_path(self.wal_path, shard, count)
+        return self.wal_path
+
+    def _commit(self, views, wal_path):
+        """Write the log entry and apply it; the caller holds the locks."""
+        changes = []
+        for (entity_cls, shard), view in views.items():
+            ops = view.staged_ops()
+            if ops:
+                change = {
+                    "entity": entity_cls.__name__,
+                    "ops": [
+                        [op, key, entity.to_dict() if entity is not None
+                         else None]
+                        for op, key, entity in ops
+                    ],
+                }
+                if shard is not None:
+                    change["shard"] = [shard, entity_cls.shards]
+                changes.append(change)
+        if not changes:
+            return
+
+        payload = json.dumps({"txn": uuid.uuid4().hex, "changes": changes},
+                             separators=(",", ":"))
+        wal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(wal_path, "a", encoding="utf-8") as file:
+            file.write(f"{zlib.crc32(payload.encode()):08x} {payload}\n")
+            sync_appended(file)
+
+        with grouped_sync():
+            self._apply(changes)
+        self._truncate_wal(wal_path)
+
+    def rollback(self):
+        """Discard every staged change."""
+        self._views = {}
+        self._sharded = {}
+
+    def recover(self):
+        """Replay committed log entries and drop torn ones."""
+        for wal_path in self._wal_paths():
+            self._recover_file(wal_path)
+
+    def _wal_paths(self):
+        """
+        Return the shared log plus one per shard of the current shard
+        counts; logs of earlier counts are looked up once per process.
+        """
+        counts = tuple(sorted({getattr(cls, "shards", 1)
+                               for cls in self.entity_classes.values()}))
+        key = (self.wal_path, counts)
+        paths = _WAL_PATHS.get(key)
+        if paths is None:
+            paths = {self.wal_path, *shard_files(self.wal_path)}
+            paths.update(shard_path(self.wal_path, shard, count)
+                         for count in counts if count > 1
+                         for shard in range(count))
+            paths = _WAL_PATHS[key] = sorted(paths)
+        return paths
+
+    def _recover_file(self, wal_path):
+        """Replay one write-ahead log."""
+        if not wal_path.exists() or not wal_path.stat().st_size:
+            return
+
+        with lock_for(wal_path):
+            with open(wal_path, "r", encoding="utf-8") as file:
+                lines = file.readlines()
+
+            for line in lines:
+                checksum, _, payload = line.rstrip("\n").partition(" ")
+                try:
+                    if (not line.endswith("\n") or
+                            int(checksum, 16) !=
+                            zlib.crc32(payload.encode())):
+                        raise ValueError("checksum mismatch")
+                    changes = json.loads(payload)["changes"]
+                except (json.JSONDecodeError, KeyError, TypeError,
+                        ValueError):
+                    print(f"Incomplete transaction discarded: "
+                          f"{line.strip()}")
+                    continue
+                with grouped_sync():
+                    self._apply(changes)
+
+            self._truncate_wal(wal_path)
+
+    def _apply(self, changes):
+        """Apply logged changes to each entity store."""
+        for change in changes:
+            entity_cls = self.entity_classes[change["entity"]]
+            shard, count = change.get("shard") or (None, None)
+            if count != getattr(entity_cls, "shards", 1):
+                # Logged before a reshard: route by content instead.
+                shard = None
+            repository_for(entity_cls, shard=shard).apply([
+                (op, key, entity_cls.from_dict(record)
+                 if record is not None else None)
+                for op, key, record in change["ops"]
+            ])
+
+    @staticmethod
+    def _truncate_wal(wal_path):
+        """Empty a write-ahead log once its entries are applied."""
+        with open(wal_path, "w", encoding="utf-8") as file:
+            sync_appended(file)
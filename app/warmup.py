@@ -0,0 +1,145 @@
+"""Warm-start image module"""
+
+import argparse
+import collections
+import itertools
+import marshal
+import sys
+import time
+from pathlib import Path
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+from app.search import search_index_for
+from app.sharding import partitions
+from app.storage import CorruptFileError, read_verified, replace_file
+
+MAGIC = "HOTELIMG"
+FORMAT_VERSION = 1
+ENTITY_CLASSES = (Hotel, Customer, Reservation)
+
+
+def image_path(path):
+    """Return the warm-start image kept next to the data file ``path``."""
+    path = Path(path)
+    return path.with_name(path.name + ".image")
+
+
+def _slots(entity_cls):
+    """Return the slot names of ``entity_cls`` and its bases, in order."""
+    names = []
+    for cls in reversed(entity_cls.__mro__):
+        slots = cls.__dict__.get("__slots__", ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return tuple(names)
+
+
+def _header(entity_cls):
+    """
+    Return what an image must have been written for: this format, this
+    marshal and Python version, and the entity's attribute layout.
+    """
+    return (MAGIC, FORMAT_VERSION, marshal.version,
+            tuple(sys.version_info[:2]), entity_cls.__name__,
+            _slots(entity_cls))
+
+
+def save_image(entity_cls, repository):
+    """
+    Write the loaded collection of ``repository`` to its image; return
+    the number of bytes written.
+
+    Entities are stored column by column, one tuple of values per slot,
+    together with the secondary indexes and the version they reflect,
+    encoded with ``marshal`` so that loading runs no Python code of
+    ours per entity.
+    """
+    version, entities, index = repository.snapshot()
+    columns = tuple(tuple(getattr(entity, slot) for entity
+                          in entities.values())
+                    for slot in _slots(entity_cls))
+    data = marshal.dumps((_header(entity_cls), version, len(entities),
+                          columns, index))
+    return replace_file(image_path(repository.storage.path), [data])
+
+
+def load_image(entity_cls, repository):
+    """
+    Fill ``repository`` from its image; return True if the image was
+    usable.
+
+    The entities are rebuilt by setting their slots directly, skipping
+    ``from_dict`` and its checks, which ran before the image was
+    written. The repository then catches up with whatever was written
+    since, so a stale image costs at most one normal load.
+    """
+    try:
+        raw = read_verified(image_path(repository.storage.path))
+        if raw is None:
+            return False
+        header, version, count, columns, index = marshal.loads(raw)
+    except (CorruptFileError, EOFError, TypeError, ValueError):
+        return False
+    if header != _header(entity_cls):
+        return False
+
+    slots = _slots(entity_cls)
+    built = list(map(entity_cls.__new__,
+                     itertools.repeat(entity_cls, count)))
+    for slot, column in zip(slots, columns):
+        # Slot descriptors set each value without running Python code.
+        collections.deque(map(getattr(entity_cls, slot).__set__, built,
+                              column), maxlen=0)
+    keys = columns[slots.index(entity_cls.key_field)]
+    return repository.restore(version, dict(zip(keys, built)), index)
+
+
+def warm_up(entity_classes=ENTITY_CLASSES, save=True):
+    """
+    Load every store of ``entity_classes`` before traffic arrives.
+
+    Each shard starts from its image when there is one and catches up
+    from there. With ``save``, a shard without a usable image, or whose
+    image was too old to catch up from, gets a fresh one, so the next
+    process starts from it. The hotel
+    search index is built as well. Returns per-shard statistics.
+    """
+    results = []
+    for entity_cls in entity_classes:
+        for repository in partitions(repository_for(entity_cls)):
+            start = time.perf_counter()
+            reloads = repository.stats.reloads
+            restored = load_image(entity_cls, repository)
+            count = repository.preload()
+            parsed = repository.stats.reloads != reloads
+            if save and (parsed or not restored):
+                save_image(entity_cls, repository)
+            results.append({
+                "store": str(repository.storage.path),
+                "entities": count,
+                "from_image": restored and not parsed,
+                "seconds": time.perf_counter() - start,
+            })
+        if entity_cls is Hotel:
+            search_index_for(Hotel)
+    return results
+
+
+def main(argv=None):
+    """Command line entry point: ``python -m app.warmup``."""
+    parser = argparse.ArgumentParser(
+        description="Write warm-start images of every data file.")
+    parser.add_argument("--check", action="store_true",
+                        help="only report which images are current")
+    args = parser.parse_args(argv)
+
+    for result in warm_up(save=not args.check):
+        source = "image" if result["from_image"] else "parsed"
+        print(f"{result['store']}: {result['entities']} entities "
+              f"({source}, {result['seconds'] * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
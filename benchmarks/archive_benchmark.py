@@ -0,0 +1,90 @@
+"""
+Reservation archive benchmark.
+
+Seeds synthetic data, then times a cold load of every reservation
+before and after the stays ending before ``--before`` are archived,
+and the latency of looking up archived reservations by id:
+
+    python -m benchmarks.archive_benchmark --sizes 10000 100000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app import archive
+from app.repository import repository_for
+from app.reservation import Reservation
+from benchmarks.data import write_dataset
+
+
+def _load_seconds():
+    """Return the seconds a cold load of every reservation takes."""
+    repository = repository_for(Reservation)
+    repository.invalidate()
+    start = time.perf_counter()
+    repository.all()
+    return time.perf_counter() - start
+
+
+def run(size, before, codec, lookups):
+    """Return the timings for one dataset size."""
+    saved = Reservation.file_path
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            write_dataset(Path(temp_dir), size)
+            load_before = _load_seconds()
+
+            start = time.perf_counter()
+            moved = archive.archive_reservations(before, codec)
+            archive_seconds = time.perf_counter() - start
+            load_after = _load_seconds()
+
+            ids = [record["reservation_id"] for record
+                   in archive.archive_for(Reservation).iter_records()]
+            rng = random.Random(0)
+            start = time.perf_counter()
+            for _ in range(lookups):
+                archive.find_reservation(rng.choice(ids))
+            lookup_seconds = (time.perf_counter() - start) / lookups
+        finally:
+            Reservation.file_path = saved
+    return {"size": size, "codec": codec, "archived": moved,
+            "load_before_ms": load_before * 1000,
+            "load_after_ms": load_after * 1000,
+            "archive_ms": archive_seconds * 1000,
+            "archived_lookup_us": lookup_seconds * 1e6}
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000])
+    parser.add_argument("--before", default="2030-07-01")
+    parser.add_argument("--codec", choices=sorted(archive.CODECS),
+                        default=archive.DEFAULT_CODEC)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [run(size, args.before, args.codec, args.lookups)
+               for size in args.sizes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['size']:>8} records, {result['archived']} "
+                  f"archived: load {result['load_before_ms']:.1f} -> "
+                  f"{result['load_after_ms']:.1f} ms, archiving "
+                  f"{result['archive_ms']:.1f} ms, archived lookup "
+                  f"{result['archived_lookup_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
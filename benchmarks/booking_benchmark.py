@@ -0,0 +1,76 @@
+"""
+Concurrency benchmark for BookingService.
+
+Books rooms across many hotels from a thread pool and reports
+bookings/sec for each thread count:
+
+    python -m benchmarks.booking_benchmark --threads 1 2 4 8
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.booking import BookingService
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+def seed(base, hotels, rooms):
+    """Point the entities at ``base`` and create hotels and a customer."""
+    Hotel.file_path = base / "hotels.json"
+    Customer.file_path = base / "customers.json"
+    Reservation.file_path = base / "reservations.json"
+
+    Hotel.bulk_create(Hotel(f"H{i}", f"Hotel {i}", rooms, rooms)
+                      for i in range(hotels))
+    Customer.create_customer(Customer("C1", "Benchmark"))
+
+
+def run(threads, hotels, bookings):
+    """Return bookings/sec for one thread count on fresh data."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        seed(Path(temp_dir), hotels, bookings)
+        service = BookingService()
+        reservations = [Reservation(f"R{i}", f"H{i % hotels}", "C1")
+                        for i in range(bookings)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(service.create_reservation, reservations))
+        elapsed = time.perf_counter() - start
+
+    return bookings / elapsed
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    parser.add_argument("--hotels", type=int, default=64)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [
+        {"threads": threads,
+         "bookings_per_sec": run(threads, args.hotels, args.bookings)}
+        for threads in args.threads
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['threads']:>3} threads: "
+                  f"{result['bookings_per_sec']:10.1f} bookings/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Room counter benchmark.
+
+Reserves and releases rooms one at a time with the hotels kept in a
+plain journal and in the memory-mapped counter store, and reports
+operations/sec for each number of hotels:
+
+    python -m benchmarks.counter_benchmark --hotels 100 10000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from app.hotel import Hotel, HotelStorage
+from app.storage import JournalStorage
+
+STORAGES = {"journal": JournalStorage, "mmap": HotelStorage}
+
+
+def run(storage_class, hotels, operations):
+    """Return reserve/release operations per second on fresh data."""
+    saved = Hotel.file_path, Hotel.storage_class
+    with tempfile.TemporaryDirectory() as temp_dir:
+        Hotel.file_path = Path(temp_dir) / "hotels.json"
+        Hotel.storage_class = storage_class
+        try:
+            Hotel.bulk_create(Hotel(f"H{i}", f"Hotel {i}", 10, 10)
+                              for i in range(hotels))
+            start = time.perf_counter()
+            for i in range(operations // 2):
+                hotel_id = f"H{i % hotels}"
+                Hotel.reserve_room(hotel_id)
+                Hotel.cancel_reservation(hotel_id)
+            elapsed = time.perf_counter() - start
+        finally:
+            Hotel.file_path, Hotel.storage_class = saved
+    return operations // 2 * 2 / elapsed
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hotels", type=int, nargs="+",
+                        default=[100, 10000])
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [
+        {"storage": name, "hotels": hotels,
+         "operations_per_sec": run(storage_class, hotels, args.operations)}
+        for hotels in args.hotels
+        for name, storage_class in STORAGES.items()
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['storage']:>8} {result['hotels']:>7} hotels: "
+                  f"{result['operations_per_sec']:10.1f} operations/sec")
+
+
+if __name__ == "__main__":
+    main()
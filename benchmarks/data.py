@@ -0,0 +1,104 @@
+"""
+Synthetic data generators for the benchmarks.
+
+Every generator is driven by a ``random.Random(seed)``, so the same
+size and seed always produce the same records.
+"""
+
+import datetime
+import random
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+from app.storage import write_json_array
+
+FIRST_NIGHT = datetime.date(2030, 1, 1)
+WORDS = ("Grand", "Plaza", "Royal", "Sea", "Park", "Central", "Garden",
+         "Palace", "Bay", "Inn", "Tower", "Lodge")
+
+
+def hotel_id(number):
+    """Return the id of the ``number``-th generated hotel."""
+    return f"H{number}"
+
+
+def customer_id(number):
+    """Return the id of the ``number``-th generated customer."""
+    return f"C{number}"
+
+
+def generate_hotels(count, seed=0):
+    """Return ``count`` hotel records with 50 to 500 rooms each."""
+    rng = random.Random(seed)
+    hotels = []
+    for number in range(count):
+        rooms = rng.randint(50, 500)
+        hotels.append({
+            "hotel_id": hotel_id(number),
+            "hotel_name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} "
+                          f"{number}",
+            "total_rooms": rooms,
+            "available_rooms": rooms,
+        })
+    return hotels
+
+
+def generate_customers(count, seed=0):
+    """Return ``count`` customer records."""
+    rng = random.Random(seed)
+    return [{"customer_id": customer_id(number),
+             "customer_name": f"{rng.choice(WORDS)} {number}"}
+            for number in range(count)]
+
+
+def generate_reservations(count, hotels, customers, seed=0):
+    """
+    Return ``count`` active reservations over ``hotels`` and
+    ``customers``, every other one a dated stay of 1 to 7 nights.
+
+    Undated reservations hold a room, so the matching hotel records
+    have their ``available_rooms`` lowered in place.
+    """
+    rng = random.Random(seed)
+    reservations = []
+    for number in range(count):
+        hotel = hotels[rng.randrange(len(hotels))]
+        record = {
+            "reservation_id": f"R{number}",
+            "hotel_id": hotel["hotel_id"],
+            "customer_id": customers[rng.randrange(len(customers))][
+                "customer_id"],
+            "status": Reservation.STATUS_ACTIVE,
+        }
+        if number % 2:
+            check_in = FIRST_NIGHT + datetime.timedelta(rng.randrange(365))
+            check_out = check_in + datetime.timedelta(rng.randint(1, 7))
+            record["check_in"] = check_in.isoformat()
+            record["check_out"] = check_out.isoformat()
+        elif hotel["available_rooms"] > 0:
+            hotel["available_rooms"] -= 1
+        else:
+            continue
+        reservations.append(record)
+    return reservations
+
+
+def write_dataset(base, size, seed=0):
+    """
+    Write ``size`` hotels, customers and reservations under ``base``
+    and point the entity classes at them.
+    """
+    hotels = generate_hotels(size, seed)
+    customers = generate_customers(size, seed)
+    reservations = generate_reservations(size, hotels, customers, seed)
+
+    for entity_cls, name, records in (
+            (Hotel, "hotels.json", hotels),
+            (Customer, "customers.json", customers),
+            (Reservation, "reservations.json", reservations)):
+        entity_cls.file_path = base / name
+        write_json_array(entity_cls.file_path, records)
+
+    return {"hotels": len(hotels), "customers": len(customers),
+            "reservations": len(reservations)}
@@ -0,0 +1,80 @@
+"""
+Reporting benchmark across worker counts.
+
+Builds the reservation report over synthetic data with 1, 2, 4, ...
+worker processes up to the core count and reports the speedup over a
+single process:
+
+    python -m benchmarks.report_benchmark --size 1000000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.reports import build_report
+from benchmarks.data import FIRST_NIGHT, write_dataset
+
+
+def worker_counts(cores):
+    """Return 1, 2, 4, ... up to and including ``cores``."""
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    if cores > 1:
+        counts.append(cores)
+    return counts
+
+
+def run(size, workers, chunk_bytes, repeat):
+    """Return one result per worker count, best of ``repeat`` runs."""
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_dataset(Path(temp_dir), size)
+        check_out = FIRST_NIGHT + datetime.timedelta(30)
+        for count in workers:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                build_report(FIRST_NIGHT, check_out, workers=count,
+                             chunk_bytes=chunk_bytes)
+                times.append(time.perf_counter() - start)
+            results.append({"workers": count, "seconds": min(times)})
+
+    for result in results:
+        result["speedup"] = results[0]["seconds"] / result["seconds"]
+    return results
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--chunk-bytes", type=int,
+                        help="range size (default: a few per worker)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    results = run(args.size, args.workers or worker_counts(cores),
+                  args.chunk_bytes, args.repeat)
+
+    if args.json:
+        print(json.dumps({"cores": cores, "results": results}, indent=2))
+    else:
+        print(f"{cores} cores")
+        for result in results:
+            print(f"{result['workers']:>3} workers: "
+                  f"{result['seconds']:8.3f} s  "
+                  f"speedup {result['speedup']:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Serialization benchmark for data file formats.
+
+Saves and loads the same synthetic hotels in every available format
+and reports save time, load time and file size:
+
+    python -m benchmarks.serialization_benchmark --records 100000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from app import serializers
+from app.storage import read_json_array, write_records
+from benchmarks.data import generate_hotels
+
+
+def _legacy_save(path, records):
+    """Write records the way snapshots used to be written."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(records, file, indent=2)
+
+
+def _save(data_format, orjson_module):
+    """Return a save function for a format and JSON codec."""
+    def save(path, records):
+        serializers.orjson = orjson_module
+        write_records(path, records, data_format)
+    return save
+
+
+def variants():
+    """Yield (name, save function, orjson module used on load)."""
+    orjson_module = serializers.orjson
+    yield "json-indent (old)", _legacy_save, None
+    yield "json-compact", _save("json", None), None
+    if orjson_module is not None:
+        yield "json-orjson", _save("json", orjson_module), orjson_module
+    if serializers.MsgpackFormat.available():
+        yield "msgpack", _save("msgpack", None), None
+
+
+def run(records, repeat):
+    """Return one result per format, timing the best of ``repeat`` runs."""
+    original = serializers.orjson
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, save, load_codec in list(variants()):
+                path = Path(temp_dir) / "hotels.json"
+                save_times, load_times = [], []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    save(path, records)
+                    save_times.append(time.perf_counter() - start)
+
+                    serializers.orjson = load_codec
+                    start = time.perf_counter()
+                    loaded = read_json_array(path)
+                    load_times.append(time.perf_counter() - start)
+                    if len(loaded) != len(records):
+                        raise RuntimeError(f"{name} lost records")
+
+                results.append({"format": name,
+                                "save_seconds": min(save_times),
+                                "load_seconds": min(load_times),
+                                "bytes": path.stat().st_size})
+    finally:
+        serializers.orjson = original
+    return results
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(generate_hotels(args.records), args.repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['format']:<18} "
+                  f"save {result['save_seconds'] * 1000:8.1f} ms  "
+                  f"load {result['load_seconds'] * 1000:8.1f} ms  "
+                  f"{result['bytes'] / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Write throughput benchmark for sharded data files.
+
+Books rooms from several worker processes at once, with the hotels and
+reservations split into each shard count, and reports bookings/sec:
+
+    python -m benchmarks.sharding_benchmark --shards 1 2 4 8 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+def seed(base, shards, hotels, rooms):
+    """Point the entities at ``base`` and create hotels and a customer."""
+    Hotel.file_path = base / "hotels.json"
+    Customer.file_path = base / "customers.json"
+    Reservation.file_path = base / "reservations.json"
+    Hotel.shards = Reservation.shards = shards
+
+    Hotel.bulk_create(Hotel(f"H{i}", f"Hotel {i}", rooms, rooms)
+                      for i in range(hotels))
+    Customer.create_customer(Customer("C1", "Benchmark"))
+
+
+def _book(worker, count, hotels):
+    """Create ``count`` reservations from one worker process."""
+    for i in range(count):
+        Reservation.create_reservation(Reservation(
+            f"W{worker}-{i}", f"H{(i * 7 + worker) % hotels}", "C1"))
+
+
+def run(shards, workers, hotels, bookings):
+    """Return bookings/sec for one shard count on fresh data."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        seed(Path(temp_dir), shards, hotels, bookings)
+        per_worker = bookings // workers
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_book,
+                                     args=(worker, per_worker, hotels))
+                     for worker in range(workers)]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        Hotel.shards = Reservation.shards = 1
+    return per_worker * workers / elapsed
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hotels", type=int, default=256)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [
+        {"shards": shards,
+         "bookings_per_sec": run(shards, args.workers, args.hotels,
+                                 args.bookings)}
+        for shards in args.shards
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['shards']:>3} shards: "
+                  f"{result['bookings_per_sec']:10.1f} bookings/sec")
+
+
+if __name__ == "__main__":
+    main()
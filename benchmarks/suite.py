@@ -0,0 +1,415 @@
+"""
+Benchmark suite for the public entity operations.
+
+Seeds synthetic hotels, customers and reservations at each size and
+reports latency percentiles, throughput and peak memory for every
+operation as JSON, optionally checked against an earlier run:
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 \\
+        --output results.json
+    python -m benchmarks.suite --sizes 10000 --compare results.json
+"""
+# pylint: disable=unused-argument
+
+import argparse
+import datetime
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+from benchmarks.data import FIRST_NIGHT, WORDS, customer_id, hotel_id
+from benchmarks.data import write_dataset
+
+MEMORY_ITERATIONS = 20
+
+# name -> (setup(size, count, rng) returning operation(i), iterations)
+CASES = {}
+
+
+def case(name, iterations=None):
+    """
+    Register a benchmark case.
+
+    The decorated setup function prepares state for ``count`` calls
+    without being timed and returns the operation to time, called with
+    the call number. ``iterations`` overrides the suite default for
+    expensive operations.
+    """
+    def register(setup):
+        CASES[name] = (setup, iterations)
+        return setup
+    return register
+
+
+@case("hotel.load_all", iterations=3)
+def _load_all(size, count, rng):
+    repository = repository_for(Hotel)
+
+    def operation(_):
+        repository.invalidate()
+        repository.all()
+    return operation
+
+
+@case("hotel.iter_all", iterations=3)
+def _iter_all(size, count, rng):
+    def operation(_):
+        for _ in Hotel.iter_all():
+            pass
+    return operation
+
+
+@case("hotel.save_all", iterations=3)
+def _save_all(size, count, rng):
+    hotels = Hotel._load_all()  # pylint: disable=protected-access
+    return lambda i: Hotel._save_all(  # pylint: disable=protected-access
+        hotels)
+
+
+@case("hotel.display_hotel_info")
+def _display_hotel(size, count, rng):
+    ids = [hotel_id(rng.randrange(size)) for _ in range(count)]
+    Hotel.display_hotel_info(ids[0])
+    return lambda i: Hotel.display_hotel_info(ids[i])
+
+
+@case("customer.display_customer_info")
+def _display_customer(size, count, rng):
+    ids = [customer_id(rng.randrange(size)) for _ in range(count)]
+    Customer.display_customer_info(ids[0])
+    return lambda i: Customer.display_customer_info(ids[i])
+
+
+@case("customer.create_customer")
+def _create_customer(size, count, rng):
+    customers = [Customer(f"B{i}", f"Bench {i}") for i in range(count)]
+    return lambda i: Customer.create_customer(customers[i])
+
+
+@case("customer.modify_customer_info")
+def _modify_customer(size, count, rng):
+    ids = [customer_id(rng.randrange(size)) for _ in range(count)]
+    return lambda i: Customer.modify_customer_info(
+        ids[i], customer_name=f"Renamed {i}")
+
+
+@case("customer.delete_customer")
+def _delete_customer(size, count, rng):
+    ids = [f"D{i}" for i in range(count)]
+    Customer.bulk_create(Customer(key, "Deleted") for key in ids)
+    return lambda i: Customer.delete_customer(ids[i])
+
+
+@case("hotel.create_hotel")
+def _create_hotel(size, count, rng):
+    hotels = [Hotel(f"B{i}", f"Bench {i}", 100, 100) for i in range(count)]
+    return lambda i: Hotel.create_hotel(hotels[i])
+
+
+@case("hotel.modify_hotel_info")
+def _modify_hotel(size, count, rng):
+    ids = [hotel_id(rng.randrange(size)) for _ in range(count)]
+    return lambda i: Hotel.modify_hotel_info(ids[i],
+                                             hotel_name=f"Renamed {i}")
+
+
+@case("hotel.delete_hotel")
+def _delete_hotel(size, count, rng):
+    ids = [f"D{i}" for i in range(count)]
+    Hotel.bulk_create(Hotel(key, "Deleted", 10, 10) for key in ids)
+    return lambda i: Hotel.delete_hotel(ids[i])
+
+
+@case("hotel.reserve_room")
+def _reserve_room(size, count, rng):
+    return lambda i: Hotel.reserve_room(hotel_id(i % size))
+
+
+@case("hotel.cancel_reservation")
+def _cancel_room(size, count, rng):
+    ids = [hotel_id((size - 1 - i) % size) for i in range(count)]
+    for hotel in ids:
+        Hotel.reserve_room(hotel)
+    return lambda i: Hotel.cancel_reservation(ids[i])
+
+
+@case("hotel.search", iterations=50)
+def _search(size, count, rng):
+    prefixes = [rng.choice(WORDS) for _ in range(count)]
+    Hotel.search(min_free_rooms=1)
+    return lambda i: Hotel.search(min_free_rooms=100,
+                                  name_prefix=prefixes[i], limit=100)
+
+
+@case("hotel.bulk_create", iterations=5)
+def _bulk_create(size, count, rng):
+    return lambda i: Hotel.bulk_create(
+        Hotel(f"BULK{i}-{j}", f"Bulk {j}", 10, 10) for j in range(1000))
+
+
+@case("hotel.bulk_modify", iterations=5)
+def _bulk_modify(size, count, rng):
+    batches = [[{"hotel_id": hotel_id(rng.randrange(size)),
+                 "hotel_name": f"Bulk renamed {i}"} for _ in range(1000)]
+               for i in range(count)]
+    return lambda i: Hotel.bulk_modify(batches[i])
+
+
+@case("hotel.bulk_delete", iterations=5)
+def _bulk_delete(size, count, rng):
+    batches = [[f"BULKD{i}-{j}" for j in range(1000)] for i in range(count)]
+    for batch in batches:
+        Hotel.bulk_create(Hotel(key, "Deleted", 10, 10) for key in batch)
+    return lambda i: Hotel.bulk_delete(batches[i])
+
+
+@case("reservation.create_reservation")
+def _create_reservation(size, count, rng):
+    reservations = []
+    for i in range(count):
+        dates = {}
+        if i % 2:
+            check_in = FIRST_NIGHT + datetime.timedelta(rng.randrange(365))
+            dates = {"check_in": check_in,
+                     "check_out": check_in + datetime.timedelta(3)}
+        reservations.append(Reservation(
+            f"B{i}", hotel_id(rng.randrange(size)),
+            customer_id(rng.randrange(size)), **dates))
+    return lambda i: Reservation.create_reservation(reservations[i])
+
+
+@case("reservation.cancel_reservation")
+def _cancel_reservation(size, count, rng):
+    ids = [reservation.reservation_id for reservation
+           in Reservation.find_by_status(Reservation.STATUS_ACTIVE)
+           if reservation.reservation_id.startswith("R")][:count]
+    rng.shuffle(ids)
+    return lambda i: Reservation.cancel_reservation(ids[i])
+
+
+@case("reservation.bulk_create", iterations=5)
+def _bulk_create_reservations(size, count, rng):
+    def reservations(i):
+        for j in range(1000):
+            check_in = FIRST_NIGHT + datetime.timedelta(rng.randrange(365))
+            yield Reservation(
+                f"BULK{i}-{j}", hotel_id(rng.randrange(size)),
+                customer_id(rng.randrange(size)), check_in=check_in,
+                check_out=check_in + datetime.timedelta(3))
+    return lambda i: Reservation.bulk_create(reservations(i))
+
+
+@case("reservation.bulk_cancel", iterations=5)
+def _bulk_cancel(size, count, rng):
+    # Seeded here, so every batch is full at any size and shares no id
+    # with reservation.cancel_reservation.
+    def reservations():
+        for j in range(100 * count):
+            check_in = FIRST_NIGHT + datetime.timedelta(rng.randrange(365))
+            yield Reservation(
+                f"BULKC{j}", hotel_id(rng.randrange(size)),
+                customer_id(rng.randrange(size)), check_in=check_in,
+                check_out=check_in + datetime.timedelta(3))
+
+    ids = Reservation.bulk_create(reservations()).succeeded
+    if len(ids) < 100 * count:
+        raise ValueError(f"Only {len(ids)} of {100 * count} reservations "
+                         f"to cancel could be booked")
+    rng.shuffle(ids)
+    batches = [ids[start:start + 100]
+               for start in range(0, 100 * count, 100)]
+    return lambda i: Reservation.bulk_cancel(batches[i])
+
+
+@case("reservation.display_reservation_info")
+def _display_reservation(size, count, rng):
+    ids = [f"R{rng.randrange(size)}" for _ in range(count)]
+    Reservation.display_reservation_info(ids[0])
+    return lambda i: Reservation.display_reservation_info(ids[i])
+
+
+@case("reservation.find_by_hotel")
+def _find_by_hotel(size, count, rng):
+    ids = [hotel_id(rng.randrange(size)) for _ in range(count)]
+    Reservation.find_by_hotel(ids[0])
+    return lambda i: Reservation.find_by_hotel(ids[i])
+
+
+@case("reservation.find_by_customer")
+def _find_by_customer(size, count, rng):
+    ids = [customer_id(rng.randrange(size)) for _ in range(count)]
+    Reservation.find_by_customer(ids[0])
+    return lambda i: Reservation.find_by_customer(ids[i])
+
+
+@case("reservation.find_by_status", iterations=20)
+def _find_by_status(size, count, rng):
+    statuses = [Reservation.STATUS_ACTIVE, Reservation.STATUS_CANCELLED]
+    Reservation.find_by_status(statuses[0])
+    return lambda i: Reservation.find_by_status(statuses[i % 2])
+
+
+@case("reservation.available_hotels", iterations=20)
+def _available_hotels(size, count, rng):
+    nights = [FIRST_NIGHT + datetime.timedelta(rng.randrange(358))
+              for _ in range(count)]
+    Reservation.available_hotels(nights[0],
+                                 nights[0] + datetime.timedelta(7))
+    return lambda i: Reservation.available_hotels(
+        nights[i], nights[i] + datetime.timedelta(7), rooms=10)
+
+
+def percentile(ordered, fraction):
+    """Return the nearest-rank percentile of an ordered list."""
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(operation, iterations, memory_iterations):
+    """
+    Time ``iterations`` calls, then trace the peak memory of a further
+    ``memory_iterations`` calls, which are not timed.
+    """
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        operation(i)
+        latencies.append(time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    try:
+        for i in range(iterations, iterations + memory_iterations):
+            operation(i)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "p50_us": percentile(latencies, 0.50) / 1000,
+        "p95_us": percentile(latencies, 0.95) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+        "max_us": latencies[-1] / 1000,
+        "mean_us": total / iterations / 1000,
+        "ops_per_sec": iterations / (total / 1e9) if total else None,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run_size(size, iterations, names, seed):
+    """Run the selected cases on a fresh dataset of ``size`` records."""
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        counts = write_dataset(Path(temp_dir), size, seed)
+        try:
+            for name in names:
+                setup, case_iterations = CASES[name]
+                runs = min(case_iterations or iterations, size)
+                memory_runs = min(MEMORY_ITERATIONS, runs)
+                operation = setup(size, runs + memory_runs,
+                                  random.Random(seed))
+                result = {"operation": name, "size": size, "records": counts}
+                result.update(measure(operation, runs, memory_runs))
+                results.append(result)
+                print(f"{name:<38} {size:>9} p50 {result['p50_us']:>10.1f} us"
+                      f"  p99 {result['p99_us']:>10.1f} us", file=sys.stderr)
+        finally:
+            for entity_cls in (Hotel, Customer, Reservation):
+                repository_for(entity_cls).invalidate()
+    return results
+
+
+def environment():
+    """Describe the machine and commit the results come from."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(
+            datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the operations whose p50 latency grew by more than
+    ``threshold`` (a fraction) against the baseline run.
+    """
+    previous = {(item["operation"], item["size"]): item
+                for item in baseline["results"]}
+    regressions = []
+    for item in results:
+        before = previous.get((item["operation"], item["size"]))
+        if before is None or not before["p50_us"]:
+            continue
+        change = item["p50_us"] / before["p50_us"] - 1
+        if change > threshold:
+            regressions.append({"operation": item["operation"],
+                                "size": item["size"],
+                                "baseline_p50_us": before["p50_us"],
+                                "p50_us": item["p50_us"],
+                                "change": change})
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES),
+                        help="run only these operations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path,
+                        help="write results to this JSON file")
+    parser.add_argument("--compare", type=Path,
+                        help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed p50 slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(CASES)
+    report = {"environment": environment(), "seed": args.seed,
+              "results": []}
+    for size in args.sizes:
+        report["results"].extend(
+            run_size(size, args.iterations, names, args.seed))
+
+    status = 0
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        report["regressions"] = compare(report["results"], baseline,
+                                        args.threshold)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Cold start benchmark.
+
+Seeds synthetic data, then starts fresh Python processes that import
+the package and load every store, first by parsing the data files and
+then from warm-start images, and reports the seconds each takes:
+
+    python -m benchmarks.warmup_benchmark --sizes 10000 100000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from app import warmup
+from benchmarks.data import write_dataset
+
+# Run in a fresh interpreter: times the imports and the loads together.
+_BOOT = """
+import sys, time
+start = time.perf_counter()
+from pathlib import Path
+from app import warmup
+for entity_cls, path in zip(warmup.ENTITY_CLASSES, sys.argv[1:]):
+    entity_cls.file_path = Path(path)
+warmup.warm_up(save=False)
+print(time.perf_counter() - start)
+"""
+
+
+def _boot(paths, repeat):
+    """Return the fastest cold start over ``repeat`` fresh processes."""
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _BOOT, *map(str, paths)],
+            check=True, capture_output=True, text=True).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def run(size, repeat):
+    """Return the cold start seconds with and without images."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_dataset(Path(temp_dir), size)
+        paths = [entity_cls.file_path for entity_cls
+                 in warmup.ENTITY_CLASSES]
+        parsed = _boot(paths, repeat)
+        warmup.warm_up()
+        from_image = _boot(paths, repeat)
+    return {"size": size, "parsed_seconds": parsed,
+            "image_seconds": from_image}
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [run(size, args.repeat) for size in args.sizes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['size']:>8} records: parsed "
+                  f"{result['parsed_seconds']:.3f} s, from images "
+                  f"{result['image_seconds']:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Unit tests for the reservation archive."""
+# pylint: disable=consider-using-with
+
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import archive
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+from app.storage import CorruptFileError
+
+
+class ArchiveTests(unittest.TestCase):
+    """Test suite for moving reservation history to the archive."""
+
+    def setUp(self):
+        """Create temporary files with current and past reservations."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+        self.directory = base / "archive" / "reservations"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 5, 5))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation("R2", "H1", "C1"))
+        Reservation.create_reservation(Reservation(
+            "R3", "H1", "C1", check_in="2030-01-01", check_out="2030-01-03"))
+        Reservation.create_reservation(Reservation(
+            "R4", "H1", "C1", check_in="2030-02-01", check_out="2030-02-03"))
+        Reservation.cancel_reservation("R2")
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_history_leaves_the_hot_store(self):
+        """Test only active and upcoming reservations stay hot."""
+        moved = archive.archive_reservations(before="2030-01-15")
+
+        self.assertEqual(moved, 2)
+        hot = sorted(record["reservation_id"] for record
+                     in repository_for(Reservation).iter_records())
+        self.assertEqual(hot, ["R1", "R4"])
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 4)
+
+        found = archive.find_reservation("R2")
+        self.assertEqual(found.status, Reservation.STATUS_CANCELLED)
+        self.assertEqual(archive.find_reservation("R3").check_in,
+                         "2030-01-01")
+        self.assertEqual(archive.find_reservation("R4").reservation_id, "R4")
+
+    def test_segments_are_partitioned_by_month(self):
+        """Test each month gets a segment readable by standard tools."""
+        archive.archive_reservations(before="2030-03-01", codec="lzma")
+        store = archive.archive_for(Reservation)
+
+        partitions = [segment["partition"] for segment in store.segments()]
+        self.assertEqual(partitions[1:], ["2030-01", "2030-02"])
+        self.assertTrue(all(segment["file"].endswith(".xz")
+                            for segment in store.segments()))
+        self.assertEqual(
+            [record["reservation_id"] for record
+             in store.iter_records("2030-02", "2030-02")], ["R4"])
+
+    def test_lookups_read_one_block(self):
+        """Test the sparse index finds records across many blocks."""
+        store = archive.Archive(self.directory / "bulk", "reservation_id")
+        store.block_records = 4
+        records = [{"reservation_id": f"R{number:03d}", "hotel_id": "H1"}
+                   for number in range(50)]
+        store.add(records, lambda record: "2030-01")
+
+        segment = store.segments()[0]
+        self.assertEqual(len(segment["blocks"]), 13)
+        self.assertEqual(store.get("R037"), records[37])
+        with gzip.open(self.directory / "bulk" / segment["file"]) as file:
+            self.assertEqual(len(file.read().splitlines()), 50)
+
+    def test_merge_keeps_the_newest_copy(self):
+        """Test merging partitions drops records archived twice."""
+        store = archive.Archive(self.directory / "merge", "reservation_id")
+        store.add([{"reservation_id": "R1", "status": "ACTIVE"}],
+                  lambda record: "2030-01")
+        store.add([{"reservation_id": "R1", "status": "CANCELLED"},
+                   {"reservation_id": "R2", "status": "CANCELLED"}],
+                  lambda record: "2030-01")
+
+        self.assertEqual(store.merge(), 2)
+        self.assertEqual(len(store.segments()), 1)
+        self.assertEqual(store.get("R1")["status"], "CANCELLED")
+        self.assertEqual(len(list(store.iter_records())), 2)
+        self.assertEqual(len(list((self.directory / "merge").glob("*.gz"))),
+                         1)
+
+    # ---- Negative cases ----
+
+    def test_unknown_id_raises(self):
+        """Test an id in neither store raises KeyError."""
+        archive.archive_reservations(before="2030-01-15")
+        with self.assertRaises(KeyError):
+            archive.find_reservation("R9")
+
+    def test_archived_id_cannot_be_reused(self):
+        """Test an id moved to the archive is not booked again."""
+        archive.archive_reservations(before="2030-01-15")
+        with self.assertRaises(ValueError):
+            Reservation.create_reservation(Reservation("R2", "H1", "C1"))
+        result = Reservation.bulk_create([
+            Reservation("R3", "H1", "C1"), Reservation("R5", "H1", "C1")])
+        self.assertEqual(result.succeeded, ["R5"])
+
+    def test_damaged_block_raises(self):
+        """Test a block that fails its checksum is never decoded."""
+        archive.archive_reservations(before="2030-01-15")
+        store = archive.archive_for(Reservation)
+        segment = store.segments()[-1]
+        path = self.directory / segment["file"]
+        data = bytearray(path.read_bytes())
+        data[-5] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with self.assertRaises(CorruptFileError):
+            store.get(segment["first"])
+
+    def test_invalid_records_stay_hot(self):
+        """Test records the loader would skip are neither read nor moved."""
+        repository = repository_for(Reservation)
+        repository.storage.save(list(repository.iter_records()) + [
+            5, "x", {"status": "CANCELLED"},
+            {"reservation_id": 7, "hotel_id": "H1", "customer_id": "C1",
+             "status": "CANCELLED"}])
+
+        self.assertEqual(archive.archive_reservations(before="2030-01-15"), 2)
+        self.assertEqual(
+            len(list(repository_for(Reservation).iter_records())), 6)
+
+    def test_non_string_id_is_not_archived(self):
+        """Test looking up an id of another type finds nothing."""
+        archive.archive_reservations(before="2030-01-15")
+        store = archive.archive_for(Reservation)
+        self.assertIsNone(store.get(2))
+        self.assertIsNone(store.get(None))
+
+    def test_unknown_codec_raises(self):
+        """Test an unsupported compression is rejected."""
+        with self.assertRaises(ValueError):
+            archive.archive_reservations(codec="zip")
+        self.assertEqual(
+            len(list(repository_for(Reservation).iter_records())), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Unit tests for the asyncio reservation service."""
+# pylint: disable=consider-using-with
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.async_service import AsyncReservationService
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+class AsyncReservationServiceTests(unittest.TestCase):
+    """Test suite for the AsyncReservationService class."""
+
+    def setUp(self):
+        """Create temporary JSON files and seed test data."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 150, 150))
+        Customer.create_customer(Customer("C1", "Ana"))
+        self.service = AsyncReservationService()
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    async def _book_many(self, count):
+        """Start ``count`` bookings at once and gather their outcomes."""
+        return await asyncio.gather(
+            *(self.service.create_reservation(
+                Reservation(f"R{i}", "H1", "C1")) for i in range(count)),
+            return_exceptions=True,
+        )
+
+    def test_concurrent_bookings_are_grouped(self):
+        """Test many simultaneous bookings share a few log writes."""
+        with mock.patch("app.storage.os.fsync") as fsync:
+            results = asyncio.run(self._book_many(200))
+
+        # One commit: the log, both stores, and the emptied log.
+        self.assertLessEqual(fsync.call_count, 4)
+        self.assertEqual(results.count(None), 150)
+        self.assertTrue(all(isinstance(r, ValueError)
+                            for r in results if r is not None))
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+
+    def test_cancel_and_display(self):
+        """Test the executor-backed operations."""
+
+        async def scenario():
+            await self.service.create_reservation(
+                Reservation("R1", "H1", "C1"))
+            await self.service.cancel_reservation("R1")
+            hotel = await self.service.display_hotel_info("H1")
+            customer = await self.service.display_customer_info("C1")
+            return hotel, customer
+
+        hotel, customer = asyncio.run(scenario())
+        self.assertEqual(hotel.available_rooms, 150)
+        self.assertEqual(customer.customer_name, "Ana")
+
+    # ---- Negative cases ----
+
+    def test_missing_customer_raises(self):
+        """Test a failing booking raises in its own coroutine only."""
+
+        async def scenario():
+            return await asyncio.gather(
+                self.service.create_reservation(
+                    Reservation("R1", "H1", "NOCUST")),
+                self.service.create_reservation(
+                    Reservation("R2", "H1", "C1")),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+        self.assertIsInstance(results[0], KeyError)
+        self.assertIsNone(results[1])
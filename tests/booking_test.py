@@ -0,0 +1,72 @@
+"""Unit tests for the thread-safe booking service."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.booking import BookingService
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+class BookingServiceTests(unittest.TestCase):
+    """Test suite for the BookingService class."""
+
+    def setUp(self):
+        """Create temporary JSON files and seed test data."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 25, 25))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 50, 50))
+        Customer.create_customer(Customer("C1", "Ana"))
+        self.service = BookingService(stripes=8)
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def _book(self, reservation):
+        """Book and report success instead of raising."""
+        try:
+            self.service.create_reservation(reservation)
+        except ValueError:
+            return False
+        return True
+
+    def test_parallel_bookings_keep_invariant(self):
+        """Test threads booking two hotels never exceed availability."""
+        reservations = [Reservation(f"R{i}", f"H{i % 2 + 1}", "C1")
+                        for i in range(80)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            booked = sum(pool.map(self._book, reservations))
+
+        self.assertEqual(booked, 25 + 40)
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+        self.assertEqual(Hotel.display_hotel_info("H2").available_rooms, 10)
+        self.assertEqual(len(Reservation.find_by_hotel("H2")), 40)
+
+    def test_cancel_reservation_releases_room(self):
+        """Test cancelling through the service releases the room."""
+        self.service.create_reservation(Reservation("R1", "H1", "C1"))
+        self.service.cancel_reservation("R1")
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 25)
+
+    # ---- Negative cases ----
+
+    def test_invalid_stripes_raises(self):
+        """Test a service without stripes cannot be built."""
+        with self.assertRaises(ValueError):
+            BookingService(stripes=0)
+
+    def test_cancel_missing_reservation_raises(self):
+        """Test cancelling an unknown reservation raises KeyError."""
+        with self.assertRaises(KeyError):
+            self.service.cancel_reservation("NOPE")
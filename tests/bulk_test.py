@@ -0,0 +1,115 @@
+"""Unit tests for bulk import helpers."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import bulk
+from app.bulk import read_records
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+class ReadRecordsTests(unittest.TestCase):
+    """Test suite for streaming record readers."""
+
+    def setUp(self):
+        """Create temporary directory for input files."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base = Path(self.temp_dir.name)
+        Hotel.file_path = self.base / "hotels.json"
+        Customer.file_path = self.base / "customers.json"
+        Reservation.file_path = self.base / "reservations.json"
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_csv_import_with_types(self):
+        """Test CSV rows are converted and bulk created."""
+        path = self.base / "hotels.csv"
+        path.write_text(
+            "hotel_id,hotel_name,total_rooms,available_rooms\n"
+            "H1,Hotel A,10,10\n"
+            "H2,Hotel B,5,6\n",
+            encoding="utf-8",
+        )
+        result = Hotel.bulk_create(read_records(
+            path, {"total_rooms": int, "available_rooms": int}))
+
+        self.assertEqual(result.succeeded, ["H1"])
+        self.assertEqual(result.errors,
+                         [(1, "Invalid available_rooms value")])
+
+    def test_json_lines_import(self):
+        """Test JSON Lines records are streamed into bulk_create."""
+        path = self.base / "customers.jsonl"
+        path.write_text(
+            '{"customer_id": "C1", "customer_name": "Ana"}\n\n'
+            '{"customer_id": "C2", "customer_name": "Quique"}\n',
+            encoding="utf-8",
+        )
+        result = Customer.bulk_create(read_records(path))
+
+        self.assertEqual(result.succeeded, ["C1", "C2"])
+        self.assertEqual(Customer.display_customer_info("C2").customer_name,
+                         "Quique")
+
+    def test_reservations_stream_in_batches(self):
+        """Test bulk reservations are read lazily, a batch at a time."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 10, 10))
+        Customer.create_customer(Customer("C1", "Ana"))
+        read = []
+
+        def records():
+            for number in range(5):
+                read.append(number)
+                yield {"reservation_id": f"R{number}", "hotel_id": "H1",
+                       "customer_id": "C9" if number == 3 else "C1"}
+
+        with mock.patch.object(bulk, "BATCH_SIZE", 2), \
+                mock.patch.object(Reservation, "transaction",
+                                  side_effect=Reservation.transaction) \
+                as begin:
+            result = Reservation.bulk_create(records())
+
+        self.assertEqual(begin.call_count, 3)
+        self.assertEqual(read, [0, 1, 2, 3, 4])
+        self.assertEqual(result.succeeded, ["R0", "R1", "R2", "R4"])
+        self.assertEqual(result.errors, [(3, "Customer not found")])
+
+    # ---- Negative cases ----
+
+    def test_unreadable_lines_are_per_record_errors(self):
+        """Test a bad JSON line or CSV value does not stop the import."""
+        path = self.base / "customers.jsonl"
+        path.write_text(
+            '{"customer_id": "C1", "customer_name": "Ana"}\n'
+            '{"customer_id": "C2", "customer_na\n'
+            '{"customer_id": "C3", "customer_name": "Luis"}\n',
+            encoding="utf-8",
+        )
+        result = Customer.bulk_create(read_records(path))
+
+        self.assertEqual(result.succeeded, ["C1", "C3"])
+        self.assertEqual([position for position, _ in result.errors], [1])
+        self.assertIn("line 2", result.errors[0][1])
+
+        path = self.base / "hotels.csv"
+        path.write_text(
+            "hotel_id,hotel_name,total_rooms,available_rooms\n"
+            "H1,Hotel A,ten,10\n"
+            "H2,Hotel B,5,5\n",
+            encoding="utf-8",
+        )
+        result = Hotel.bulk_create(read_records(
+            path, {"total_rooms": int, "available_rooms": int}))
+        self.assertEqual(result.succeeded, ["H2"])
+        self.assertEqual([position for position, _ in result.errors], [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
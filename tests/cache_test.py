@@ -0,0 +1,115 @@
+# pylint: disable=consider-using-with
+"""Unit tests for the lookup cache."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.cache import MISSING, LRUCache
+from app.hotel import Hotel
+from app.repository import Repository, cache_stats, repository_for
+from app.sqlite_storage import SQLiteStorage
+from app.storage import OP_CREATE, OP_MODIFY
+
+
+class LRUCacheTests(unittest.TestCase):
+    """Test suite for the LRUCache class."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats.as_dict(), {
+            "hits": 3, "misses": 1, "evictions": 1, "expirations": 0,
+            "invalidations": 0, "reloads": 0,
+        })
+
+    def test_entries_expire_after_ttl(self):
+        """Test entries older than the ttl are dropped on access."""
+        now = [0.0]
+        cache = LRUCache(maxsize=4, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+
+        now[0] = 5.0
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 11.0
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertEqual(cache.stats.expirations, 1)
+        self.assertEqual(len(cache), 0)
+
+    # ---- Negative cases ----
+
+    def test_non_positive_size_raises(self):
+        """Test a cache must hold at least one entry."""
+        with self.assertRaises(ValueError):
+            LRUCache(maxsize=0)
+
+
+class PointReadTests(unittest.TestCase):
+    """Repository lookups served by the LRU cache."""
+
+    def setUp(self):
+        """Create a temporary SQLite-backed hotel repository."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+        self.repository = self._repository()
+        self.repository.apply([
+            (OP_CREATE, "H1", Hotel("H1", "Hotel A", 2, 2)),
+            (OP_CREATE, "H2", Hotel("H2", "Hotel B", 3, 3)),
+        ])
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def _repository(self):
+        """Return a new repository over the test database."""
+        storage = SQLiteStorage(self.path, Hotel.key_field, Hotel.fields)
+        return Repository(storage, Hotel.from_dict, Hotel.key_field,
+                          cache_size=1)
+
+    def test_lookups_hit_cache_and_writes_invalidate_keys(self):
+        """Test repeated lookups are cached until their key is written."""
+        self.repository.get("H1")
+        self.repository.get("H1")
+        self.assertEqual(self.repository.stats.hits, 1)
+        self.assertEqual(self.repository.stats.reloads, 0)
+
+        hotel = self.repository.get("H1")
+        hotel.available_rooms = 1
+        self.repository.apply([(OP_MODIFY, "H1", hotel)])
+        self.assertEqual(self.repository.get("H1").available_rooms, 1)
+
+        self.assertFalse(self.repository.exists("H9"))
+        self.assertEqual(self.repository.stats.evictions, 1)
+
+    def test_cache_stats_by_store(self):
+        """Test repeated display calls are counted as cache hits."""
+        Hotel.file_path = self.path
+        Hotel.create_hotel(Hotel("H3", "Hotel C", 1, 1))
+        Hotel.display_hotel_info("H3")
+        Hotel.display_hotel_info("H3")
+
+        stats = cache_stats()[str(repository_for(Hotel).storage.path)]
+        self.assertGreaterEqual(stats["hits"], 1)
+
+    def test_change_by_another_writer_is_detected(self):
+        """Test a write through another repository clears the cache."""
+        self.assertEqual(self.repository.get("H2").available_rooms, 3)
+
+        other = self._repository()
+        hotel = other.get("H2")
+        hotel.available_rooms = 0
+        other.apply([(OP_MODIFY, "H2", hotel)])
+
+        self.assertEqual(self.repository.get("H2").available_rooms, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Unit tests for the change data capture stream."""
+# pylint: disable=consider-using-with
+
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import changes
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+def _book(reservation_id):
+    """Book a room of H1; runs in a forked process."""
+    Reservation.create_reservation(Reservation(reservation_id, "H1", "C1"))
+
+
+class ChangeStreamTests(unittest.TestCase):
+    """Test suite for change events, the log and subscribers."""
+
+    def setUp(self):
+        """Create temporary files with a hotel and a customer."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base = Path(self.temp_dir.name)
+
+        Hotel.file_path = self.base / "hotels.json"
+        Customer.file_path = self.base / "customers.json"
+        Reservation.file_path = self.base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 3, 3))
+        Customer.create_customer(Customer("C1", "Ana"))
+        self.events = []
+        self.unsubscribe = changes.subscribe(self.events.append)
+
+    def tearDown(self):
+        """Unsubscribe and clean up temporary directory."""
+        self.unsubscribe()
+        self.temp_dir.cleanup()
+
+    def test_subscribers_see_every_mutation_in_order(self):
+        """Test bookings and cancellations reach subscribers in order."""
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.cancel_reservation("R1")
+        Hotel.reserve_room("H1")
+        Customer.delete_customer("C1")
+
+        summary = [(event.entity, event.op, event.key)
+                   for event in self.events]
+        self.assertCountEqual(summary[:2], [("Hotel", "modify", "H1"),
+                                            ("Reservation", "create", "R1")])
+        self.assertCountEqual(summary[2:4], [("Hotel", "modify", "H1"),
+                                             ("Reservation", "modify",
+                                              "R1")])
+        self.assertEqual(summary[4:], [("Hotel", "modify", "H1"),
+                                       ("Customer", "delete", "C1")])
+        self.assertEqual(self.events[-2].record["available_rooms"], 2)
+        seqs = [event.seq for event in self.events]
+        self.assertEqual(seqs, sorted(set(seqs)))
+
+    def test_log_resumes_from_an_offset(self):
+        """Test the log file replays only the events after an offset."""
+        log = changes.enable(self.base)
+        Hotel.reserve_room("H1")
+        Hotel.reserve_room("H1")
+        Hotel.cancel_reservation("H1")
+
+        logged = list(log.read())
+        self.assertEqual([event.seq for event in logged], [1, 2, 3])
+        self.assertEqual([event.seq for event in self.events], [1, 2, 3])
+        resumed = list(log.read(since=2))
+        self.assertEqual(len(resumed), 1)
+        self.assertEqual(resumed[0].record["available_rooms"], 2)
+
+    def test_segments_roll_and_prune(self):
+        """Test full segments are closed, skipped on resume and pruned."""
+        log = changes.enable(self.base)
+        log.segment_bytes = 1
+        for _ in range(3):
+            Hotel.reserve_room("H1")
+
+        self.assertEqual([first for first, _ in log.segments()], [1, 2, 3])
+        self.assertEqual([event.seq for event in log.read(since=1)], [2, 3])
+        self.assertEqual(log.prune(2), 2)
+        self.assertEqual([event.seq for event in log.read()], [3])
+
+    def test_tail_follows_other_processes(self):
+        """Test a consumer tails events written by another process."""
+        log = changes.enable(self.base)
+        process = multiprocessing.get_context("fork").Process(
+            target=_book, args=("R1",))
+        process.start()
+        process.join()
+
+        events = list(log.tail(poll_interval=0.01, timeout=0.05))
+        self.assertEqual(sorted(event.entity for event in events),
+                         ["Hotel", "Reservation"])
+        self.assertEqual(self.events, [])
+
+    def test_stores_in_other_folders_share_one_log(self):
+        """Test every store logs to the configured folder's change log."""
+        Hotel.file_path = self.base / "hotels" / "hotels.json"
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 1, 1))
+        log = changes.enable()
+        Reservation.create_reservation(Reservation("R1", "H2", "C1"))
+
+        self.assertEqual(log.directory, self.base / changes.LOG_DIRECTORY)
+        self.assertEqual(sorted(event.entity for event in log.read()),
+                         ["Hotel", "Reservation"])
+
+    # ---- Negative cases ----
+
+    def test_torn_line_is_skipped(self):
+        """Test a line torn by a crash never hides the next event."""
+        log = changes.enable(self.base)
+        Hotel.reserve_room("H1")
+        segment = log.segments()[-1][1]
+        with open(segment, "a", encoding="utf-8") as file:
+            file.write('0badc0de {"seq": 2')
+        Hotel.reserve_room("H1")
+
+        self.assertEqual([event.seq for event in log.read()], [1, 2])
+
+    def test_failing_subscriber_keeps_the_write(self):
+        """Test a raising callback neither fails the write nor others."""
+        def fail(event):
+            raise RuntimeError(event.key)
+        later = []
+        unsubscribers = [changes.subscribe(fail),
+                         changes.subscribe(later.append)]
+        try:
+            Hotel.reserve_room("H1")
+        finally:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
+        self.assertEqual(len(later), 1)
+
+    def test_unsubscribed_callbacks_get_nothing(self):
+        """Test unsubscribing stops delivery."""
+        self.unsubscribe()
+        Hotel.reserve_room("H1")
+        self.assertEqual(self.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Unit tests for columnar collections."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.columnar import HotelColumns, ReservationColumns
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+
+
+class ColumnarTests(unittest.TestCase):
+    """Test suite for HotelColumns and ReservationColumns."""
+
+    def setUp(self):
+        """Create temporary JSON files and seed test data."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 2, 2))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 5, 1))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation("R2", "H1", "C1"))
+        Reservation.cancel_reservation("R2")
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_hotel_columns(self):
+        """Test hotel room counts are scanned from array columns."""
+        columns = HotelColumns.load()
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(columns.available_rooms.typecode, "i")
+        self.assertEqual(columns.with_free_rooms(1), ["H1", "H2"])
+        self.assertEqual(columns.row("H1").available_rooms, 1)
+
+    def test_reservation_columns(self):
+        """Test reservation statuses are stored as codes."""
+        columns = ReservationColumns.load()
+        self.assertEqual(columns.count(Reservation.STATUS_ACTIVE), 1)
+        self.assertEqual(columns.row("R2").status,
+                         Reservation.STATUS_CANCELLED)
+
+        Reservation.create_reservation(Reservation(
+            "R3", "H2", "C1", check_in="2030-01-01", check_out="2030-01-02"))
+        row = ReservationColumns.load().row("R3")
+        self.assertEqual((row.check_in, row.check_out),
+                         ("2030-01-01", "2030-01-02"))
+
+    def test_entities_use_slots(self):
+        """Test entities carry no per-instance __dict__."""
+        for entity in (Hotel("H1", "Hotel A", 1, 1), Customer("C1", "Ana"),
+                       Reservation("R1", "H1", "C1")):
+            self.assertFalse(hasattr(entity, "__dict__"))
+
+    # ---- Negative cases ----
+
+    def test_invalid_status_assignment_raises(self):
+        """Test assigning an unknown status raises ValueError."""
+        reservation = Reservation("R1", "H1", "C1")
+        with self.assertRaises(ValueError):
+            reservation.status = "PENDING"
@@ -0,0 +1,161 @@
+"""Unit tests for the memory-mapped counter storage."""
+# pylint: disable=consider-using-with
+
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.counter_storage import counters_path
+from app.customer import Customer
+from app.hotel import Hotel, HotelStorage
+from app.repository import Repository, repository_for
+from app.reservation import Reservation
+from app.storage import OP_CREATE
+
+
+def _reserve(count):
+    """Take ``count`` rooms of H1; runs in a forked process."""
+    for _ in range(count):
+        Hotel.reserve_room("H1")
+
+
+class _InterleavedReader:
+    """Slot struct that takes a stamp around every slot write."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.slot = storage._slot  # pylint: disable=protected-access
+        self.stamps = []
+
+    def __getattr__(self, name):
+        return getattr(self.slot, name)
+
+    def pack_into(self, *args):
+        """Stamp before and after the slot bytes are written."""
+        self.stamps.append(self.storage.stamp())
+        self.slot.pack_into(*args)
+        self.stamps.append(self.storage.stamp())
+
+
+class CounterStorageTests(unittest.TestCase):
+    """Test suite for hotel room counters kept in mapped slots."""
+
+    def setUp(self):
+        """Create temporary files with two hotels."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+        self.journal = base / "hotels.json.journal"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 40, 40))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_room_counts_change_in_place(self):
+        """Test reserving and releasing rooms never touches the journal."""
+        size = self.journal.stat().st_size
+        Hotel.reserve_room("H1")
+        Hotel.reserve_room("H1")
+        Hotel.cancel_reservation("H1")
+        Reservation.create_reservation(Reservation("R1", "H2", "C1"))
+
+        self.assertEqual(self.journal.stat().st_size, size)
+        self.assertTrue(counters_path(Hotel.file_path).exists())
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 39)
+        self.assertEqual(Hotel.display_hotel_info("H2").available_rooms, 1)
+
+    def test_other_fields_are_still_journaled(self):
+        """Test a renamed hotel is written to the journal and kept."""
+        size = self.journal.stat().st_size
+        Hotel.reserve_room("H1")
+        Hotel.modify_hotel_info("H1", hotel_name="Hotel Z")
+
+        self.assertGreater(self.journal.stat().st_size, size)
+        hotel = Hotel.display_hotel_info("H1")
+        self.assertEqual((hotel.hotel_name, hotel.available_rooms),
+                         ("Hotel Z", 39))
+
+    def test_compaction_keeps_counters(self):
+        """Test a fresh snapshot carries the in-place counts."""
+        Hotel.reserve_room("H1")
+        storage = repository_for(Hotel).storage
+        storage.compact()
+
+        self.assertFalse(self.journal.exists())
+        records = {record["hotel_id"]: record for record in storage.load()}
+        self.assertEqual(records["H1"]["available_rooms"], 39)
+
+    def test_other_instances_follow_without_reloading(self):
+        """Test a second mapping sees in-place changes incrementally."""
+        other = Repository(HotelStorage(Hotel.file_path, "hotel_id"),
+                           Hotel.from_dict, "hotel_id")
+        self.assertEqual(other.get("H1").available_rooms, 40)
+
+        Hotel.reserve_room("H1")
+        self.assertEqual(other.get("H1").available_rooms, 39)
+        self.assertEqual(other.stats.reloads, 1)
+
+    def test_stamps_between_writes_miss_no_slot(self):
+        """Test a stamp taken mid-write still sees the slot change later."""
+        storage = repository_for(Hotel).storage
+        storage.stamp()
+        reader = _InterleavedReader(storage)
+        storage._slot = reader  # pylint: disable=protected-access
+        Hotel.reserve_room("H1")
+        storage._slot = reader.slot  # pylint: disable=protected-access
+
+        for stamp in reader.stamps:
+            self.assertIn(("H1", {"total_rooms": 40, "available_rooms": 39}),
+                          [(key, record) for _, key, record
+                           in storage.changes_since(stamp, storage.stamp())])
+
+    def test_processes_share_the_mapping(self):
+        """Test concurrent processes never lose a room update."""
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_reserve, args=(10,))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+        with self.assertRaises(ValueError):
+            Hotel.reserve_room("H1")
+
+    # ---- Negative cases ----
+
+    def test_adjusting_other_fields_raises(self):
+        """Test only counter fields can be adjusted in place."""
+        with self.assertRaises(ValueError):
+            repository_for(Hotel).storage.adjust("H1", "hotel_name", 1)
+
+    def test_overlong_id_raises(self):
+        """Test an id wider than a slot is rejected."""
+        Hotel("H" * 64, "Hotel C", 1, 1)
+        with self.assertRaises(ValueError):
+            Hotel("H" * 65, "Hotel C", 1, 1)
+        with self.assertRaises(ValueError):
+            repository_for(Hotel).storage.apply([
+                (OP_CREATE, "H" * 65, {"hotel_id": "H" * 65})])
+
+    def test_non_string_id_raises(self):
+        """Test ids that slots could not give back unchanged are refused."""
+        with self.assertRaises(ValueError):
+            Hotel(1, "Hotel C", 1, 1)
+        with self.assertRaises(ValueError):
+            repository_for(Hotel).storage.apply([
+                (OP_CREATE, 1, {"hotel_id": 1, "hotel_name": "Hotel C",
+                                "total_rooms": 1, "available_rooms": 1})])
+
+
+if __name__ == "__main__":
+    unittest.main()
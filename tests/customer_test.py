@@ -40,6 +40,21 @@ class CustomerTests(unittest.TestCase):
         c = Customer.display_customer_info("C1")
         self.assertEqual(c.customer_name, "Ana Maria")
 
+    def test_iter_all_and_export_skip_invalid_records(self):
+        """Test streaming reads skip invalid records like the full load."""
+        Customer.file_path.write_text(
+            '[{"customer_id": "C1", "customer_name": "Ana"},'
+            ' {"customer_id": ""}]',
+            encoding="utf-8",
+        )
+        self.assertEqual([c.customer_id for c in Customer.iter_all()],
+                         ["C1"])
+
+        export = Customer.file_path.with_name("customers.jsonl")
+        Customer.export_json_lines(export)
+        self.assertEqual(export.read_text(encoding="utf-8"),
+                         '{"customer_id":"C1","customer_name":"Ana"}\n')
+
     # ---- Negative cases ----
 
     def test_create_duplicate_customer_raises(self):
@@ -5,19 +5,27 @@ import tempfile
 import unittest
 from pathlib import Path
 
+from app.customer import Customer
 from app.hotel import Hotel
+from app.reservation import Reservation
+from app.sharding import shard_of
 
 
 class HotelTests(unittest.TestCase):
     """Test suite for the Hotel class."""
 
     def setUp(self):
-        """Create temporary JSON file for hotel tests."""
+        """Create temporary JSON files for hotel tests."""
         self.temp_dir = tempfile.TemporaryDirectory()
-        Hotel.file_path = Path(self.temp_dir.name) / "hotels.json"
+        base = Path(self.temp_dir.name)
+        Hotel.file_path = base / "hotels.json"
+        # Hotel changes commit through the reservation transaction log.
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
 
     def tearDown(self):
-        """Clean up temporary directory after each test."""
+        """Restore the single-file layout and clean up."""
+        Hotel.shards = Reservation.shards = 1
         self.temp_dir.cleanup()
 
     def test_create_and_display_hotel(self):
@@ -42,6 +50,69 @@ class HotelTests(unittest.TestCase):
         h = Hotel.display_hotel_info("H1")
         self.assertEqual(h.hotel_name, "Hotel B")
 
+    def test_bulk_create_modify_delete(self):
+        """Test bulk operations apply valid records and report the rest."""
+        result = Hotel.bulk_create([
+            Hotel("H1", "Hotel A", 10, 10),
+            {"hotel_id": "H2", "hotel_name": "Hotel B",
+             "total_rooms": 5, "available_rooms": 5},
+            {"hotel_id": "H1", "hotel_name": "Dup",
+             "total_rooms": 5, "available_rooms": 5},
+            {"hotel_id": "H3"},
+        ])
+        self.assertEqual(result.succeeded, ["H1", "H2"])
+        self.assertEqual([p for p, _ in result.errors], [2, 3])
+
+        result = Hotel.bulk_modify([
+            {"hotel_id": "H1", "available_rooms": 4},
+            {"hotel_id": "H2", "available_rooms": 50},
+        ])
+        self.assertEqual(result.succeeded, ["H1"])
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 4)
+
+        result = Hotel.bulk_delete(["H2", "NOPE"])
+        self.assertEqual(result.errors, [(1, "Hotel not found")])
+        with self.assertRaises(KeyError):
+            Hotel.display_hotel_info("H2")
+
+    def test_search_follows_writes(self):
+        """Test search filters stay current across bookings and edits."""
+        Hotel.bulk_create([
+            Hotel("H1", "Grand Plaza", 10, 3),
+            Hotel("H2", "grand central", 4, 4),
+            Hotel("H3", "Seaside", 20, 0),
+        ])
+
+        def ids(**filters):
+            return [hotel.hotel_id for hotel in Hotel.search(**filters)]
+
+        self.assertEqual(ids(name_prefix="GRAND"), ["H1", "H2"])
+        self.assertEqual(ids(min_free_rooms=4), ["H2"])
+        self.assertEqual(ids(min_capacity=5, max_capacity=20), ["H1", "H3"])
+        self.assertEqual(ids(min_free_rooms=1, limit=1), ["H1"])
+
+        Hotel.reserve_room("H2")
+        Hotel.cancel_reservation("H3")
+        Hotel.modify_hotel_info("H3", hotel_name="Grand Bay")
+        Hotel.delete_hotel("H1")
+
+        self.assertEqual(ids(name_prefix="grand", min_free_rooms=1),
+                         ["H2", "H3"])
+        self.assertEqual(ids(min_free_rooms=4), [])
+
+    def test_new_id_moves_hotel_to_its_shard(self):
+        """Test changing hotel_id moves the hotel between shards."""
+        Hotel.shards = Reservation.shards = 4
+        new_id = next(f"H{i}" for i in range(2, 20)
+                      if shard_of(f"H{i}", 4) != shard_of("H1", 4))
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 10, 10))
+
+        Hotel.modify_hotel_info("H1", hotel_id=new_id)
+        self.assertEqual([hotel.hotel_id for hotel in Hotel.iter_all()],
+                         [new_id])
+        self.assertEqual(Hotel.display_hotel_info(new_id).hotel_name,
+                         "Hotel A")
+
     # ---- Negative cases ----
 
     def test_create_duplicate_hotel_raises(self):
@@ -50,6 +121,18 @@ class HotelTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             Hotel.create_hotel(Hotel("H1", "Hotel X", 5, 5))
 
+    def test_modify_to_existing_id_raises(self):
+        """Test a new hotel_id that is taken never overwrites its hotel."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 10, 10))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 5, 5))
+        with self.assertRaises(ValueError):
+            Hotel.modify_hotel_info("H1", hotel_id="H2")
+
+        self.assertEqual(Hotel.display_hotel_info("H1").hotel_name,
+                         "Hotel A")
+        self.assertEqual(Hotel.display_hotel_info("H2").hotel_name,
+                         "Hotel B")
+
     def test_delete_missing_hotel_raises(self):
         """Test deleting a non-existing hotel raises KeyError."""
         with self.assertRaises(KeyError):
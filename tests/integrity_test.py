@@ -0,0 +1,153 @@
+"""Unit tests for the integrity checker."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import integrity
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+
+
+class IntegrityTests(unittest.TestCase):
+    """Test suite for full and incremental integrity checks."""
+
+    def setUp(self):
+        """Create temporary JSON files with two undated bookings."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+        self.checkpoint = base / "checkpoint.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 3, 3))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Customer.create_customer(Customer("C2", "Luis"))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation("R2", "H2", "C2"))
+        Reservation.create_reservation(Reservation(
+            "R3", "H1", "C2", check_in="2030-01-01", check_out="2030-01-03"))
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_consistent_data_passes(self):
+        """Test bookings made through the API leave nothing to report."""
+        report = integrity.check()
+        self.assertTrue(report.ok)
+        self.assertEqual(report.to_dict()["availability"], [])
+
+    def test_manual_edit_is_found_and_repaired(self):
+        """Test a hand-edited room count is recomputed from bookings."""
+        Hotel.modify_hotel_info("H1", available_rooms=3)
+
+        report = integrity.check()
+        self.assertEqual(report.availability, [("H1", 3, 2)])
+
+        report = integrity.check(repair=True)
+        self.assertEqual(report.repaired, 1)
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
+        self.assertTrue(integrity.check().ok)
+
+    def test_deleted_customer_leaves_orphan(self):
+        """Test repair cancels an orphan and releases its room."""
+        Customer.delete_customer("C2")
+
+        report = integrity.check()
+        self.assertEqual(report.orphans, [("R2", "customer_id"),
+                                          ("R3", "customer_id")])
+        self.assertEqual(report.availability, [("H2", 1, 2)])
+
+        integrity.check(repair=True)
+        self.assertEqual(Reservation.display_reservation_info("R2").status,
+                         Reservation.STATUS_CANCELLED)
+        self.assertEqual(Hotel.display_hotel_info("H2").available_rooms, 2)
+        self.assertTrue(integrity.check().ok)
+
+    def test_deleted_hotel_leaves_orphan(self):
+        """Test reservations of a deleted hotel are reported."""
+        Hotel.delete_hotel("H2")
+        report = integrity.check()
+        self.assertEqual(report.orphans, [("R2", "hotel_id")])
+
+    def test_incremental_checks_only_changes(self):
+        """Test incremental runs follow the journal from the checkpoint."""
+        first = integrity.check_incremental(self.checkpoint)
+        self.assertFalse(first.incremental)
+        self.assertTrue(self.checkpoint.exists())
+
+        unchanged = integrity.check_incremental(self.checkpoint)
+        self.assertTrue(unchanged.incremental)
+        self.assertTrue(unchanged.ok)
+
+        Hotel.modify_hotel_info("H2", available_rooms=0)
+        Customer.delete_customer("C1")
+        report = integrity.check_incremental(self.checkpoint, repair=True)
+        self.assertTrue(report.incremental)
+        self.assertEqual(report.orphans, [("R1", "customer_id")])
+        self.assertEqual(report.availability, [("H1", 2, 3), ("H2", 0, 1)])
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 3)
+        self.assertEqual(Hotel.display_hotel_info("H2").available_rooms, 1)
+
+    # ---- Negative cases ----
+
+    def test_hotel_without_room_counts_is_skipped(self):
+        """Test a hotel record lacking counts neither fails nor orphans."""
+        repository_for(Hotel).storage.save([
+            record for record in repository_for(Hotel).iter_records()
+            if record["hotel_id"] == "H1"] + [
+            {"hotel_id": "H2", "hotel_name": "Hotel B"}])
+
+        report = integrity.check()
+        self.assertTrue(report.ok)
+
+    def test_records_missing_ids_are_skipped(self):
+        """Test records lacking their ids are reported, not raised on."""
+        repository_for(Hotel).storage.save(
+            list(repository_for(Hotel).iter_records()) +
+            [{"hotel_name": "Hotel C", "total_rooms": 1}])
+        repository_for(Reservation).storage.save(
+            list(repository_for(Reservation).iter_records()) +
+            [{"reservation_id": "R4", "customer_id": "C1"},
+             {"hotel_id": "H1", "customer_id": "C1"}])
+
+        report = integrity.check()
+        self.assertTrue(report.ok)
+
+    def test_non_dict_records_are_skipped(self):
+        """Test records that are not objects are reported, not raised on."""
+        repository_for(Customer).storage.save(
+            list(repository_for(Customer).iter_records()) + ["x"])
+        repository_for(Reservation).storage.save(
+            list(repository_for(Reservation).iter_records()) + [5, "x"])
+
+        report = integrity.check()
+        self.assertTrue(report.ok)
+
+    def test_unreadable_checkpoint_runs_full_check(self):
+        """Test a corrupt checkpoint falls back to a full check."""
+        self.checkpoint.write_text("not json", encoding="utf-8")
+        report = integrity.check_incremental(self.checkpoint)
+        self.assertFalse(report.incremental)
+        self.assertTrue(report.ok)
+
+    def test_torn_checkpoint_reads_its_backup(self):
+        """Test a checkpoint that fails its checksum uses the backup."""
+        integrity.check_incremental(self.checkpoint)
+        integrity.check_incremental(self.checkpoint)
+        self.checkpoint.write_text("{", encoding="utf-8")
+
+        report = integrity.check_incremental(self.checkpoint)
+        self.assertTrue(report.incremental)
+        self.assertTrue(report.ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Multi-process stress tests for file locking."""
+# pylint: disable=consider-using-with
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.locking import FileLock
+from app.reservation import Reservation
+
+WORKERS = 4
+ATTEMPTS = 15
+THREADS = 8
+
+
+def _use_files(base):
+    """Point every entity at the files under ``base``."""
+    base = Path(base)
+    Hotel.file_path = base / "hotels.json"
+    Customer.file_path = base / "customers.json"
+    Reservation.file_path = base / "reservations.json"
+
+
+def _book(base, worker):
+    """Try to book ATTEMPTS rooms and return how many succeeded."""
+    _use_files(base)
+    booked = 0
+    for attempt in range(ATTEMPTS):
+        try:
+            Reservation.create_reservation(
+                Reservation(f"R{worker}-{attempt}", "H1", "C1"))
+        except ValueError:
+            continue
+        booked += 1
+    return booked
+
+
+def _reserve(base, count):
+    """Reserve ``count`` rooms directly on the hotel."""
+    _use_files(base)
+    for _ in range(count):
+        Hotel.reserve_room("H1")
+
+
+class LockingStressTests(unittest.TestCase):
+    """Concurrent writers in several processes must not lose updates."""
+
+    def setUp(self):
+        """Create temporary JSON files and seed test data."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        _use_files(self.temp_dir.name)
+        Customer.create_customer(Customer("C1", "Ana"))
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_concurrent_bookings_never_overbook(self):
+        """Test processes racing for the last rooms cannot overbook."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 40, 40))
+
+        with multiprocessing.Pool(WORKERS) as pool:
+            booked = pool.starmap(
+                _book, [(self.temp_dir.name, w) for w in range(WORKERS)])
+
+        self.assertEqual(sum(booked), 40)
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+        self.assertEqual(len(Reservation.find_by_hotel("H1")), 40)
+
+    def test_concurrent_reserve_room_loses_no_update(self):
+        """Test every decrement from every process is persisted."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 100, 100))
+
+        with multiprocessing.Pool(WORKERS) as pool:
+            pool.starmap(_reserve,
+                         [(self.temp_dir.name, 20)] * WORKERS)
+
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms,
+                         100 - 20 * WORKERS)
+
+    def test_generation_increments(self):
+        """Test the generation counter survives reopening the lock."""
+        path = Path(self.temp_dir.name) / "counter.json"
+        with FileLock(path) as lock:
+            lock.bump()
+            lock.bump()
+        self.assertEqual(FileLock(path).generation(), 2)
+
+    def test_threads_taking_a_fresh_lock_exclude_each_other(self):
+        """Test threads racing to open a new lock share one flock."""
+        lock = FileLock(Path(self.temp_dir.name) / "fresh.json")
+        barrier = threading.Barrier(THREADS)
+        holders, overlaps = [], []
+
+        def take():
+            barrier.wait()
+            with lock:
+                holders.append(1)
+                overlaps.append(len(holders) > 1)
+                time.sleep(0.005)
+                holders.pop()
+
+        opening = os.open
+
+        def slow_open(*args):
+            time.sleep(0.05)
+            return opening(*args)
+
+        threads = [threading.Thread(target=take, daemon=True)
+                   for _ in range(THREADS)]
+        with mock.patch("app.locking.os.open", slow_open):
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            for thread in threads:
+                thread.join(timeout=max(deadline - time.monotonic(), 0))
+
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(overlaps, [False] * THREADS)
@@ -0,0 +1,82 @@
+# pylint: disable=consider-using-with
+"""Unit tests for the instrumentation layer."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import metrics
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import repository_for
+from app.reservation import Reservation
+
+
+class MetricsTests(unittest.TestCase):
+    """Test suite for the metrics module."""
+
+    def setUp(self):
+        """Create temporary JSON files and start from empty metrics."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+        metrics.reset()
+
+    def tearDown(self):
+        """Turn metrics off and clean up."""
+        metrics.disable()
+        metrics.reset()
+        self.temp_dir.cleanup()
+
+    def test_operations_stages_and_bytes_are_recorded(self):
+        """Test a booking and a cold load show up in every metric."""
+        metrics.enable()
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        repository_for(Hotel).invalidate()
+        Hotel.display_hotel_info("H1")
+
+        self.assertEqual(
+            metrics.OPERATION_SECONDS.count("reservation.create_reservation"),
+            1)
+        self.assertGreaterEqual(metrics.STAGE_SECONDS.count("from_dict"), 1)
+        self.assertEqual(metrics.RECORDS_PARSED.value("hotels.json"), 1)
+        self.assertGreater(
+            metrics.BYTES_WRITTEN.value("reservations.json.journal"), 0)
+        self.assertGreater(metrics.BYTES_READ.value("hotels.json.journal"), 0)
+
+        text = metrics.render()
+        self.assertIn("# TYPE hotel_operation_seconds histogram", text)
+        self.assertIn('hotel_operation_seconds_count{operation='
+                      '"reservation.create_reservation"} 1', text)
+        self.assertIn('hotel_records_parsed_total{store="hotels.json"} 1',
+                      text)
+
+    def test_profile_is_captured_per_operation(self):
+        """Test profiling keeps cProfile statistics by operation."""
+        metrics.enable(profile=True)
+        Hotel.reserve_room("H1")
+
+        stats = metrics.profiles()["hotel.reserve_room"]
+        self.assertGreater(stats.total_calls, 0)
+        paths = metrics.dump_profiles(Path(self.temp_dir.name) / "prof")
+        self.assertEqual([path.name for path in paths],
+                         ["hotel.reserve_room.prof"])
+
+    def test_disabled_records_nothing(self):
+        """Test nothing is collected while metrics are off."""
+        Hotel.reserve_room("H1")
+        Hotel.display_hotel_info("H1")
+
+        self.assertEqual(metrics.OPERATION_SECONDS.series, {})
+        self.assertEqual(metrics.STAGE_SECONDS.series, {})
+        self.assertEqual(metrics.BYTES_WRITTEN.values, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
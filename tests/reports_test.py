@@ -0,0 +1,122 @@
+"""Unit tests for the reporting module."""
+# pylint: disable=consider-using-with
+
+import datetime
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import archive
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reports import Partial, Report, build_report
+from app.repository import repository_for
+from app.reservation import Reservation
+
+FIRST = datetime.date(2030, 1, 1)
+
+
+class ReportTests(unittest.TestCase):
+    """Test suite for build_report."""
+
+    def setUp(self):
+        """Create temporary files with a snapshot and a journal."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 4, 4))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Customer.create_customer(Customer("C2", "Luis"))
+
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation(
+            "R2", "H1", "C1", check_in="2030-01-02", check_out="2030-01-05"))
+        Reservation.create_reservation(Reservation(
+            "R3", "H1", "C2", check_in="2030-01-01", check_out="2030-01-02"))
+        Reservation.create_reservation(Reservation("R4", "H2", "C2"))
+        repository = repository_for(Reservation)
+        repository.storage.compact()
+        repository.invalidate()
+        # Only in the journal from here on.
+        Reservation.cancel_reservation("R3")
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def _check(self, report):
+        """Assert the figures of the seeded reservations."""
+        self.assertEqual(report.occupancy, {"H1": 0.375, "H2": 0.5})
+        self.assertEqual(report.hotel_cancellation, {"H1": 1 / 3, "H2": 0.0})
+        self.assertEqual(report.customer_cancellation,
+                         {"C1": 0.0, "C2": 0.5})
+        self.assertEqual(report.top_customers, [("C1", 2), ("C2", 1)])
+
+    def test_report_in_one_process(self):
+        """Test rates and rankings over snapshot and journal."""
+        report = build_report(FIRST, FIRST + datetime.timedelta(2),
+                              workers=1)
+        self._check(report)
+        self.assertEqual(report.to_dict()["top_customers"],
+                         [["C1", 2], ["C2", 1]])
+
+    def test_chunks_in_worker_processes_match(self):
+        """Test small chunks counted by a pool give the same report."""
+        report = build_report(FIRST, FIRST + datetime.timedelta(2),
+                              workers=2, chunk_bytes=40)
+        self._check(report)
+
+    def test_indented_snapshot_is_cut_at_records(self):
+        """Test older indented files are cut at record boundaries."""
+        path = Reservation.file_path
+        records = json.loads(path.read_text(encoding="utf-8"))
+        path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+
+        report = build_report(FIRST, FIRST + datetime.timedelta(2),
+                              workers=1, chunk_bytes=16)
+        self._check(report)
+
+    def test_top_limits_the_ranking(self):
+        """Test only ``top`` customers are ranked."""
+        report = build_report(FIRST, FIRST + datetime.timedelta(2), top=1,
+                              workers=1)
+        self.assertEqual(report.top_customers, [("C1", 2)])
+
+    def test_archived_reservations_are_counted(self):
+        """Test archiving, even twice over, leaves the figures unchanged."""
+        record = repository_for(Reservation).get("R3").to_dict()
+        self.assertEqual(archive.archive_reservations(before="2030-01-03"),
+                         1)
+        archive.archive_for(Reservation).add(
+            [record], lambda record: "2030-01")
+
+        report = build_report(FIRST, FIRST + datetime.timedelta(2),
+                              workers=1)
+        self._check(report)
+
+    # ---- Negative cases ----
+
+    def test_hotels_without_rooms_are_skipped(self):
+        """Test a hotel lacking a usable total_rooms gets no occupancy."""
+        hotels = [{"hotel_id": "H1", "total_rooms": 2},
+                  {"hotel_id": "H2"},
+                  {"hotel_id": "H3", "total_rooms": 0},
+                  {"hotel_id": "H4", "total_rooms": "2"}]
+        report = Report.from_partial(Partial(), hotels, FIRST,
+                                     FIRST + datetime.timedelta(1), 10)
+        self.assertEqual(report.occupancy, {"H1": 0.0})
+
+    def test_empty_period_is_rejected(self):
+        """Test a period ending before it starts raises ValueError."""
+        with self.assertRaises(ValueError):
+            build_report(FIRST, FIRST, workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Unit tests for the in-memory repository."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.hotel import Hotel
+from app.repository import Repository
+from app.storage import (
+    JournalStorage,
+    OP_CREATE,
+    OP_DELETE,
+    OP_MODIFY,
+)
+
+
+class RepositoryTests(unittest.TestCase):
+    """Test suite for the Repository class."""
+
+    def setUp(self):
+        """Create a repository over a temporary journal store."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+        self.storage = JournalStorage(self.path, "hotel_id")
+        self.repository = Repository(self.storage, Hotel.from_dict,
+                                     "hotel_id")
+        self.repository.apply(
+            [(OP_CREATE, "H1", Hotel("H1", "Hotel A", 10, 10))]
+        )
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_warm_lookups_skip_parsing(self):
+        """Test repeated lookups load the file only once."""
+        with mock.patch.object(self.storage, "load",
+                               wraps=self.storage.load) as load:
+            self.assertTrue(self.repository.exists("H1"))
+            self.assertEqual(self.repository.get("H1").hotel_name,
+                             "Hotel A")
+            self.repository.get("H1")
+        self.assertEqual(load.call_count, 1)
+
+    def test_own_writes_keep_cache_warm(self):
+        """Test writes through the repository do not force a reload."""
+        self.repository.get("H1")
+        with mock.patch.object(self.storage, "load",
+                               wraps=self.storage.load) as load:
+            self.repository.apply(
+                [(OP_MODIFY, "H1", Hotel("H1", "Hotel B", 10, 9))]
+            )
+            self.assertEqual(self.repository.get("H1").hotel_name,
+                             "Hotel B")
+        self.assertEqual(load.call_count, 0)
+
+    def test_external_change_invalidates_cache(self):
+        """Test a change to the file by someone else triggers a reload."""
+        self.repository.get("H1")
+        self.storage.save([{"hotel_id": "H2", "hotel_name": "Other hotel",
+                            "total_rooms": 5, "available_rooms": 5}])
+
+        self.assertFalse(self.repository.exists("H1"))
+        self.assertTrue(self.repository.exists("H2"))
+
+    def test_returned_entities_are_copies(self):
+        """Test mutating a returned entity does not touch the cache."""
+        self.repository.get("H1").available_rooms = 0
+        self.assertEqual(self.repository.get("H1").available_rooms, 10)
+
+    def test_key_change_moves_entity(self):
+        """Test modifying the primary key re-keys the entity."""
+        self.repository.apply(
+            [(OP_MODIFY, "H1", Hotel("H9", "Hotel A", 10, 10))]
+        )
+        self.assertFalse(self.repository.exists("H1"))
+        self.assertTrue(self.repository.exists("H9"))
+
+    def test_find_uses_maintained_indexes(self):
+        """Test secondary indexes follow creates, modifications and deletes."""
+        repository = Repository(self.storage, Hotel.from_dict, "hotel_id",
+                                indexes=("available_rooms",))
+        repository.apply([
+            (OP_CREATE, "H2", Hotel("H2", "Hotel B", 10, 5)),
+            (OP_CREATE, "H3", Hotel("H3", "Hotel C", 10, 5)),
+        ])
+        repository.apply([(OP_MODIFY, "H3", Hotel("H3", "Hotel C", 10, 4))])
+        repository.apply([(OP_DELETE, "H1", None)])
+
+        self.assertEqual(
+            [h.hotel_id for h in repository.find(available_rooms=5)], ["H2"])
+        self.assertEqual(
+            [h.hotel_id for h in repository.find(available_rooms=4,
+                                                 hotel_name="Hotel C")],
+            ["H3"],
+        )
+        self.assertEqual(repository.find(available_rooms=10), [])
+
+    # ---- Negative cases ----
+
+    def test_invalid_records_are_skipped(self):
+        """Test invalid snapshot records are skipped on load."""
+        self.storage.save([{"hotel_id": "H1"}])
+        self.assertIsNone(self.repository.get("H1"))
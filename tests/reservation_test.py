@@ -4,9 +4,11 @@
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from app.hotel import Hotel
 from app.customer import Customer
+from app.inventory import RoomInventory
 from app.reservation import Reservation
 
 
@@ -43,8 +45,124 @@ class ReservationTests(unittest.TestCase):
         h = Hotel.display_hotel_info("H1")
         self.assertEqual(h.available_rooms, 2)
 
+    def test_find_reservations_by_hotel_customer_and_status(self):
+        """Test secondary index queries follow create and cancel."""
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 2, 2))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation("R2", "H2", "C1"))
+        Reservation.cancel_reservation("R1")
+
+        self.assertEqual(
+            [r.reservation_id for r in Reservation.find_by_customer("C1")],
+            ["R1", "R2"],
+        )
+        self.assertEqual(Reservation.find_by_hotel(
+            "H1", Reservation.STATUS_ACTIVE), [])
+        self.assertEqual(
+            [r.reservation_id for r in Reservation.find_by_status(
+                Reservation.STATUS_CANCELLED)],
+            ["R1"],
+        )
+
+    def test_bulk_create_and_cancel(self):
+        """Test bulk reservations stop at hotel capacity and report errors."""
+        result = Reservation.bulk_create(
+            {"reservation_id": f"R{i}", "hotel_id": "H1",
+             "customer_id": "C1"}
+            for i in range(3)
+        )
+        self.assertEqual(result.succeeded, ["R0", "R1"])
+        self.assertEqual(result.errors, [(2, "No available rooms")])
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+
+        result = Reservation.bulk_cancel(["R0", "R0", "NOPE"])
+        self.assertEqual(result.succeeded, ["R0"])
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 1)
+
+    def test_dated_reservations_share_rooms_across_nights(self):
+        """Test dated stays only use rooms on the nights they cover."""
+        for i, (check_in, check_out) in enumerate([
+            ("2030-01-01", "2030-01-03"),
+            ("2030-01-02", "2030-01-04"),
+            ("2030-01-03", "2030-01-05"),
+            ("2030-01-05", "2030-01-06"),
+        ]):
+            Reservation.create_reservation(
+                Reservation(f"R{i}", "H1", "C1", check_in=check_in,
+                            check_out=check_out))
+
+        with self.assertRaises(ValueError):
+            Reservation.create_reservation(Reservation(
+                "R9", "H1", "C1", check_in="2030-01-02",
+                check_out="2030-01-04"))
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
+        self.assertEqual(
+            Reservation.display_reservation_info("R1").check_out,
+            "2030-01-04")
+
+        # A cancelled stay frees its nights again.
+        Reservation.cancel_reservation("R0")
+        Reservation.create_reservation(Reservation(
+            "R9", "H1", "C1", check_in="2030-01-01", check_out="2030-01-03"))
+
+        # An undated hold needs a room on the busiest night.
+        with self.assertRaises(ValueError):
+            Reservation.create_reservation(Reservation("R10", "H1", "C1"))
+
+    def test_available_hotels_for_a_stay(self):
+        """Test the availability search follows bookings and cancels."""
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 1, 1))
+        Reservation.create_reservation(Reservation(
+            "R1", "H2", "C1", check_in="2030-03-01", check_out="2030-03-05"))
+
+        self.assertEqual(
+            Reservation.available_hotels("2030-03-04", "2030-03-06"), ["H1"])
+        self.assertEqual(
+            Reservation.available_hotels("2030-03-05", "2030-03-06"),
+            ["H1", "H2"])
+        self.assertEqual(
+            Reservation.available_hotels("2030-03-01", "2030-03-02", rooms=2),
+            ["H1"])
+
+        Reservation.cancel_reservation("R1")
+        self.assertEqual(
+            Reservation.available_hotels("2030-03-04", "2030-03-06"),
+            ["H1", "H2"])
+
+    def test_available_hotels_update_without_rebuilding(self):
+        """Test writes adjust the inventory instead of rebuilding it."""
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 1, 1))
+        Reservation.available_hotels("2030-03-01", "2030-03-02")
+
+        with mock.patch.object(RoomInventory, "reset_hotels",
+                               side_effect=AssertionError), \
+                mock.patch.object(RoomInventory, "reset_reservations",
+                                  side_effect=AssertionError):
+            Reservation.create_reservation(Reservation(
+                "R1", "H2", "C1", check_in="2030-03-01",
+                check_out="2030-03-03"))
+            self.assertEqual(
+                Reservation.available_hotels("2030-03-02", "2030-03-03"),
+                ["H1"])
+            Hotel.delete_hotel("H2")
+            self.assertEqual(
+                Reservation.available_hotels("2030-03-05", "2030-03-06"),
+                ["H1"])
+
     # ---- Negative cases ----
 
+    def test_invalid_dates_raise(self):
+        """Test stays must have both dates in order."""
+        with self.assertRaises(ValueError):
+            Reservation("R1", "H1", "C1", check_in="2030-01-02")
+        with self.assertRaises(ValueError):
+            Reservation("R1", "H1", "C1", check_in="2030-01-02",
+                        check_out="2030-01-02")
+        with self.assertRaises(ValueError):
+            Reservation("R1", "H1", "C1", check_in="soon",
+                        check_out="later")
+
     def test_create_duplicate_reservation_raises(self):
         """Test creating a duplicate reservation raises ValueError."""
         Reservation.create_reservation(Reservation("R1", "H1", "C1"))
@@ -0,0 +1,134 @@
+"""Unit tests for sharded data files."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+from app.reshard import reshard
+from app.sharding import detect_shards, shard_of, shard_path
+
+SHARDS = 4
+
+
+class ShardingTests(unittest.TestCase):
+    """Test suite for hotel_id sharding."""
+
+    def setUp(self):
+        """Create temporary files split into four shards."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base = Path(self.temp_dir.name)
+
+        Hotel.file_path = self.base / "hotels.json"
+        Customer.file_path = self.base / "customers.json"
+        Reservation.file_path = self.base / "reservations.json"
+        Hotel.shards = Reservation.shards = SHARDS
+
+        # Two hotels that land in different shards.
+        ids = [f"H{i}" for i in range(1, 20)]
+        self.first = ids[0]
+        self.second = next(hotel_id for hotel_id in ids
+                           if shard_of(hotel_id, SHARDS) !=
+                           shard_of(self.first, SHARDS))
+        Hotel.create_hotel(Hotel(self.first, "Hotel A", 2, 2))
+        Hotel.create_hotel(Hotel(self.second, "Hotel B", 3, 3))
+        Customer.create_customer(Customer("C1", "Ana"))
+
+    def tearDown(self):
+        """Restore the single-file layout and clean up."""
+        Hotel.shards = Reservation.shards = 1
+        self.temp_dir.cleanup()
+
+    def _shard_file(self, name, hotel_id):
+        """Return the journal of the shard holding ``hotel_id``."""
+        path = shard_path(self.base / name, shard_of(hotel_id, SHARDS),
+                          SHARDS)
+        return path.with_name(path.name + ".journal")
+
+    def test_shard_of_is_stable(self):
+        """Test the shard of a key never depends on the process."""
+        self.assertEqual(shard_of("H1", 8), shard_of("H1", 8))
+        self.assertEqual(shard_of("H1", 1), 0)
+        self.assertEqual(shard_path("data/hotels.json", 3, 8).name,
+                         "hotels.shard-003-of-008.json")
+
+    def test_each_hotel_lives_in_its_shard_file(self):
+        """Test hotels are written to their own shard only."""
+        self.assertTrue(self._shard_file("hotels.json", self.first).exists())
+        self.assertTrue(self._shard_file("hotels.json",
+                                         self.second).exists())
+        self.assertFalse((self.base / "hotels.json").exists())
+        self.assertEqual(
+            sorted(hotel.hotel_id for hotel in Hotel.iter_all()),
+            sorted([self.first, self.second]))
+
+    def test_booking_touches_one_shard(self):
+        """Test create and cancel write only the hotel's shard files."""
+        Reservation.create_reservation(Reservation("R1", self.first, "C1"))
+        other = self._shard_file("reservations.json", self.second)
+        self.assertTrue(self._shard_file("reservations.json",
+                                         self.first).exists())
+        self.assertFalse(other.exists())
+
+        wal = shard_path(self.base / "transactions.wal",
+                         shard_of(self.first, SHARDS), SHARDS)
+        self.assertTrue(wal.exists())
+        self.assertFalse((self.base / "transactions.wal").exists())
+
+        Reservation.cancel_reservation("R1")
+        self.assertFalse(other.exists())
+        self.assertEqual(Hotel.display_hotel_info(self.first).available_rooms,
+                         2)
+
+    def test_queries_span_every_shard(self):
+        """Test lookups without a hotel id merge all shards."""
+        Reservation.create_reservation(Reservation("R1", self.first, "C1"))
+        Reservation.create_reservation(Reservation("R2", self.second, "C1"))
+
+        self.assertEqual(
+            sorted(r.reservation_id
+                   for r in Reservation.find_by_customer("C1")),
+            ["R1", "R2"])
+        self.assertEqual(
+            Reservation.display_reservation_info("R2").hotel_id, self.second)
+        self.assertEqual([hotel.hotel_id for hotel
+                          in Hotel.search(min_free_rooms=2)], [self.second])
+
+    def test_reshard_moves_every_record(self):
+        """Test resharding to a new count keeps every record."""
+        Reservation.create_reservation(Reservation("R1", self.first, "C1"))
+
+        self.assertEqual(reshard(Hotel, 2), 2)
+        self.assertEqual(reshard(Reservation, 2), 1)
+        self.assertEqual(detect_shards(Hotel.file_path), 2)
+        self.assertEqual(Hotel.shards, 2)
+        self.assertFalse(self._shard_file("hotels.json", self.first).exists())
+        self.assertEqual(Reservation.display_reservation_info("R1").hotel_id,
+                         self.first)
+
+        reshard(Hotel, 1)
+        reshard(Reservation, 1)
+        self.assertTrue((self.base / "hotels.json").exists())
+        self.assertEqual(detect_shards(Hotel.file_path), 1)
+        self.assertEqual(Hotel.display_hotel_info(self.second).total_rooms, 3)
+
+    # ---- Negative cases ----
+
+    def test_duplicate_reservation_id_across_shards(self):
+        """Test a reservation id is unique over every shard."""
+        Reservation.create_reservation(Reservation("R1", self.first, "C1"))
+        with self.assertRaises(ValueError):
+            Reservation.create_reservation(
+                Reservation("R1", self.second, "C1"))
+
+    def test_reshard_rejects_zero_shards(self):
+        """Test a shard count below one is rejected."""
+        with self.assertRaises(ValueError):
+            reshard(Hotel, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
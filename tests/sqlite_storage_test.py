@@ -0,0 +1,164 @@
+# pylint: disable=consider-using-with
+"""Unit tests for the SQLite storage backend."""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import migrate
+from app.customer import Customer
+from app.hotel import Hotel
+from app.reservation import Reservation
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JournalStorage, OP_CREATE, OP_DELETE, OP_MODIFY
+
+ENTITY_CLASSES = (Hotel, Customer, Reservation)
+
+
+class SQLiteStorageTests(unittest.TestCase):
+    """Test suite for the SQLiteStorage class."""
+
+    def setUp(self):
+        """Create a temporary database."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(
+            Path(self.temp_dir.name) / "hotels.json", "hotel_id",
+            fields=Hotel.fields, indexes=("hotel_name",),
+        )
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_apply_and_load_keep_insertion_order(self):
+        """Test upserts and deletes round-trip through the table."""
+        self.storage.apply([
+            (OP_CREATE, "H2", {"hotel_id": "H2", "hotel_name": "B",
+                               "total_rooms": 2, "available_rooms": 2}),
+            (OP_CREATE, "H1", {"hotel_id": "H1", "hotel_name": "A",
+                               "total_rooms": 1, "available_rooms": 1}),
+            (OP_MODIFY, "H2", {"hotel_id": "H2", "hotel_name": "B2",
+                               "total_rooms": 2, "available_rooms": 1}),
+        ])
+        self.storage.apply([(OP_DELETE, "H1", None)])
+
+        self.assertEqual(self.storage.load(), [
+            {"hotel_id": "H2", "hotel_name": "B2",
+             "total_rooms": 2, "available_rooms": 1},
+        ])
+        self.assertIsNone(self.storage.get("H1"))
+        self.assertEqual(self.storage.path.suffix, ".sqlite3")
+
+    def test_adjust_is_a_conditional_update(self):
+        """Test adjust enforces its bounds and reports missing keys."""
+        self.storage.save([{"hotel_id": "H1", "hotel_name": "A",
+                            "total_rooms": 1, "available_rooms": 1}])
+
+        record = self.storage.adjust("H1", "available_rooms", -1, minimum=0)
+        self.assertEqual(record["available_rooms"], 0)
+        self.assertIs(
+            self.storage.adjust("H1", "available_rooms", -1, minimum=0),
+            False)
+        self.storage.adjust("H1", "available_rooms", 1,
+                            maximum_field="total_rooms")
+        self.assertIs(
+            self.storage.adjust("H1", "available_rooms", 1,
+                                maximum_field="total_rooms"),
+            False)
+        self.assertIsNone(
+            self.storage.adjust("H9", "available_rooms", -1, minimum=0))
+
+    def test_older_table_gains_new_columns(self):
+        """Test a table created before a field existed keeps its rows."""
+        path = Path(self.temp_dir.name) / "reservations.json"
+        connection = sqlite3.connect(path.with_suffix(".sqlite3"))
+        with connection:
+            connection.execute(
+                'CREATE TABLE "reservations" ("reservation_id" PRIMARY KEY, '
+                '"hotel_id", "customer_id", "status")')
+            connection.execute(
+                'INSERT INTO "reservations" VALUES (?, ?, ?, ?)',
+                ("R1", "H1", "C1", "active"))
+        connection.close()
+
+        storage = SQLiteStorage(path, "reservation_id",
+                                fields=Reservation.fields)
+        self.assertEqual(storage.load(), [{
+            "reservation_id": "R1", "hotel_id": "H1", "customer_id": "C1",
+            "status": "active", "check_in": None, "check_out": None}])
+
+
+class SQLiteEntityTests(unittest.TestCase):
+    """Entity operations running on the SQLite backend."""
+
+    def setUp(self):
+        """Point every entity at a temporary SQLite database."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+        self.saved = {cls: (cls.file_path, cls.storage_class)
+                      for cls in ENTITY_CLASSES}
+
+        for cls in ENTITY_CLASSES:
+            cls.file_path = base / cls.file_path.name
+            cls.storage_class = SQLiteStorage
+
+    def tearDown(self):
+        """Restore the JSON backend and clean up."""
+        for cls, (file_path, storage_class) in self.saved.items():
+            cls.file_path = file_path
+            cls.storage_class = storage_class
+        self.temp_dir.cleanup()
+
+    def test_reservation_lifecycle(self):
+        """Test booking and cancelling update the room count."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 1, 1))
+        Customer.create_customer(Customer("C1", "Ana"))
+
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+        with self.assertRaises(ValueError):
+            Reservation.create_reservation(Reservation("R2", "H1", "C1"))
+
+        Reservation.cancel_reservation("R1")
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 1)
+        self.assertEqual(
+            [r.reservation_id for r in Reservation.find_by_status(
+                Reservation.STATUS_CANCELLED)],
+            ["R1"],
+        )
+
+    def test_reserve_and_release_room_bounds(self):
+        """Test the single-statement room updates keep their errors."""
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 1, 1))
+
+        with self.assertRaises(ValueError):
+            Hotel.cancel_reservation("H1")
+        Hotel.reserve_room("H1")
+        with self.assertRaises(ValueError):
+            Hotel.reserve_room("H1")
+        with self.assertRaises(KeyError):
+            Hotel.reserve_room("H9")
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+
+    def test_migrate_copies_json_data(self):
+        """Test the migration copies snapshot and journal records."""
+        for cls in ENTITY_CLASSES:
+            cls.storage_class = JournalStorage
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 3, 3))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+
+        counts = migrate.migrate(ENTITY_CLASSES)
+        self.assertEqual(counts,
+                         {"Hotel": 1, "Customer": 1, "Reservation": 1})
+
+        for cls in ENTITY_CLASSES:
+            cls.storage_class = SQLiteStorage
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
+        self.assertEqual(
+            Reservation.display_reservation_info("R1").customer_id, "C1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+"""Unit tests for storage backends."""
+# pylint: disable=consider-using-with
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import serializers, storage as storage_module
+from app.storage import (
+    CorruptFileError,
+    JournalStorage,
+    JsonFileStorage,
+    OP_CREATE,
+    OP_DELETE,
+    OP_MODIFY,
+    backup_path,
+    checksum_path,
+    grouped_sync,
+    iter_json_records,
+    set_durability,
+    sync_appended,
+    sync_pending,
+    write_json_lines,
+)
+
+
+class JournalStorageTests(unittest.TestCase):
+    """Test suite for the JournalStorage backend."""
+
+    def setUp(self):
+        """Create temporary snapshot path for storage tests."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+        self.storage = JournalStorage(self.path, "hotel_id")
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_mutations_append_to_journal(self):
+        """Test create/modify/delete append without touching snapshot."""
+        self.storage.apply([(OP_CREATE, "H1", {"hotel_id": "H1", "n": 1})])
+        self.storage.apply([(OP_CREATE, "H2", {"hotel_id": "H2", "n": 1})])
+        self.storage.apply([(OP_MODIFY, "H1", {"hotel_id": "H1", "n": 2})])
+        self.storage.apply([(OP_DELETE, "H2", None)])
+
+        self.assertFalse(self.path.exists())
+        lines = self.storage.journal_path.read_text(
+            encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(self.storage.load(), [{"hotel_id": "H1", "n": 2}])
+
+    def test_legacy_json_array_is_imported(self):
+        """Test an existing JSON array file is read as the snapshot."""
+        self.path.write_text(json.dumps([{"hotel_id": "H1"}]),
+                             encoding="utf-8")
+        self.storage.apply([(OP_CREATE, "H2", {"hotel_id": "H2"})])
+        self.assertEqual(self.storage.load(),
+                         [{"hotel_id": "H1"}, {"hotel_id": "H2"}])
+
+    def test_compact_folds_journal_into_snapshot(self):
+        """Test compaction writes a snapshot and removes the journal."""
+        self.storage.apply([(OP_CREATE, "H1", {"hotel_id": "H1"})])
+        self.storage.compact()
+
+        self.assertFalse(self.storage.journal_path.exists())
+        self.assertEqual(JsonFileStorage(self.path, "hotel_id").load(),
+                         [{"hotel_id": "H1"}])
+
+    def test_compaction_triggers_automatically(self):
+        """Test the journal is compacted once it outgrows the snapshot."""
+        self.storage.compact_min_bytes = 0
+        self.storage.apply([(OP_CREATE, "H1", {"hotel_id": "H1"})])
+        self.assertFalse(self.storage.journal_path.exists())
+        self.assertEqual(self.storage.load(), [{"hotel_id": "H1"}])
+
+    def test_iter_records_matches_load(self):
+        """Test streaming the snapshot plus journal equals a full load."""
+        self.path.write_text(json.dumps(
+            [{"hotel_id": f"H{i}"} for i in range(5)]), encoding="utf-8")
+        self.storage.apply([
+            (OP_MODIFY, "H1", {"hotel_id": "H1", "n": 1}),
+            (OP_DELETE, "H2", None),
+            (OP_CREATE, "H9", {"hotel_id": "H9"}),
+        ])
+        self.assertEqual(list(self.storage.iter_records()),
+                         self.storage.load())
+
+    def test_incremental_array_and_json_lines(self):
+        """Test records stream from arrays split across chunks and JSONL."""
+        records = [{"hotel_id": f"H{i}", "rooms": i} for i in range(50)]
+        self.path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+        with mock.patch("app.storage.CHUNK_SIZE", 16):
+            self.assertEqual(list(iter_json_records(self.path)), records)
+
+        write_json_lines(self.path, records)
+        self.assertEqual(list(iter_json_records(self.path)), records)
+        self.assertEqual(self.storage.load(), records)
+
+    # ---- Negative cases ----
+
+    def test_torn_journal_line_is_skipped(self):
+        """Test a half-written journal entry does not break later appends."""
+        self.storage.apply([(OP_CREATE, "H1", {"hotel_id": "H1"})])
+        with open(self.storage.journal_path, "a", encoding="utf-8") as file:
+            file.write('{"op":"create","key":"H2","rec')
+        self.storage.apply([(OP_CREATE, "H3", {"hotel_id": "H3"})])
+
+        self.assertEqual(self.storage.load(),
+                         [{"hotel_id": "H1"}, {"hotel_id": "H3"}])
+
+
+class AtomicWriteTests(unittest.TestCase):
+    """Test suite for checksummed file replacement and durability."""
+
+    first = [{"hotel_id": "H1", "total_rooms": 1}]
+    second = [{"hotel_id": "H1", "total_rooms": 2}]
+
+    def setUp(self):
+        """Create a storage with two saved versions."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+        self.storage = JsonFileStorage(self.path, "hotel_id")
+        self.storage.save(self.first)
+        self.storage.save(self.second)
+
+    def tearDown(self):
+        """Restore the default durability and clean up."""
+        set_durability(storage_module.DURABILITY_FSYNC, 0.05)
+        self.temp_dir.cleanup()
+
+    def test_save_keeps_checksums_and_backup(self):
+        """Test the previous version is kept as a verified backup."""
+        self.assertEqual(len(checksum_path(self.path).read_text(
+            encoding="ascii").splitlines()), 2)
+        self.assertEqual(json.loads(backup_path(self.path).read_bytes()),
+                         self.first)
+        self.assertEqual(list(Path(self.temp_dir.name).glob(".*")), [])
+        self.assertEqual(self.storage.load(), self.second)
+
+    def test_torn_file_is_read_from_backup(self):
+        """Test a half-written file falls back to the last good copy."""
+        data = self.path.read_bytes()
+        self.path.write_bytes(data[:len(data) // 2])
+
+        self.assertEqual(self.storage.load(), self.first)
+        self.assertEqual(list(self.storage.iter_records()), self.first)
+
+    def test_failed_write_leaves_file_intact(self):
+        """Test an error while writing never touches the live file."""
+        def chunks():
+            yield b"[{"
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            storage_module.replace_file(self.path, chunks())
+        self.assertEqual(self.storage.load(), self.second)
+        self.assertEqual(list(Path(self.temp_dir.name).glob(".*")), [])
+
+    def test_group_commit_defers_syncs(self):
+        """Test appends within the window share one later sync."""
+        set_durability(storage_module.DURABILITY_GROUP, 60)
+        log = Path(self.temp_dir.name) / "log"
+        with mock.patch("app.storage.os.fsync") as fsync:
+            with open(log, "a", encoding="utf-8") as file:
+                for _ in range(3):
+                    file.write("entry\n")
+                    sync_appended(file)
+            self.assertEqual(fsync.call_count, 1)
+            sync_pending()
+            self.assertEqual(fsync.call_count, 2)
+
+    def test_journal_appends_are_synced(self):
+        """Test non-transactional writes follow the durability mode."""
+        storage = JournalStorage(Path(self.temp_dir.name) / "c.json",
+                                 "customer_id")
+        with mock.patch("app.storage.os.fsync") as fsync:
+            storage.apply([(OP_CREATE, "C1", {"customer_id": "C1"})])
+            self.assertEqual(fsync.call_count, 1)
+            set_durability(storage_module.DURABILITY_NONE)
+            storage.apply([(OP_CREATE, "C2", {"customer_id": "C2"})])
+            self.assertEqual(fsync.call_count, 1)
+
+    def test_grouped_sync_syncs_each_file_once(self):
+        """Test appends in a grouped block are synced once at its end."""
+        storage = JournalStorage(Path(self.temp_dir.name) / "c.json",
+                                 "customer_id")
+        with mock.patch("app.storage.os.fsync") as fsync:
+            with grouped_sync():
+                for key in ("C1", "C2", "C3"):
+                    storage.apply([(OP_CREATE, key, {"customer_id": key})])
+                self.assertEqual(fsync.call_count, 0)
+            self.assertEqual(fsync.call_count, 1)
+
+    # ---- Negative cases ----
+
+    def test_both_copies_corrupt_raises(self):
+        """Test loading never returns [] for a damaged checksummed file."""
+        self.path.write_bytes(b"[")
+        backup_path(self.path).write_bytes(b"[")
+        with self.assertRaises(CorruptFileError):
+            self.storage.load()
+
+    def test_unknown_durability_raises(self):
+        """Test an unknown durability mode is rejected."""
+        with self.assertRaises(ValueError):
+            set_durability("sometimes")
+
+
+class SerializationTests(unittest.TestCase):
+    """Test suite for snapshot serialization formats."""
+
+    records = [{"hotel_id": "H1", "hotel_name": "Café", "total_rooms": 2}]
+
+    def setUp(self):
+        """Create temporary snapshot path for serialization tests."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_snapshot_is_compact_json(self):
+        """Test snapshots carry no indentation, with or without orjson."""
+        for codec in (serializers.orjson, None):
+            with mock.patch.object(serializers, "orjson", codec):
+                storage = JsonFileStorage(self.path, "hotel_id")
+                storage.save(self.records)
+                text = self.path.read_text(encoding="utf-8")
+                self.assertNotIn("\n", text)
+                self.assertNotIn(", ", text)
+                self.assertEqual(storage.load(), self.records)
+
+    def test_indented_json_still_loads(self):
+        """Test files written with indentation are read unchanged."""
+        self.path.write_text(json.dumps(self.records, indent=2),
+                             encoding="utf-8")
+        self.assertEqual(JsonFileStorage(self.path, "hotel_id").load(),
+                         self.records)
+
+    @unittest.skipIf(not serializers.MsgpackFormat.available(),
+                     "msgpack not installed")
+    def test_msgpack_snapshot_is_detected_on_load(self):
+        """Test a msgpack snapshot is read back by any storage."""
+        JournalStorage(self.path, "hotel_id", data_format="msgpack").save(
+            self.records)
+        storage = JournalStorage(self.path, "hotel_id")
+        self.assertEqual(storage.load(), self.records)
+        self.assertEqual(list(storage.iter_records()), self.records)
+
+    # ---- Negative cases ----
+
+    def test_unknown_format_raises(self):
+        """Test an unknown data format is rejected up front."""
+        with self.assertRaises(ValueError):
+            JsonFileStorage(self.path, "hotel_id", data_format="yaml")
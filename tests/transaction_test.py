@@ -0,0 +1,124 @@
+"""Unit tests for multi-entity transactions."""
+# pylint: disable=consider-using-with
+
+import json
+import os
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from app.hotel import Hotel
+from app.customer import Customer
+from app.reservation import Reservation
+from app.storage import OP_CREATE, OP_MODIFY
+from app.transaction import TransactionConflict
+
+
+class TransactionTests(unittest.TestCase):
+    """Test suite for the Transaction class."""
+
+    def setUp(self):
+        """Create temporary JSON files and seed test data."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+        self.wal_path = base / "transactions.wal"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_create_reservation_syncs_stores_before_truncating(self):
+        """Test a booking syncs each store once before emptying the log."""
+        synced = []
+        with mock.patch("app.storage.os.fsync") as fsync:
+            fsync.side_effect = lambda descriptor: synced.append(
+                os.fstat(descriptor).st_ino)
+            Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+
+        base = self.wal_path.parent
+        names = {(base / name).stat().st_ino: name for name in (
+            "transactions.wal", "hotels.json.counters",
+            "reservations.json.journal")}
+        self.assertEqual([names[inode] for inode in synced], [
+            "transactions.wal", "hotels.json.counters",
+            "reservations.json.journal", "transactions.wal"])
+        self.assertEqual(self.wal_path.read_text(encoding="utf-8"), "")
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 1)
+        self.assertEqual(len(Reservation.find_by_hotel("H1")), 1)
+
+    def test_reads_see_staged_changes(self):
+        """Test staged writes are visible inside the transaction only."""
+        with Reservation.transaction() as transaction:
+            Hotel.reserve_room("H1", transaction)
+            Hotel.reserve_room("H1", transaction)
+            self.assertEqual(
+                Hotel.display_hotel_info("H1", transaction).available_rooms,
+                0,
+            )
+            self.assertEqual(Hotel.display_hotel_info("H1").available_rooms,
+                             2)
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 0)
+
+    def test_recover_replays_committed_entry(self):
+        """Test a logged but unapplied transaction is replayed."""
+        payload = json.dumps({"txn": "t1", "changes": [
+            {"entity": "Hotel", "ops": [[OP_MODIFY, "H1", {
+                "hotel_id": "H1", "hotel_name": "Hotel A",
+                "total_rooms": 2, "available_rooms": 1}]]},
+            {"entity": "Reservation", "ops": [[OP_CREATE, "R1", {
+                "reservation_id": "R1", "hotel_id": "H1",
+                "customer_id": "C1", "status": "ACTIVE"}]]},
+        ]})
+        self.wal_path.write_text(
+            f"{zlib.crc32(payload.encode()):08x} {payload}\n",
+            encoding="utf-8",
+        )
+
+        Reservation.transaction().recover()
+
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 1)
+        self.assertEqual(len(Reservation.find_by_hotel("H1")), 1)
+
+    def test_overlapping_find_conflicts(self):
+        """Test a booking made after a view's find fails its commit."""
+        first = Reservation.transaction()
+        Reservation.create_reservation(
+            Reservation("R1", "H1", "C1", check_in="2030-01-01",
+                        check_out="2030-01-03"), first)
+
+        Reservation.create_reservation(
+            Reservation("R2", "H1", "C1", check_in="2030-01-02",
+                        check_out="2030-01-04"))
+
+        with self.assertRaises(TransactionConflict):
+            first.commit()
+
+    # ---- Negative cases ----
+
+    def test_failed_booking_changes_nothing(self):
+        """Test an error inside the transaction discards staged changes."""
+        with self.assertRaises(KeyError):
+            with Reservation.transaction() as transaction:
+                Hotel.reserve_room("H1", transaction)
+                Customer.display_customer_info("NOCUST", transaction)
+
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
+
+    def test_recover_discards_torn_entry(self):
+        """Test a half-written log line is dropped on recovery."""
+        self.wal_path.write_text('0000abcd {"txn": "t1", "chan',
+                                 encoding="utf-8")
+
+        Reservation.transaction().recover()
+
+        self.assertEqual(self.wal_path.read_text(encoding="utf-8"), "")
+        self.assertEqual(Hotel.display_hotel_info("H1").available_rooms, 2)
@@ -0,0 +1,126 @@
+"""Unit tests for warm-start images."""
+# pylint: disable=consider-using-with
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import warmup
+from app.customer import Customer
+from app.hotel import Hotel
+from app.repository import Repository, repository_for
+from app.reservation import Reservation
+
+
+def _fresh(entity_cls):
+    """Return a new repository over the data file of ``entity_cls``."""
+    indexes = getattr(entity_cls, "indexed_fields", ())
+    storage = entity_cls.storage_class(
+        entity_cls.file_path, entity_cls.key_field,
+        fields=entity_cls.fields, indexes=indexes)
+    return Repository(storage, entity_cls.from_dict, entity_cls.key_field,
+                      indexes)
+
+
+class WarmUpTests(unittest.TestCase):
+    """Test suite for saving, loading and catching up images."""
+
+    def setUp(self):
+        """Create temporary files with hotels, customers and bookings."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base = Path(self.temp_dir.name)
+
+        Hotel.file_path = base / "hotels.json"
+        Customer.file_path = base / "customers.json"
+        Reservation.file_path = base / "reservations.json"
+
+        Hotel.create_hotel(Hotel("H1", "Hotel A", 3, 3))
+        Hotel.create_hotel(Hotel("H2", "Hotel B", 2, 2))
+        Customer.create_customer(Customer("C1", "Ana"))
+        Reservation.create_reservation(Reservation("R1", "H1", "C1"))
+        Reservation.create_reservation(Reservation(
+            "R2", "H2", "C1", check_in="2030-01-01", check_out="2030-01-03"))
+        Reservation.cancel_reservation("R2")
+
+    def tearDown(self):
+        """Clean up temporary directory after each test."""
+        self.temp_dir.cleanup()
+
+    def test_warm_up_writes_images(self):
+        """Test a first warm-up parses every store and saves its image."""
+        results = warmup.warm_up()
+
+        self.assertEqual([result["entities"] for result in results],
+                         [2, 1, 2])
+        self.assertFalse(any(result["from_image"] for result in results))
+        for entity_cls in warmup.ENTITY_CLASSES:
+            self.assertTrue(warmup.image_path(entity_cls.file_path).exists())
+        self.assertEqual([hotel.hotel_id for hotel in
+                          Hotel.search(min_free_rooms=2)], ["H1", "H2"])
+
+    def test_image_loads_without_parsing(self):
+        """Test entities and indexes come back without from_dict."""
+        warmup.save_image(Reservation, repository_for(Reservation))
+        repository = _fresh(Reservation)
+
+        with mock.patch.object(Reservation, "from_dict",
+                               side_effect=AssertionError):
+            self.assertTrue(warmup.load_image(Reservation, repository))
+            self.assertEqual(repository.preload(), 2)
+            reservation = repository.get("R2")
+            self.assertEqual(
+                [found.reservation_id for found in repository.find(
+                    status=Reservation.STATUS_CANCELLED)], ["R2"])
+        self.assertEqual(reservation.to_dict(),
+                         Reservation.display_reservation_info("R2").to_dict())
+        self.assertEqual(repository.stats.reloads, 0)
+
+    def test_stale_image_catches_up(self):
+        """Test writes made after the image are replayed incrementally."""
+        warmup.save_image(Hotel, repository_for(Hotel))
+        Hotel.reserve_room("H2")
+        Hotel.modify_hotel_info("H1", hotel_name="Hotel Z")
+
+        repository = _fresh(Hotel)
+        self.assertTrue(warmup.load_image(Hotel, repository))
+        self.assertEqual(repository.get("H2").available_rooms, 1)
+        self.assertEqual(repository.get("H1").hotel_name, "Hotel Z")
+        self.assertEqual(repository.stats.reloads, 0)
+
+    def test_rewritten_store_reloads(self):
+        """Test an image older than a compacted store is parsed again."""
+        warmup.save_image(Customer, repository_for(Customer))
+        Customer.create_customer(Customer("C2", "Luis"))
+        repository_for(Customer).storage.compact()
+
+        results = warmup.warm_up([Customer])
+        self.assertFalse(results[0]["from_image"])
+        repository = _fresh(Customer)
+        self.assertTrue(warmup.load_image(Customer, repository))
+        self.assertEqual(repository.preload(), 2)
+        self.assertEqual(repository.stats.reloads, 0)
+
+    # ---- Negative cases ----
+
+    def test_damaged_image_is_ignored(self):
+        """Test an image failing its checksum falls back to parsing."""
+        warmup.save_image(Hotel, repository_for(Hotel))
+        path = warmup.image_path(Hotel.file_path)
+        data = bytearray(path.read_bytes())
+        data[len(data) // 2] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        repository = _fresh(Hotel)
+        self.assertFalse(warmup.load_image(Hotel, repository))
+        self.assertEqual(repository.get("H1").hotel_name, "Hotel A")
+
+    def test_other_format_is_ignored(self):
+        """Test an image written for another layout is not used."""
+        warmup.save_image(Hotel, repository_for(Hotel))
+        with mock.patch.object(warmup, "FORMAT_VERSION", 0):
+            self.assertFalse(warmup.load_image(Hotel, _fresh(Hotel)))
+
+
+if __name__ == "__main__":
+    unittest.main()